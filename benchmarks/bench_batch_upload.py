@@ -0,0 +1,80 @@
+"""Compare N separate /upload requests with one /upload/batch request.
+
+    python -m benchmarks.bench_batch_upload --documents 50
+
+Runs in-process through the Flask test client with a throwaway upload
+folder. Every document is unique so the result cache does not help
+either side.
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_summary, save_results
+from benchmarks.synthetic import make_document
+
+
+def make_invoice(index):
+    return make_document('invoice', index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', default='eager', help='MODEL_WARMUP for the app')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='smartdoc-bench-')
+    os.environ['UPLOAD_FOLDER'] = workdir
+    os.environ['MODEL_WARMUP'] = args.warmup
+    from app import app
+    app.config['UPLOAD_FOLDER'] = workdir
+    client = app.test_client()
+
+    def upload(index):
+        payload = make_invoice(index).encode()
+        started = time.perf_counter()
+        response = client.post('/upload', data={'file': (io.BytesIO(payload), f'inv-{index}.txt')})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return time.perf_counter() - started
+
+    n = args.documents
+    results = {'documents': n, 'concurrency': args.concurrency}
+
+    started = time.perf_counter()
+    latencies = [upload(i) for i in range(n)]
+    elapsed = time.perf_counter() - started
+    results['sequential_uploads'] = dict(
+        latency_summary(latencies), seconds=round(elapsed, 3), docs_per_second=round(n / elapsed, 2)
+    )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(upload, range(n, 2 * n)))
+    elapsed = time.perf_counter() - started
+    results['concurrent_uploads'] = dict(
+        latency_summary(latencies), seconds=round(elapsed, 3), docs_per_second=round(n / elapsed, 2)
+    )
+
+    files = [(io.BytesIO(make_invoice(i).encode()), f'inv-{i}.txt') for i in range(2 * n, 3 * n)]
+    started = time.perf_counter()
+    response = client.post('/upload/batch', data={'files': files})
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, response.get_data(as_text=True)
+    results['batch_upload'] = {
+        'seconds': round(elapsed, 3),
+        'docs_per_second': round(n / elapsed, 2),
+        'succeeded': response.get_json()['succeeded']
+    }
+
+    for name in ('sequential_uploads', 'concurrent_uploads', 'batch_upload'):
+        print(f"{name:20s} {results[name]['docs_per_second']:10.2f} docs/s")
+    print(f"Saved to {save_results('batch_upload', results)}")
+
+
+if __name__ == '__main__':
+    main()
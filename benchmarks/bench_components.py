@@ -0,0 +1,88 @@
+"""Micro-benchmarks of the text stages on synthetic documents.
+
+    python -m benchmarks.bench_components --sizes 1 10 100 --documents 40
+
+Times TextCleaner, DocumentClassifier, FieldExtractor, FieldValidator and
+the rule-based summarizer separately, per document size, on the same
+corpus each run, and reports per-call latency and calls per second.
+"""
+import argparse
+import time
+
+from benchmarks.common import latency_summary, save_results
+from benchmarks.synthetic import DOCUMENT_KINDS, make_corpus
+
+
+def bench(func, inputs, repeat):
+    """Call ``func`` on every input ``repeat`` times; per-call latencies and rate"""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in inputs:
+            call_started = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    return dict(latency_summary(latencies), calls_per_second=round(len(latencies) / elapsed, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100],
+                        help='Body size of the generated documents (line items, jobs, ...)')
+    parser.add_argument('--documents', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--kinds', nargs='+', default=list(DOCUMENT_KINDS), choices=DOCUMENT_KINDS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Directory for the JSON results')
+    args = parser.parse_args()
+
+    from ml.document_classifier import DocumentClassifier
+    from ml.summarizer import TextSummarizer
+    from utils.text_cleaner import TextCleaner
+    from validators.field_extractor import FieldExtractor
+    from validators.field_validator import FieldValidator
+
+    cleaner = TextCleaner()
+    classifier = DocumentClassifier()
+    extractor = FieldExtractor()
+    validator = FieldValidator()
+    summarizer = TextSummarizer(load_model=False)
+
+    results = {'documents': args.documents, 'repeat': args.repeat, 'kinds': args.kinds, 'sizes': {}}
+    for size in args.sizes:
+        corpus = make_corpus(args.documents, size, tuple(args.kinds), args.seed)
+        raw = [text for _, text in corpus]
+        # Plain strings, so views a NormalizedText caches on the first
+        # repeat do not make the later repeats free
+        cleaned = [str(cleaner.clean_text(text)) for text in raw]
+        typed = list(zip(cleaned, [kind for kind, _ in corpus]))
+        extracted = [(extractor.extract_all_fields(text, kind), kind) for text, kind in typed]
+        prepared = [(str(summarizer.clean_text_for_summary(text)), kind) for text, kind in typed]
+
+        stages = {
+            'text_cleaner': bench(cleaner.clean_text, raw, args.repeat),
+            'classifier': bench(classifier.classify_document, cleaned, args.repeat),
+            'field_extractor': bench(lambda item: extractor.extract_all_fields(*item), typed, args.repeat),
+            'field_validator': bench(
+                lambda item: validator.validate_extracted_fields(*item), extracted, args.repeat
+            ),
+            'rule_based_summary': bench(
+                lambda item: summarizer.enhanced_rule_based_summary(*item), prepared, args.repeat
+            ),
+        }
+        results['sizes'][str(size)] = {
+            'avg_chars': round(sum(len(text) for text in raw) / len(raw)),
+            'stages': stages
+        }
+
+        print(f"size {size} (avg {results['sizes'][str(size)]['avg_chars']} chars)")
+        for name, stats in stages.items():
+            print(f"  {name:20s} p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms  "
+                  f"{stats['calls_per_second']:10.1f} calls/s")
+
+    print(f"Saved to {save_results('components', results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
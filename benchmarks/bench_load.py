@@ -0,0 +1,108 @@
+"""In-process load test of /upload and /summarize at several concurrency levels.
+
+    python -m benchmarks.bench_load --concurrency 1 4 16 --requests 200
+
+Requests go through the Flask test client from a thread pool, so the whole
+request path (routing, parsing, pipeline, serialisation) is measured
+without network noise. Every request carries a different synthetic
+document, so neither the result cache nor the summary cache answers it;
+pass --repeat-documents to measure the cached path instead.
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import latency_summary, save_results
+from benchmarks.synthetic import DOCUMENT_KINDS, make_document
+
+
+def run_level(call, requests, concurrency):
+    """Issue ``requests`` calls from ``concurrency`` threads; latency and throughput"""
+    errors = []
+
+    def timed_call(index):
+        started = time.perf_counter()
+        status = call(index)
+        elapsed = time.perf_counter() - started
+        if status != 200:
+            errors.append(status)
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed_call, range(requests)))
+    elapsed = time.perf_counter() - started
+    return dict(
+        latency_summary(latencies),
+        concurrency=concurrency,
+        seconds=round(elapsed, 3),
+        requests_per_second=round(requests / elapsed, 2),
+        errors=len(errors)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and level')
+    parser.add_argument('--size', type=int, default=5, help='Body size of the generated documents')
+    parser.add_argument('--endpoints', nargs='+', default=['upload', 'summarize'],
+                        choices=['upload', 'summarize'])
+    parser.add_argument('--repeat-documents', action='store_true',
+                        help='Reuse the same few documents so caches answer')
+    parser.add_argument('--warmup', default='eager', help='MODEL_WARMUP for the app')
+    parser.add_argument('--output', help='Directory for the JSON results')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='smartdoc-bench-')
+    os.environ['UPLOAD_FOLDER'] = workdir
+    os.environ['MODEL_WARMUP'] = args.warmup
+    from app import app
+    app.config['UPLOAD_FOLDER'] = workdir
+    client = app.test_client()
+
+    # Each level starts at a fresh offset so no document is seen twice
+    offset = [0]
+
+    def document(index):
+        number = index % len(DOCUMENT_KINDS) if args.repeat_documents else offset[0] + index
+        kind = DOCUMENT_KINDS[number % len(DOCUMENT_KINDS)]
+        return kind, make_document(kind, number, args.size)
+
+    def upload(index):
+        kind, text = document(index)
+        response = client.post('/upload', data={'file': (io.BytesIO(text.encode()), f'{kind}-{index}.txt')})
+        return response.status_code
+
+    def summarize(index):
+        kind, text = document(index)
+        response = client.post('/summarize', json={'text': text, 'document_type': kind})
+        return response.status_code
+
+    calls = {'upload': upload, 'summarize': summarize}
+    results = {
+        'requests': args.requests,
+        'size': args.size,
+        'repeat_documents': args.repeat_documents,
+        'warmup': args.warmup,
+        'endpoints': {}
+    }
+    for endpoint in args.endpoints:
+        levels = []
+        for concurrency in args.concurrency:
+            levels.append(run_level(calls[endpoint], args.requests, concurrency))
+            offset[0] += args.requests
+            level = levels[-1]
+            print(f"/{endpoint:10s} c={concurrency:<3d} p50 {level['p50_ms']:9.2f} ms  "
+                  f"p95 {level['p95_ms']:9.2f} ms  p99 {level['p99_ms']:9.2f} ms  "
+                  f"{level['requests_per_second']:9.2f} req/s  errors {level['errors']}")
+        results['endpoints'][endpoint] = levels
+
+    print(f"Saved to {save_results('load', results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
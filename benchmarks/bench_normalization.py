@@ -0,0 +1,113 @@
+"""Shared text normalization against each stage re-deriving its own views.
+
+    python -m benchmarks.bench_normalization --sizes 10 100 1000
+
+For every document the text stages need cleaned text, lowercase tokens for
+the classifier and stripped sentences for the rule-based summarizer.
+``separate`` derives them the way the stages used to, each from its own
+input (cleaning with two regex passes, the classifier lowercasing, the
+summarizer collapsing whitespace again and splitting sentences);
+``shared`` builds one NormalizedText and reads every view from it. Both
+must produce the same views. Reports latency and the peak memory
+allocated per document, also as a multiple of the raw text size.
+"""
+import argparse
+import re
+import time
+import tracemalloc
+from collections import Counter
+
+from benchmarks.common import latency_summary, save_results
+from benchmarks.synthetic import DOCUMENT_KINDS, make_document
+
+
+def separate(raw):
+    """Cleaning, classifier tokens and summary sentences, derived stage by stage"""
+    text = re.sub(r'\s+', ' ', raw)
+    cleaned = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]]', '', text).strip()
+
+    token_counts = Counter(re.findall(r'\w+', cleaned.lower()))
+
+    summary_text = re.sub(r'\s+', ' ', cleaned)
+    lines = [line.strip() for line in summary_text.split('\n') if len(line.strip()) > 10]
+    summary_text = ' '.join(lines).strip()
+    sentences = [s.strip() for s in re.split(r'[.!?]+', summary_text) if len(s.strip()) > 15]
+    return cleaned, token_counts, sentences
+
+
+def shared(raw, cleaner, summarizer):
+    """The same views, read from one NormalizedText"""
+    normalized = cleaner.clean_text(raw)
+    summary_text = summarizer.clean_text_for_summary(normalized)
+    sentences = [s for s in summary_text.sentences if len(s) > 15]
+    return normalized, normalized.token_counts, sentences
+
+
+def measure(func, documents, repeat):
+    latencies = []
+    peaks = []
+    for _ in range(repeat):
+        for raw in documents:
+            started = time.perf_counter()
+            func(raw)
+            latencies.append(time.perf_counter() - started)
+
+    for raw in documents:
+        tracemalloc.start()
+        func(raw)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    chars = sum(len(raw) for raw in documents)
+    return dict(
+        latency_summary(latencies),
+        peak_bytes=round(sum(peaks) / len(peaks)),
+        peak_per_input_char=round(sum(peaks) / chars, 2)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000],
+                        help='Body size of the generated documents (line items, jobs, ...)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Directory for the JSON results')
+    args = parser.parse_args()
+
+    from ml.summarizer import TextSummarizer
+    from utils.text_cleaner import TextCleaner
+
+    cleaner = TextCleaner()
+    summarizer = TextSummarizer(load_model=False)
+
+    results = {'repeat': args.repeat, 'sizes': {}}
+    for size in args.sizes:
+        documents = [make_document(kind, 0, size, args.seed) for kind in DOCUMENT_KINDS]
+        for raw in documents:
+            expected = separate(raw)
+            actual = shared(raw, cleaner, summarizer)
+            assert actual[0] == expected[0] and actual[1] == expected[1] and actual[2] == expected[2], \
+                'shared normalization produced different views'
+
+        separate_stats = measure(separate, documents, args.repeat)
+        shared_stats = measure(lambda raw: shared(raw, cleaner, summarizer), documents, args.repeat)
+        avg_chars = round(sum(len(raw) for raw in documents) / len(documents))
+        results['sizes'][str(size)] = {
+            'avg_chars': avg_chars,
+            'separate': separate_stats,
+            'shared': shared_stats,
+            'speedup': round(separate_stats['mean_ms'] / shared_stats['mean_ms'], 2)
+        }
+
+        print(f"size {size} (avg {avg_chars} chars)")
+        for name, stats in (('separate', separate_stats), ('shared', shared_stats)):
+            print(f"  {name:9s} p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms  "
+                  f"peak {stats['peak_bytes'] / 1024:9.1f} KB ({stats['peak_per_input_char']} bytes/char)")
+        print(f"  speedup {results['sizes'][str(size)]['speedup']}x")
+
+    print(f"Saved to {save_results('normalization', results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
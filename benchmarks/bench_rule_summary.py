@@ -0,0 +1,117 @@
+"""Rule-based summaries of growing documents: full passes against early exit.
+
+    python -m benchmarks.bench_rule_summary --sizes 10 100 1000 10000
+
+``full`` is the rule-based summarizer as it was: every sentence split off
+up front, every currency amount collected to take the last one and the
+name patterns run over the whole text. ``lazy`` is the current
+``enhanced_rule_based_summary``, which reads sentences only as far as it
+needs, scans back from the end for the total and looks for names near
+the start. Both must produce the same summaries of these documents,
+whose facts sit where the early exit looks for them. For each document
+kind the latency at every size is reported, along with the scaling
+exponent between the smallest and largest size (1.0 is linear, 0 is
+constant).
+Documents are cleaned beforehand, as the pipeline hands them over, and
+every repetition gets a fresh copy so no cached view is reused.
+"""
+import argparse
+import math
+import re
+import time
+
+from benchmarks.common import latency_summary, save_results
+from benchmarks.synthetic import DOCUMENT_KINDS, make_document
+
+
+def full_summary(summarizer, text, document_type):
+    """The rule-based summary computed with full passes over the text"""
+    sentences = [s for s in re.findall(r'[^.!?\s](?:[^.!?]*[^.!?\s])?', text) if len(s) > 15]
+    if not sentences:
+        return "Unable to generate summary from the provided text."
+
+    if document_type == 'invoice':
+        key_info = []
+        company_match = re.search(r'(Company|From|Invoice from):?\s*([A-Za-z\s&.,]+)', text, re.IGNORECASE)
+        if company_match:
+            key_info.append(f"Invoice from {company_match.group(2).strip()}")
+        amounts = re.findall(r'[\$₹]\s*[\d,]+\.?\d*', text)
+        if amounts:
+            key_info.append(f"total amount {amounts[-1]}")
+        for sentence in sentences[:5]:
+            if any(word in sentence.lower() for word in ['service', 'product', 'item', 'development', 'design']):
+                key_info.append(f"for {sentence.lower()}")
+                break
+        if key_info:
+            return '. '.join(key_info).capitalize() + '.'
+        return f"Invoice document with {len(sentences)} line items processed."
+
+    if document_type in ('pan', 'aadhar'):
+        doc_name = "PAN Card" if document_type == 'pan' else "Aadhar Card"
+        for pattern in (r'Name:?\s*([A-Za-z\s]+)', r'([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)'):
+            match = re.search(pattern, text)
+            if match:
+                return f"{doc_name} belonging to {match.group(1).strip()}."
+        return f"Official {doc_name} identity document."
+
+    # Resumes scan sentences until they find two experience lines; the
+    # list of all sentences is what the full pass adds
+    return summarizer.summarize_resume(sentences, text)
+
+
+def measure(func, text, repeat, normalize):
+    latencies = []
+    for _ in range(repeat):
+        copy = normalize(text)
+        started = time.perf_counter()
+        func(copy)
+        latencies.append(time.perf_counter() - started)
+    return latency_summary(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                        help='Body size of the generated documents (line items, jobs, ...)')
+    parser.add_argument('--kinds', nargs='+', default=list(DOCUMENT_KINDS), choices=DOCUMENT_KINDS)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Directory for the JSON results')
+    args = parser.parse_args()
+
+    from ml.summarizer import TextSummarizer
+    from utils.normalized_text import NormalizedText
+    from utils.text_cleaner import TextCleaner
+
+    summarizer = TextSummarizer(load_model=False)
+    results = {'repeat': args.repeat, 'kinds': {}}
+    for kind in args.kinds:
+        levels = []
+        for size in args.sizes:
+            text = TextCleaner.clean_text(make_document(kind, 0, size, args.seed))
+            expected = full_summary(summarizer, text, kind)
+            assert summarizer.enhanced_rule_based_summary(NormalizedText(text), kind) == expected, \
+                f'early-exit summary of {kind} differs at size {size}'
+
+            full = measure(lambda copy: full_summary(summarizer, copy, kind), text, args.repeat, NormalizedText)
+            lazy = measure(lambda copy: summarizer.enhanced_rule_based_summary(copy, kind),
+                           text, args.repeat, NormalizedText)
+            levels.append({'size': size, 'chars': len(text), 'full': full, 'lazy': lazy})
+            print(f"{kind:7s} size {size:6d} ({len(text):9d} chars)  full p50 {full['p50_ms']:9.3f} ms  "
+                  f"lazy p50 {lazy['p50_ms']:9.3f} ms")
+
+        first, last = levels[0], levels[-1]
+        growth = math.log(last['chars'] / first['chars']) if last['chars'] > first['chars'] else 0
+        exponents = {
+            name: round(math.log(max(last[name]['p50_ms'], 1e-6) / max(first[name]['p50_ms'], 1e-6)) / growth, 2)
+            if growth else None
+            for name in ('full', 'lazy')
+        }
+        results['kinds'][kind] = {'levels': levels, 'scaling_exponent': exponents}
+        print(f"{kind:7s} scaling exponent  full {exponents['full']}  lazy {exponents['lazy']}")
+
+    print(f"Saved to {save_results('rule_summary', results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
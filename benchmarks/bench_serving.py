@@ -0,0 +1,143 @@
+"""Compare the dev server, gunicorn and the ASGI variant over real HTTP.
+
+    python -m benchmarks.bench_serving --servers dev gunicorn asgi --concurrency 1 8 32
+
+Each server is started as a subprocess on its own port with a fresh upload
+folder, and /upload and /summarize are driven over HTTP from a thread pool
+with a different synthetic document per request, so caches do not answer.
+Worker and thread counts come from --workers/--threads (WEB_WORKERS and
+WEB_THREADS for gunicorn, ASGI_THREADS for the ASGI variant).
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from benchmarks.bench_load import run_level
+from benchmarks.common import ROOT, SRC, save_results
+from benchmarks.synthetic import DOCUMENT_KINDS, make_document
+
+
+def server_command(server, port):
+    if server == 'dev':
+        return [sys.executable, os.path.join(SRC, 'app.py')]
+    command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+               '--bind', f'127.0.0.1:{port}']
+    if server == 'asgi':
+        return command + ['-k', 'uvicorn.workers.UvicornWorker', 'asgi:application']
+    return command + ['app:app']
+
+
+def start_server(server, port, args):
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        UPLOAD_FOLDER=tempfile.mkdtemp(prefix=f'smartdoc-{server}-'),
+        MODEL_WARMUP=args.warmup,
+        WEB_WORKERS=str(args.workers),
+        WEB_THREADS=str(args.threads),
+        ASGI_THREADS=str(args.threads)
+    )
+    process = subprocess.Popen(
+        server_command(server, port), cwd=ROOT, env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{server} server exited with code {process.returncode}")
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/health', timeout=1).json().get('ready'):
+                return process
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError(f"{server} server did not become ready in {args.startup_timeout}s")
+
+
+def stop_server(process):
+    """SIGTERM the server's process group (gunicorn shuts workers down gracefully)"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', nargs='+', default=['dev', 'gunicorn', 'asgi'],
+                        choices=['dev', 'gunicorn', 'asgi'])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and level')
+    parser.add_argument('--size', type=int, default=5, help='Body size of the generated documents')
+    parser.add_argument('--endpoints', nargs='+', default=['upload', 'summarize'],
+                        choices=['upload', 'summarize'])
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5101, help='First port; one per server')
+    parser.add_argument('--warmup', default='eager', help='MODEL_WARMUP for the servers')
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    parser.add_argument('--output', help='Directory for the JSON results')
+    args = parser.parse_args()
+
+    results = {
+        'requests': args.requests,
+        'size': args.size,
+        'workers': args.workers,
+        'threads': args.threads,
+        'servers': {}
+    }
+    offset = 0
+    for number, server in enumerate(args.servers):
+        port = args.port + number
+        base = f'http://127.0.0.1:{port}'
+        process = start_server(server, port, args)
+        session = requests.Session()
+        session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=max(args.concurrency)))
+
+        def document(index):
+            kind = DOCUMENT_KINDS[(offset + index) % len(DOCUMENT_KINDS)]
+            return kind, make_document(kind, offset + index, args.size)
+
+        def upload(index):
+            kind, text = document(index)
+            files = {'file': (f'{kind}-{offset + index}.txt', text.encode())}
+            return session.post(f'{base}/upload', files=files).status_code
+
+        def summarize(index):
+            kind, text = document(index)
+            return session.post(f'{base}/summarize', json={'text': text, 'document_type': kind}).status_code
+
+        calls = {'upload': upload, 'summarize': summarize}
+        try:
+            endpoints = {}
+            for endpoint in args.endpoints:
+                levels = []
+                for concurrency in args.concurrency:
+                    level = run_level(calls[endpoint], args.requests, concurrency)
+                    offset += args.requests
+                    levels.append(level)
+                    print(f"{server:8s} /{endpoint:10s} c={concurrency:<3d} p50 {level['p50_ms']:9.2f} ms  "
+                          f"p95 {level['p95_ms']:9.2f} ms  p99 {level['p99_ms']:9.2f} ms  "
+                          f"{level['requests_per_second']:9.2f} req/s  errors {level['errors']}")
+                endpoints[endpoint] = levels
+            results['servers'][server] = endpoints
+        finally:
+            session.close()
+            stop_server(process)
+
+    print(f"Saved to {save_results('serving', results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Compare summarizer inference backends on latency, throughput and memory.
+
+    python -m benchmarks.bench_summarizer_backends --backends torch quantized onnx
+    python -m benchmarks.bench_summarizer_backends --model distilled --threads 4
+
+Each backend is measured in its own subprocess so resident memory is not
+shared between them. Backends whose libraries are missing are reported
+as failed rather than stopping the run.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.common import latency_summary, save_results
+
+
+def make_text(index):
+    return (
+        f"The supplier agreement number {index} sets out the terms under which the vendor "
+        f"delivers development and design services to the client. Payment is due within "
+        f"thirty days of each invoice and late payments accrue interest at two percent per "
+        f"month. Either party may terminate the agreement with sixty days written notice. "
+        f"The vendor keeps all intellectual property created before the agreement, while "
+        f"work produced under it belongs to the client once paid in full. Disputes are "
+        f"settled by arbitration in Mumbai under the laws of India."
+    )
+
+
+def current_rss_mb():
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return round(pages * resource.getpagesize() / 1024 / 1024, 1)
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def measure(backend, model, threads, requests, batch_size):
+    """Runs inside the subprocess; returns this backend's measurements"""
+    from ml.summarizer import TextSummarizer
+
+    baseline_rss = current_rss_mb()
+    summarizer = TextSummarizer(load_model=False, backend=backend, model_name=model, threads=threads)
+    if not summarizer.load_model():
+        return {'backend': backend, 'status': 'failed', 'error': 'model could not be loaded'}
+    loaded_rss = current_rss_mb()
+
+    texts = [make_text(i) for i in range(requests)]
+    summarizer._run_pipeline_batch(texts[:1], max_length=80, min_length=20)
+
+    latencies = []
+    for text in texts:
+        started = time.perf_counter()
+        summarizer._run_pipeline_batch([text], max_length=80, min_length=20)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for offset in range(0, requests, batch_size):
+        summarizer._run_pipeline_batch(texts[offset:offset + batch_size], max_length=80, min_length=20)
+    batch_elapsed = time.perf_counter() - started
+
+    return {
+        'backend': backend,
+        'model': summarizer.model_name,
+        'threads': threads,
+        'status': 'success',
+        'load_seconds': summarizer.model_load_time,
+        'single_request': latency_summary(latencies),
+        'single_docs_per_second': round(requests / sum(latencies), 2),
+        'batch_size': batch_size,
+        'batch_docs_per_second': round(requests / batch_elapsed, 2),
+        'rss_baseline_mb': baseline_rss,
+        'rss_loaded_mb': loaded_rss,
+        'rss_peak_mb': peak_rss_mb()
+    }
+
+
+def run_backend(backend, args):
+    command = [
+        sys.executable, '-m', 'benchmarks.bench_summarizer_backends',
+        '--child', backend,
+        '--requests', str(args.requests),
+        '--batch-size', str(args.batch_size)
+    ]
+    if args.model:
+        command += ['--model', args.model]
+    if args.threads:
+        command += ['--threads', str(args.threads)]
+
+    completed = subprocess.run(command, capture_output=True, text=True)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    return {
+        'backend': backend,
+        'status': 'failed',
+        'error': (completed.stderr.strip().splitlines() or ['no output'])[-1]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', default=['torch', 'quantized', 'onnx'])
+    parser.add_argument('--model', help="Model name, or 'distilled' (default: SUMMARIZER_MODEL or BART)")
+    parser.add_argument('--threads', type=int, help='CPU threads per backend')
+    parser.add_argument('--requests', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = measure(args.child, args.model, args.threads, args.requests, args.batch_size)
+        print(json.dumps(result))
+        return
+
+    results = [run_backend(backend, args) for backend in args.backends]
+    for result in results:
+        if result['status'] != 'success':
+            print(f"{result['backend']:10s} failed: {result['error']}")
+            continue
+        print(
+            f"{result['backend']:10s} p50 {result['single_request']['p50_ms']:9.1f} ms  "
+            f"batch {result['batch_docs_per_second']:7.2f} docs/s  "
+            f"peak RSS {result['rss_peak_mb']:8.1f} MB"
+        )
+    print(f"Saved to {save_results('summarizer_backends', results)}")
+
+
+if __name__ == '__main__':
+    main()
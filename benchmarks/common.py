@@ -0,0 +1,69 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks run from the repository root, e.g.::
+
+    python -m benchmarks.bench_batch_upload
+"""
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Modules import each other relative to src/, as they do under app.py
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (pct in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/mean of a list of latencies, in milliseconds"""
+    ms = [s * 1000 for s in seconds]
+    return {
+        'count': len(ms),
+        'mean_ms': round(sum(ms) / len(ms), 3) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3)
+    }
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    """Run ``func`` ``repeat`` times and return (last result, list of seconds)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.append(time.perf_counter() - started)
+    return result, timings
+
+
+def save_results(name, results, output_dir=None):
+    """Write results as JSON, with enough context to compare runs later"""
+    output_dir = output_dir or RESULTS_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    payload = {
+        'benchmark': name,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+    path = os.path.join(output_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    return path
@@ -0,0 +1,158 @@
+"""Synthetic invoices, resumes, PAN and Aadhaar documents for benchmarks.
+
+Documents are generated from a seeded random source, so the same
+``(kind, index, size)`` always produces the same text. ``size`` scales the
+body: the number of line items, jobs or repeated detail blocks.
+"""
+import random
+
+from benchmarks.common import SRC  # noqa: F401  (puts src/ on sys.path)
+from validators.field_validator import (
+    GSTIN_CHARSET, VERHOEFF_MULTIPLY, VERHOEFF_PERMUTE, gstin_check_digit
+)
+
+DOCUMENT_KINDS = ('invoice', 'resume', 'pan', 'aadhar')
+
+FIRST_NAMES = ('Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Meera', 'Arjun', 'Kavya')
+LAST_NAMES = ('Sharma', 'Iyer', 'Patel', 'Reddy', 'Gupta', 'Nair', 'Singh', 'Das')
+SERVICES = ('Development services', 'Design services', 'Cloud hosting', 'Support retainer',
+            'Data migration', 'Security audit', 'Product consulting', 'QA testing')
+SKILLS = ('Python', 'SQL', 'Kubernetes', 'React', 'Machine learning', 'Spark', 'Go', 'AWS')
+
+
+def _letters(rng, count):
+    return ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(count))
+
+
+def _digits(rng, count):
+    return ''.join(rng.choice('0123456789') for _ in range(count))
+
+
+def make_pan(rng):
+    return f"{_letters(rng, 5)}{_digits(rng, 4)}{_letters(rng, 1)}"
+
+
+def make_gstin(rng):
+    body = f"{rng.randint(1, 37):02d}{make_pan(rng)}{rng.choice(GSTIN_CHARSET[1:])}Z"
+    return body + gstin_check_digit(body + '0')
+
+
+def make_aadhar_number(rng):
+    """Twelve digits with a valid Verhoeff check digit"""
+    digits = str(rng.randint(2, 9)) + _digits(rng, 10)
+    check = 0
+    for position, digit in enumerate(reversed(digits)):
+        check = VERHOEFF_MULTIPLY[check][VERHOEFF_PERMUTE[(position + 1) % 8][int(digit)]]
+    inverse = (0, 4, 3, 2, 1, 5, 6, 7, 8, 9)[check]
+    number = digits + str(inverse)
+    return f"{number[:4]} {number[4:8]} {number[8:]}"
+
+
+def make_phone(rng):
+    return rng.choice('6789') + _digits(rng, 9)
+
+
+def make_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def make_invoice(rng, index, size):
+    lines = [
+        "INVOICE",
+        f"Company: {rng.choice(LAST_NAMES)} Technologies Pvt Ltd",
+        f"Invoice Number: INV-{index:06d}",
+        f"Date: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+        f"GSTIN: {make_gstin(rng)}",
+        f"Bill To: {make_name(rng)}, contact {make_phone(rng)}, billing{index}@example.com",
+    ]
+    subtotal = 0
+    for item in range(max(1, size)):
+        amount = rng.randint(5, 500) * 100
+        subtotal += amount
+        lines.append(f"{item + 1}. {rng.choice(SERVICES)} for the period delivered as agreed: "
+                     f"Rs. {amount:,}.00")
+    tax = subtotal * 18 // 100
+    lines += [
+        f"Subtotal: Rs. {subtotal:,}.00",
+        f"GST 18 percent tax: Rs. {tax:,}.00",
+        f"Total amount: ₹{subtotal + tax:,}.00 payable within 30 days.",
+    ]
+    return '\n'.join(lines)
+
+
+def make_resume(rng, index, size):
+    name = make_name(rng)
+    lines = [
+        f"{name}",
+        f"Email: {name.split()[0].lower()}{index}@example.com Phone: {make_phone(rng)}",
+        "Professional summary: software engineer with experience building data platforms.",
+        "Experience",
+    ]
+    for job in range(max(1, size)):
+        years = rng.randint(1, 6)
+        lines.append(
+            f"Worked {years} years as a senior developer at {rng.choice(LAST_NAMES)} Systems, "
+            f"leading a team that shipped {rng.choice(SERVICES).lower()} used by {rng.randint(2, 90)} "
+            f"clients. Employment from {2010 + job} to {2011 + job + years}."
+        )
+    lines += [
+        "Education",
+        f"B.Tech in Computer Science, {rng.choice(LAST_NAMES)} Institute of Technology, 2012",
+        "Skills",
+        ', '.join(rng.sample(SKILLS, 5)),
+    ]
+    return '\n'.join(lines)
+
+
+def make_pan_card(rng, index, size):
+    name = make_name(rng)
+    lines = [
+        "INCOME TAX DEPARTMENT GOVT. OF INDIA",
+        "Permanent Account Number Card",
+        f"Name: {name}",
+        f"Father's Name: {make_name(rng)}",
+        f"Date of Birth: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/19{rng.randint(60, 99)}",
+        f"PAN: {make_pan(rng)}",
+    ]
+    for _ in range(max(0, size - 1)):
+        lines.append("This card is the property of the Income Tax Department and the permanent "
+                     "account number must be quoted in all tax transactions.")
+    return '\n'.join(lines)
+
+
+def make_aadhar_card(rng, index, size):
+    name = make_name(rng)
+    lines = [
+        "Unique Identification Authority of India",
+        "Government of India - Aadhaar",
+        f"Name: {name}",
+        f"DOB: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/19{rng.randint(60, 99)}",
+        f"Aadhaar number: {make_aadhar_number(rng)}",
+        f"Mobile: {make_phone(rng)}",
+    ]
+    for _ in range(max(0, size - 1)):
+        lines.append("Aadhaar is proof of identity, not of citizenship. Verify identity using "
+                     "secure QR code or online authentication.")
+    return '\n'.join(lines)
+
+
+GENERATORS = {
+    'invoice': make_invoice,
+    'resume': make_resume,
+    'pan': make_pan_card,
+    'aadhar': make_aadhar_card,
+}
+
+
+def make_document(kind, index=0, size=5, seed=0):
+    """Deterministic synthetic document text of the given kind"""
+    rng = random.Random(f"{seed}:{kind}:{index}:{size}")
+    return GENERATORS[kind](rng, index, size)
+
+
+def make_corpus(count, size=5, kinds=DOCUMENT_KINDS, seed=0):
+    """``count`` documents cycling through ``kinds``, as (kind, text) pairs"""
+    return [
+        (kinds[index % len(kinds)], make_document(kinds[index % len(kinds)], index, size, seed))
+        for index in range(count)
+    ]
@@ -0,0 +1,83 @@
+"""Production server settings: ``gunicorn app:app`` from the repository root.
+
+The application (OCR engine, classifier, and the summarization model) is
+imported and loaded once in the master process and then forked into the
+workers, which share the model's memory copy-on-write. Every setting can
+be overridden from the environment.
+
+For the async variant, run the ASGI adapter under uvicorn workers:
+
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:application
+"""
+import gc
+import multiprocessing
+import os
+
+# Modules import each other relative to src/
+pythonpath = 'src'
+
+bind = os.getenv('BIND', f"0.0.0.0:{os.getenv('PORT', '5001')}")
+
+# Each worker holds its own references to the shared model; the default
+# stays small because copy-on-write sharing degrades as pages are touched
+workers = int(os.getenv('WEB_WORKERS', min(4, multiprocessing.cpu_count())))
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_class = os.getenv('WEB_WORKER_CLASS', 'gthread')
+# Each request runs at most two pipeline stages at once; the stage pool
+# is shared by a worker's request threads
+os.environ.setdefault('STAGE_WORKERS', str(max(8, 2 * threads)))
+
+# Load the app, including the model, before forking
+preload_app = True
+
+timeout = int(os.getenv('WEB_TIMEOUT', 300))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 60))
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+# Recycle workers now and then to bound memory growth; 0 disables
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max(1, max_requests // 10) if max_requests else 0
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-')
+
+# The model must be in memory before the fork to be shared; a background
+# warm-up thread would not survive it
+os.environ.setdefault('MODEL_WARMUP', 'eager')
+os.environ['SMARTDOC_PREFORK'] = '1'
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the garbage collector's reach,
+    # so collections in the workers do not write to (and copy) shared pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from core.registry import get_registry
+    from app import app
+
+    threads_per_model = os.getenv('SUMMARIZER_THREADS')
+    if threads_per_model:
+        try:
+            import torch
+            torch.set_num_threads(int(threads_per_model))
+        except ImportError:
+            pass
+
+    if app.config['UPLOAD_MODE'] == 'async':
+        # Workers share the job store; the first one spawned resumes jobs
+        # a previous server left unfinished
+        get_registry().start_jobs(recover=worker.age == 1)
+    get_registry().start_retention()
+
+
+def worker_exit(server, worker):
+    # In-flight requests have finished (or graceful_timeout expired); stop
+    # the worker's process pools. Unfinished jobs stay in the job store.
+    from core.registry import get_registry
+    registry = get_registry()
+    if registry.retention is not None:
+        registry.retention.stop()
+    if registry.jobs_started():
+        registry.job_manager.shutdown()
+    registry.ocr_engine.shutdown()
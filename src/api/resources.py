@@ -1,8 +1,13 @@
-from flask import request, current_app
+from flask import request, current_app, Response, stream_with_context
 from flask_restful import Resource
 import os
+import shutil
+import time
 import uuid
 import sys
+import zipfile
+import zlib
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import json
 
@@ -12,22 +17,52 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 # Import modules
-from ocr.ocr_engine import OCREngine
-from ml.document_classifier import DocumentClassifier
-from ml.summarizer import TextSummarizer
-from validators.field_extractor import FieldExtractor
-from validators.field_validator import FieldValidator
-from utils.text_cleaner import TextCleaner
+from core.registry import get_registry
+from core.pipeline import STAGES, DocumentPipeline, cacheable
+from core.jobs import QueueFullError
+from core.upload_store import CHUNK_SIZE, HashingFile
+from utils.metrics import get_metrics, record_stage_timings, stage_timer
+from utils.tracing import child_span, get_tracer, trace_context
+
+# Bump whenever a change to the pipeline alters its output, so results
+# cached by an older version are not served
+PIPELINE_VERSION = '4'
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'bmp', 'tiff', 'txt'}
+
+def format_size(size):
+    for unit in ('bytes', 'KB', 'MB'):
+        if size < 1024 or unit == 'MB':
+            break
+        size /= 1024
+    return f"{size:.4g} bytes" if unit == 'bytes' else f"{size:.4g}{unit}"
+
+class ArchiveTooLarge(Exception):
+    """A zip upload that would expand past BATCH_MAX_UNCOMPRESSED_BYTES"""
+
+class TooManyDocuments(Exception):
+    """A batch holding more than BATCH_MAX_FILES documents"""
+
+def payload_too_large():
+    """413 response naming the configured upload limit"""
+    limit = current_app.config['MAX_CONTENT_LENGTH']
+    return {'error': f'File too large. Maximum size is {format_size(limit)}.'}, 413
 
 class FileUploadResource(Resource):
-    def __init__(self):
-        self.ocr_engine = OCREngine()
-        self.classifier = DocumentClassifier()
-        self.summarizer = TextSummarizer()
-        self.field_extractor = FieldExtractor()
-        self.field_validator = FieldValidator()
-        self.text_cleaner = TextCleaner()
-        self.allowed_extensions = {'png', 'jpg', 'jpeg', 'pdf', 'bmp', 'tiff', 'txt'}
+    def __init__(self, registry=None):
+        registry = registry or get_registry()
+        self.ocr_engine = registry.ocr_engine
+        self.classifier = registry.classifier
+        self.summarizer = registry.summarizer
+        self.field_extractor = registry.field_extractor
+        self.field_validator = registry.field_validator
+        self.text_cleaner = registry.text_cleaner
+        self.result_cache = registry.result_cache
+        self.document_store = registry.document_store
+        self.upload_store = registry.upload_store
+        self.pipeline = DocumentPipeline(registry)
+        self.registry = registry
+        self.allowed_extensions = ALLOWED_EXTENSIONS
     
     def allowed_file(self, filename):
         return '.' in filename and \
@@ -51,123 +86,523 @@ class FileUploadResource(Resource):
                     'supported_types': list(self.allowed_extensions)
                 }, 400
             
-            # Generate unique filename
-            original_filename = secure_filename(file.filename)
-            file_extension = original_filename.rsplit('.', 1)[1].lower()
-            unique_filename = f"{uuid.uuid4()}.{file_extension}"
+            try:
+                stages = self.requested_stages()
+            except ValueError as e:
+                return {'error': str(e), 'supported_stages': list(STAGES.stages)}, 400
             
-            # Save file
-            upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(upload_path)
+            started = time.perf_counter()
+            timings = {}
             
-            # Process the document
-            result = self.process_document(upload_path, original_filename)
-            result['file_id'] = unique_filename.split('.')[0]
+            # The body was written to disk and hashed while it was parsed;
+            # identical content is stored once
+            original_filename = secure_filename(file.filename)
+            with stage_timer('save', timings):
+                upload_path, content_hash = self.store_upload(file)
+            if upload_path is None:
+                return {
+                    'error': 'File content does not match a supported type',
+                    'supported_types': list(self.allowed_extensions)
+                }, 400
+            file_id = str(uuid.uuid4())
+            
+            if request.args.get('stream') == 'true':
+                return self.stream_document(
+                    upload_path, original_filename, file_id,
+                    include_text=request.args.get('include_text') == 'true',
+                    include_timings=request.args.get('timings') == 'true',
+                    stages=stages
+                )
+            
+            # Identical uploads are served from the result cache
+            with stage_timer('cache_lookup', timings):
+                cache_key = self.cache_key(content_hash, stages)
+                result = self.result_cache.get(cache_key)
+            
+            if result is None and self.async_requested():
+                return self.enqueue_document(upload_path, original_filename, file_id, cache_key, stages)
+            
+            if result is None:
+                result = self.process_document(upload_path, original_filename, stages)
+                timings.update(result.pop('timings', {}))
+                if cacheable(result):
+                    self.result_cache.set(cache_key, result)
+                result['cache_hit'] = False
+            else:
+                result['filename'] = original_filename
+                result['cache_hit'] = True
+            
+            result['file_id'] = file_id
+            
+            # Index the text and results so /extract never re-runs OCR
+            with stage_timer('store', timings):
+                self.document_store.put_result(file_id, upload_path, original_filename, result)
+            
+            if request.args.get('include_text') != 'true':
+                result.pop('extracted_text', None)
+            
+            if request.args.get('timings') == 'true':
+                timings['total'] = round((time.perf_counter() - started) * 1000, 3)
+                result['timings'] = timings
             
             return result, 200
             
+        except RequestEntityTooLarge:
+            return payload_too_large()
         except Exception as e:
             return {'error': f'Processing failed: {str(e)}'}, 500
     
-    def process_document(self, file_path, original_filename):
-        """Process uploaded document through the entire pipeline"""
-        result = {
-            'filename': original_filename,
-            'status': 'processing'
+    def store_upload(self, file):
+        """Keep an uploaded file in the upload store; returns (path, content hash).
+
+        The path is None when the content is not a supported type.
+        """
+        if isinstance(file.stream, HashingFile):
+            return self.commit_upload(file.stream)
+        with self.upload_store.temporary_file() as upload:
+            shutil.copyfileobj(file.stream, upload, CHUNK_SIZE)
+            return self.commit_upload(upload)
+    
+    def commit_upload(self, upload):
+        """Store a received ``HashingFile`` under the type its content has"""
+        file_type = self.content_type(upload)
+        if file_type is None:
+            return None, upload.sha256
+        path, _ = self.upload_store.commit(upload, file_type)
+        return path, upload.sha256
+    
+    def content_type(self, upload):
+        """Supported file type of an upload, going by its content alone.
+
+        The stored file is named after its content hash and this type, so
+        identical content is kept once whatever extension it was sent with
+        (``.jpeg`` uploads are stored as ``.jpg``).
+        """
+        file_type = upload.file_type
+        return file_type if file_type in self.allowed_extensions else None
+    
+    def async_requested(self):
+        mode = request.args.get('async')
+        if mode is None:
+            return current_app.config.get('UPLOAD_MODE') == 'async'
+        return mode == 'true'
+    
+    def requested_stages(self):
+        """Stages asked for with ``?stages=ocr,classify,...`` plus the ones they
+        depend on, or None for the whole pipeline"""
+        names = [name.strip() for name in request.args.get('stages', '').split(',') if name.strip()]
+        if not names:
+            return None
+        stages = STAGES.resolve(names)
+        return None if len(stages) == len(STAGES.stages) else stages
+    
+    def enqueue_document(self, file_path, original_filename, file_id, cache_key, stages=None):
+        """Hand the document to the job workers and answer 202 right away"""
+        options = {
+            'cache_key': cache_key,
+            'include_text': request.args.get('include_text') == 'true',
+            'include_timings': request.args.get('timings') == 'true',
+            'stages': stages,
+            'trace': trace_context()
         }
-        
         try:
-            # Step 1: OCR Extraction
-            ocr_result = self.ocr_engine.extract_text(file_path)
-            if ocr_result['status'] != 'success':
-                result['status'] = 'failed'
-                result['error'] = ocr_result.get('error', 'OCR failed')
-                return result
-            
-            raw_text = ocr_result['text']
-            cleaned_text = self.text_cleaner.clean_text(raw_text)
-            
-            result['ocr'] = {
-                'confidence': ocr_result['confidence'],
-                'text_length': len(cleaned_text)
+            job = self.registry.job_manager.submit(file_id, file_path, original_filename, options)
+        except QueueFullError as e:
+            return {'error': str(e), 'file_id': file_id}, 503, {'Retry-After': '5'}
+        
+        return {
+            'job_id': job['job_id'],
+            'file_id': file_id,
+            'status': job['status'],
+            'status_url': f"/jobs/{job['job_id']}"
+        }, 202
+    
+    def stream_document(self, file_path, original_filename, file_id, include_text=False,
+                        include_timings=False, stages=None):
+        """Process a document page by page, streaming NDJSON events.
+
+        One ``page`` event is emitted per OCR'd page with the fields found
+        on it, followed by a final ``document`` event carrying the same
+        result a regular upload returns. Only one page image (per OCR
+        worker) is held in memory at a time.
+        """
+        scores = None
+        page_texts = []
+        page_confidences = []
+        seen = {}
+        
+        def page_event(page):
+            nonlocal scores
+            page_text = self.text_cleaner.clean_text(page['text'])
+            page_texts.append(page_text)
+            page_confidences.append(page['confidence'])
+            
+            # Keyword scores add up across pages, so the running
+            # type is what the whole document so far classifies as
+            page_scores = self.classifier.score_text(page_text)
+            scores = page_scores if scores is None else {
+                doc_type: scores[doc_type] + page_scores[doc_type] for doc_type in scores
             }
+            document_type = self.classifier.classify_scores(scores)['document_type']
+            
+            new_fields = {}
+            for field, values in self.field_extractor.extract_all_fields(page_text, document_type).items():
+                known = seen.setdefault(field, set())
+                fresh = [value for value in values if value not in known]
+                known.update(fresh)
+                if fresh:
+                    new_fields[field] = fresh
+            
+            event = {
+                'event': 'page',
+                'page': page['page'],
+                'confidence': page['confidence'],
+                'document_type': document_type,
+                'fields': new_fields
+            }
+            if include_text:
+                event['text'] = page_text
+            return event
+        
+        def generate():
+            ocr_seconds = 0.0
+            try:
+                pages = iter(self.ocr_engine.iter_pages(file_path))
+                while True:
+                    ocr_started = time.perf_counter()
+                    page = next(pages, None)
+                    ocr_seconds += time.perf_counter() - ocr_started
+                    if page is None:
+                        break
+                    with child_span('upload.page', page=page['page'], confidence=page['confidence']):
+                        event = page_event(page)
+                    yield json.dumps(event) + '\n'
+                
+                # Pages were OCR'd between events, outside the pipeline's timers
+                ocr_ms = round(ocr_seconds * 1000, 3)
+                record_stage_timings({'ocr': ocr_ms})
+                cleaned_text = ' '.join(text for text in page_texts if text)
+                result = self.analyze_text(cleaned_text, original_filename, stages)
+                result['ocr'] = {
+                    'confidence': round(sum(page_confidences) / len(page_confidences), 2)
+                    if page_confidences else 0,
+                    'text_length': len(cleaned_text),
+                    'page_count': len(page_confidences),
+                    'page_confidence': page_confidences
+                }
+                result['file_id'] = file_id
+                timings = dict(result.pop('timings', None) or {}, ocr=ocr_ms)
+                self.document_store.put_result(file_id, file_path, original_filename, result)
+                
+                if not include_text:
+                    result.pop('extracted_text', None)
+                if include_timings:
+                    result['timings'] = timings
+                result['event'] = 'document'
+                yield json.dumps(result) + '\n'
+            
+            except Exception as e:
+                yield json.dumps({
+                    'event': 'error',
+                    'file_id': file_id,
+                    'error': f'Processing failed: {str(e)}'
+                }) + '\n'
+        
+        # The body is produced after the handler returned: keep the request
+        # context for it, and the trace open until the last event
+        return Response(
+            stream_with_context(get_tracer().stream(generate())),
+            mimetype='application/x-ndjson'
+        )
+    
+    def cache_key(self, content_hash, stages=None):
+        """Content hash of the file plus everything that shapes the result"""
+        # Summaries produced by the rule-based fallback while the model is
+        # still loading must not be served once it is ready
+        summary_mode = self.summarizer.cache_tag if self.summarizer.model_loaded else 'rule_based'
+        key = f"{content_hash}:{PIPELINE_VERSION}:{summary_mode}"
+        # Results of a subset of the stages are cached apart from full ones
+        return f"{key}:{'+'.join(stages)}" if stages else key
+    
+    def process_document(self, file_path, original_filename, stages=None):
+        """Process uploaded document through the entire pipeline"""
+        return self.pipeline.process_document(file_path, original_filename, stages)
+    
+    def analyze_text(self, cleaned_text, original_filename, stages=None):
+        """Run the text stages of the pipeline on already cleaned text"""
+        return self.pipeline.analyze_text(cleaned_text, original_filename, stages)
+
+class BatchUploadResource(FileUploadResource):
+    def post(self):
+        """Upload and process many documents, or a zip archive of them, at once"""
+        try:
+            files = request.files.getlist('files') + request.files.getlist('file')
+            files = [f for f in files if f.filename]
+            if not files:
+                return {'error': 'No files provided'}, 400
+            
+            try:
+                stages = self.requested_stages()
+            except ValueError as e:
+                return {'error': str(e), 'supported_stages': list(STAGES.stages)}, 400
+            
+            started = time.perf_counter()
+            include_text = request.args.get('include_text') == 'true'
+            max_files = current_app.config['BATCH_MAX_FILES']
+            
+            # Save everything first; entries keep submission order, with
+            # archive members expanded in place. The document count is
+            # checked before each file or archive is stored.
+            entries = []
+            for file in files:
+                if file.filename.lower().endswith('.zip'):
+                    entries.extend(self.save_archive(file, max_files - len(entries)))
+                    continue
+                if len(entries) >= max_files:
+                    raise TooManyDocuments(f'Too many documents (maximum {max_files})')
+                if self.allowed_file(file.filename):
+                    original_filename = secure_filename(file.filename)
+                    upload_path, content_hash = self.store_upload(file)
+                    entries.append(self.batch_entry(original_filename, upload_path, content_hash))
+                else:
+                    entries.append({'filename': file.filename, 'error': 'File type not supported'})
+            
+            # Serve duplicates from the cache and process each distinct
+            # document once, all of them together
+            to_process = {}
+            for entry in entries:
+                if 'error' in entry:
+                    continue
+                entry['cache_key'] = self.cache_key(entry['content_hash'], stages)
+                if entry['cache_key'] in to_process:
+                    to_process[entry['cache_key']].append(entry)
+                    continue
+                entry['result'] = self.result_cache.get(entry['cache_key'])
+                if entry['result'] is None:
+                    to_process[entry['cache_key']] = [entry]
+                else:
+                    entry['result']['filename'] = entry['filename']
+                    entry['result']['cache_hit'] = True
+            
+            groups = list(to_process.values())
+            processed = self.pipeline.process_batch(
+                [(group[0]['path'], group[0]['filename']) for group in groups],
+                stages=stages
+            ) if groups else []
+            
+            include_timings = request.args.get('timings') == 'true'
+            for group, result in zip(groups, processed):
+                timings = result.pop('timings', None)
+                if cacheable(result):
+                    self.result_cache.set(group[0]['cache_key'], result)
+                for position, entry in enumerate(group):
+                    entry['result'] = dict(result, filename=entry['filename'], cache_hit=position > 0)
+                if include_timings:
+                    group[0]['result']['timings'] = timings
+            
+            results = []
+            for index, entry in enumerate(entries):
+                if 'error' in entry:
+                    results.append({
+                        'index': index,
+                        'filename': entry['filename'],
+                        'status': 'failed',
+                        'error': entry['error']
+                    })
+                    continue
+                
+                result = entry['result']
+                result['file_id'] = entry['file_id']
+                self.document_store.put_result(entry['file_id'], entry['path'], entry['filename'], result)
+                if not include_text:
+                    result.pop('extracted_text', None)
+                result['index'] = index
+                results.append(result)
+            
+            succeeded = sum(1 for result in results if result['status'] == 'completed')
             
-            # Step 2: Document Classification
-            classification = self.classifier.classify_document(cleaned_text)
-            result['classification'] = classification
-            
-            document_type = classification['document_type']
-            
-            # Step 3: Field Extraction
-            extracted_fields = self.field_extractor.extract_all_fields(
-                cleaned_text, document_type
-            )
-            result['extracted_fields'] = extracted_fields
-            
-            # Step 4: Field Validation
-            validation_results = self.field_validator.validate_extracted_fields(
-                extracted_fields, document_type
-            )
-            result['validation'] = validation_results
+            return {
+                'status': 'completed',
+                'count': len(results),
+                'succeeded': succeeded,
+                'failed': len(results) - succeeded,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+                'results': results
+            }, 200
             
-            # Step 5: Text Summarization
-            summary = self.summarizer.summarize_text(cleaned_text, document_type)
-            result['summary'] = summary
+        except zipfile.BadZipFile as e:
+            return {'error': f'Invalid zip archive: {e}'}, 400
+        except TooManyDocuments as e:
+            return {'error': str(e)}, 400
+        except ArchiveTooLarge as e:
+            return {'error': str(e)}, 413
+        except RequestEntityTooLarge:
+            return payload_too_large()
+        except Exception as e:
+            return {'error': f'Processing failed: {str(e)}'}, 500
+    
+    def save_archive(self, file, max_entries):
+        """Extract the supported documents of a zip upload into the upload folder.
+        
+        The archive's directory is checked against ``max_entries`` and
+        BATCH_MAX_UNCOMPRESSED_BYTES before any member is extracted.
+        """
+        max_bytes = current_app.config['BATCH_MAX_UNCOMPRESSED_BYTES']
+        entries = []
+        
+        with zipfile.ZipFile(file.stream) as archive:
+            members = [m for m in archive.infolist() if not m.is_dir()]
+            if len(members) > max_entries:
+                max_files = current_app.config['BATCH_MAX_FILES']
+                raise TooManyDocuments(f'Too many documents (maximum {max_files})')
+            if sum(m.file_size for m in members) > max_bytes:
+                raise ArchiveTooLarge(
+                    f'Archive too large. Maximum uncompressed size is {format_size(max_bytes)}.'
+                )
+            
+            for member in members:
+                original_filename = secure_filename(os.path.basename(member.filename))
+                if not self.allowed_file(original_filename):
+                    entries.append({'filename': member.filename, 'error': 'File type not supported'})
+                    continue
+                
+                try:
+                    with archive.open(member) as source, self.upload_store.temporary_file() as upload:
+                        shutil.copyfileobj(source, upload, CHUNK_SIZE)
+                        upload_path, content_hash = self.commit_upload(upload)
+                except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError) as e:
+                    # Corrupt, encrypted or unsupported member; the rest of
+                    # the archive is still processed
+                    entries.append({'filename': member.filename, 'error': f'Could not extract from archive: {e}'})
+                    continue
+                entries.append(self.batch_entry(original_filename, upload_path, content_hash))
+        
+        return entries
+    
+    @staticmethod
+    def batch_entry(original_filename, upload_path, content_hash):
+        if upload_path is None:
+            return {'filename': original_filename, 'error': 'File content does not match a supported type'}
+        return {
+            'filename': original_filename,
+            'path': upload_path,
+            'content_hash': content_hash,
+            'file_id': str(uuid.uuid4())
+        }
+
+class JobResource(Resource):
+    def __init__(self, registry=None):
+        self.registry = registry or get_registry()
+    
+    def get(self, job_id):
+        """Poll an upload job"""
+        try:
+            # Read from the shared store: polling must not start job workers
+            job = self.registry.job_store.get(job_id)
+            if job is None:
+                return {'error': 'Job not found'}, 404
+            
+            response = {
+                'job_id': job['job_id'],
+                'file_id': job['file_id'],
+                'filename': job['filename'],
+                'status': job['status'],
+                'created': job['created'],
+                'started': job['started'],
+                'finished': job['finished']
+            }
+            if job['result'] is not None:
+                response['result'] = job['result']
+            if job['error']:
+                response['error'] = job['error']
             
-            # Optional: Include original text for debugging
-            if request.args.get('include_text') == 'true':
-                result['extracted_text'] = cleaned_text
+            return response, 200
             
-            result['status'] = 'completed'
+        except Exception as e:
+            return {'error': str(e)}, 500
+    
+    def delete(self, job_id):
+        """Cancel a queued or running job, or remove a finished one"""
+        try:
+            if self.registry.jobs_started():
+                job = self.registry.job_manager.delete(job_id)
+            else:
+                # The job belongs to another process's workers, which see
+                # the cancellation in the shared store
+                job = self.registry.job_store.cancel(job_id)
+                if job is not None:
+                    self.registry.job_store.delete(job_id)
+            if job is None:
+                return {'error': 'Job not found'}, 404
             
-            return result
+            return {
+                'job_id': job_id,
+                'status': 'cancelled' if job['status'] == 'cancelled' else 'deleted'
+            }, 200
             
         except Exception as e:
-            result['status'] = 'failed'
-            result['error'] = str(e)
-            return result
+            return {'error': str(e)}, 500
 
 class ExtractTextResource(Resource):
-    def __init__(self):
-        self.ocr_engine = OCREngine()
-        self.text_cleaner = TextCleaner()
+    def __init__(self, registry=None):
+        registry = registry or get_registry()
+        self.ocr_engine = registry.ocr_engine
+        self.text_cleaner = registry.text_cleaner
+        self.document_store = registry.document_store
     
     def get(self, file_id):
         """Get extracted text for a specific file"""
         try:
-            # Find the file
-            upload_folder = current_app.config['UPLOAD_FOLDER']
-            file_path = None
-            
-            for filename in os.listdir(upload_folder):
-                if filename.startswith(file_id):
-                    file_path = os.path.join(upload_folder, filename)
-                    break
+            record = self.document_store.get(file_id)
+            if record is None:
+                record = self.index_legacy_upload(file_id)
             
-            if not file_path or not os.path.exists(file_path):
+            if record is None:
                 return {'error': 'File not found'}, 404
             
-            # Extract text
-            ocr_result = self.ocr_engine.extract_text(file_path)
-            
-            if ocr_result['status'] != 'success':
-                return {'error': ocr_result.get('error', 'OCR failed')}, 500
-            
-            cleaned_text = self.text_cleaner.clean_text(ocr_result['text'])
+            if record['text'] is None:
+                error = (record['result'] or {}).get('error', 'OCR failed')
+                return {'error': error}, 500
             
             return {
                 'file_id': file_id,
-                'text': cleaned_text,
-                'confidence': ocr_result['confidence'],
+                'text': record['text'],
+                'confidence': record['confidence'],
                 'status': 'success'
             }, 200
             
         except Exception as e:
             return {'error': str(e)}, 500
+    
+    def index_legacy_upload(self, file_id):
+        """OCR an upload saved before the document store existed, once"""
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        safe_id = secure_filename(file_id)
+        if not safe_id:
+            return None
+        
+        for extension in ALLOWED_EXTENSIONS:
+            file_path = os.path.join(upload_folder, f"{safe_id}.{extension}")
+            if os.path.exists(file_path):
+                break
+        else:
+            return None
+        
+        ocr_result = self.ocr_engine.extract_text(file_path)
+        if ocr_result['status'] != 'success':
+            return {'text': None, 'result': {'error': ocr_result.get('error', 'OCR failed')}}
+        
+        cleaned_text = self.text_cleaner.clean_text(ocr_result['text'])
+        self.document_store.put(
+            file_id, file_path, os.path.basename(file_path),
+            text=cleaned_text, confidence=ocr_result['confidence']
+        )
+        return self.document_store.get(file_id)
 
 class SummarizeResource(Resource):
-    def __init__(self):
-        self.summarizer = TextSummarizer()
+    def __init__(self, registry=None):
+        registry = registry or get_registry()
+        self.summarizer = registry.summarizer
     
     def post(self):
         """Summarize provided text"""
@@ -195,8 +630,9 @@ class SummarizeResource(Resource):
             return {'error': str(e)}, 500
 
 class ValidateFieldsResource(Resource):
-    def __init__(self):
-        self.field_validator = FieldValidator()
+    def __init__(self, registry=None):
+        registry = registry or get_registry()
+        self.field_validator = registry.field_validator
     
     def post(self):
         """Validate specific fields"""
@@ -233,17 +669,159 @@ class ValidateFieldsResource(Resource):
         except Exception as e:
             return {'error': str(e)}, 500
 
+class ValidateBatchResource(Resource):
+    """Validate many records, given as a JSON array or as NDJSON.
+
+    Each record is an object such as ``{"id": "r1", "pan": "...",
+    "gstin": "..."}``. Results are streamed back as NDJSON, one ``record``
+    event per input in order, then a ``summary`` event with the counts and
+    throughput. NDJSON input is read line by line, so a request of any
+    size is validated in constant memory.
+    """
+    
+    # Records per chunk written to the response
+    FLUSH_EVERY = 500
+    
+    def __init__(self, registry=None):
+        registry = registry or get_registry()
+        self.field_validator = registry.field_validator
+    
+    def post(self):
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            records = self.read_ndjson(request.stream)
+        else:
+            data = request.get_json(silent=True)
+            if isinstance(data, dict):
+                data = data.get('records')
+            if not isinstance(data, list):
+                return {'error': 'Expected a JSON array of records or NDJSON'}, 400
+            records = iter(data)
+        
+        return Response(
+            stream_with_context(self.stream_results(records)),
+            mimetype='application/x-ndjson'
+        )
+    
+    @staticmethod
+    def read_ndjson(stream, block_size=64 * 1024):
+        """Yield one record per non-empty line; a bad line yields its error.
+        
+        The body is read in blocks and split here: reading the request
+        stream line by line is several times slower.
+        """
+        remainder = b''
+        while True:
+            block = stream.read(block_size)
+            lines = (remainder + block).split(b'\n')
+            remainder = lines.pop() if block else b''
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield ValueError(f"Invalid JSON: {e}")
+            if not block:
+                return
+    
+    def stream_results(self, records):
+        validate_record = self.field_validator.validate_record
+        started = time.perf_counter()
+        counts = {'valid': 0, 'invalid': 0, 'errors': 0}
+        lines = []
+        index = -1
+        
+        for index, record in enumerate(records):
+            if not isinstance(record, dict):
+                error = str(record) if isinstance(record, ValueError) else 'Record must be a JSON object'
+                event = {'event': 'error', 'index': index, 'error': error}
+                counts['errors'] += 1
+            else:
+                try:
+                    results = validate_record(record)
+                except Exception as e:
+                    # One bad record must not end the stream for the rest
+                    event = {'event': 'error', 'index': index, 'id': record.get('id'), 'error': str(e)}
+                    counts['errors'] += 1
+                else:
+                    is_valid = all(result['is_valid'] for result in results.values())
+                    event = {
+                        'event': 'record',
+                        'index': index,
+                        'id': record.get('id'),
+                        'is_valid': is_valid,
+                        'results': results
+                    }
+                    counts['valid' if is_valid else 'invalid'] += 1
+            lines.append(json.dumps(event))
+            
+            if len(lines) >= self.FLUSH_EVERY:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        
+        elapsed = time.perf_counter() - started
+        total = index + 1
+        lines.append(json.dumps({
+            'event': 'summary',
+            'records': total,
+            **counts,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'records_per_second': round(total / elapsed, 1) if elapsed > 0 else None
+        }))
+        yield '\n'.join(lines) + '\n'
+
 class HealthCheckResource(Resource):
+    def __init__(self, registry=None):
+        self.registry = registry or get_registry()
+    
     def get(self):
         """Health check endpoint"""
         return {
-            'status': 'healthy',
+            'status': 'healthy' if self.registry.is_loaded() else 'degraded',
             'service': 'SmartDoc API',
             'version': '1.0.0',
-            'components': {
-                'ocr': 'active',
-                'classifier': 'active',
-                'summarizer': 'active',
-                'validator': 'active'
-            }
+            'ready': self.registry.is_ready(),
+            'components': self.registry.status(),
+            'jobs': self.registry.job_manager.stats() if self.registry.jobs_started() else None,
+            'result_cache': self.registry.result_cache.stats()
         }, 200
+
+class MetricsResource(Resource):
+    def __init__(self, registry=None):
+        self.registry = registry or get_registry()
+    
+    def get(self):
+        """Prometheus metrics in the text exposition format"""
+        body = get_metrics().render(collectors=[self.registry.collect_metrics])
+        return Response(body, mimetype='text/plain; version=0.0.4')
+
+class StorageStatsResource(Resource):
+    def __init__(self, registry=None):
+        self.registry = registry or get_registry()
+    
+    def get(self):
+        """Upload storage use, deduplication and retention status"""
+        try:
+            stats = self.registry.upload_store.stats()
+            stats['documents'] = self.registry.document_store.count()
+            retention = self.registry.retention
+            stats['retention'] = retention.status() if retention is not None else {'enabled': False}
+            return stats, 200
+        except Exception as e:
+            return {'error': str(e)}, 500
+
+class ReadinessResource(Resource):
+    def __init__(self, registry=None):
+        self.registry = registry or get_registry()
+    
+    def get(self):
+        """Readiness probe: 503 until the model warm-up has finished"""
+        ready = self.registry.is_ready()
+        summarizer = self.registry.status()['summarizer']
+        
+        return {
+            'ready': ready,
+            'warmup_mode': self.registry.warmup_mode,
+            'summarizer': summarizer
+        }, 200 if ready else 503
@@ -0,0 +1,17 @@
+from flask import Request
+
+from core.registry import get_registry
+
+
+class StreamingUploadRequest(Request):
+    """Request whose multipart file parts go straight into the upload store.
+
+    Werkzeug parses multipart bodies incrementally and hands each file
+    part to ``_get_file_stream`` chunk by chunk. Writing those chunks into
+    a ``HashingFile`` in the upload folder keeps memory constant however
+    large the upload is, and leaves its hash and type known once parsed.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        return get_registry().upload_store.temporary_file()
@@ -2,38 +2,115 @@ from flask import Flask, request, jsonify, send_from_directory, render_template_
 from flask_restful import Api
 from flask_cors import CORS
 import os
+import time
 from dotenv import load_dotenv
 
 # Import API resources
 from api.resources import (
     FileUploadResource,
+    BatchUploadResource,
     ExtractTextResource,
     SummarizeResource,
     ValidateFieldsResource,
-    HealthCheckResource
+    ValidateBatchResource,
+    HealthCheckResource,
+    ReadinessResource,
+    MetricsResource,
+    StorageStatsResource,
+    JobResource,
+    payload_too_large
 )
+from api.uploads import StreamingUploadRequest
+from core.registry import get_registry
+from utils.metrics import get_metrics
+from utils.tracing import get_tracer
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
+# Multipart uploads are written to disk and hashed as they are parsed
+app.request_class = StreamingUploadRequest
 CORS(app)
 api = Api(app)
 
 # Configuration
 app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'uploads')
-app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 16777216))  # 16MB
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 268435456))  # 256MB
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key')
+# UPLOAD_MODE=async makes /upload queue a job and answer 202 by default
+app.config['UPLOAD_MODE'] = os.getenv('UPLOAD_MODE', 'sync')
+app.config['BATCH_MAX_FILES'] = int(os.getenv('BATCH_MAX_FILES', 1000))
+app.config['BATCH_MAX_UNCOMPRESSED_BYTES'] = int(os.getenv('BATCH_MAX_UNCOMPRESSED_BYTES', 1073741824))  # 1GB
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Build the shared OCR/ML/validator components once per process
+# MODEL_WARMUP: eager | background | lazy (see ComponentRegistry.load_all)
+registry = get_registry().load_all(warmup=os.getenv('MODEL_WARMUP', 'background'))
+resource_kwargs = {'registry': registry}
+
+# Under a pre-forking server (gunicorn.conf.py) each worker starts its own
+# job queue and retention worker after the fork instead
+if os.getenv('SMARTDOC_PREFORK') != '1':
+    if app.config['UPLOAD_MODE'] == 'async':
+        # Start the workers now so jobs left over from a restart resume
+        registry.start_jobs()
+    registry.start_retention()
+
+@app.before_request
+def start_request_timer():
+    request.environ['smartdoc.started'] = time.perf_counter()
+    # Sampled requests are traced; X-Request-ID names the trace
+    request.environ['smartdoc.trace'] = get_tracer().start_trace(
+        'http.request', request.headers.get('X-Request-ID'),
+        method=request.method, path=request.path
+    )
+
+@app.after_request
+def record_request_metrics(response):
+    started = request.environ.get('smartdoc.started')
+    if started is not None:
+        # The route pattern, not the path, so ids do not create new series
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics = get_metrics()
+        metrics.inc('smartdoc_http_requests_total', {
+            'method': request.method,
+            'endpoint': endpoint,
+            'status': str(response.status_code)
+        })
+        metrics.observe('smartdoc_http_request_duration_seconds', time.perf_counter() - started,
+                        {'endpoint': endpoint})
+    span = request.environ.get('smartdoc.trace')
+    if span is not None:
+        span.set(status_code=response.status_code)
+        response.headers['X-Request-ID'] = span.trace.request_id
+    return response
+
+@app.teardown_request
+def end_request_trace(error=None):
+    span = request.environ.pop('smartdoc.trace', None)
+    if span is not None and error is not None:
+        span.fail(error)
+    if span is not None and span.streaming:
+        # The response body is still being produced; its stream ends the trace
+        get_tracer().detach(span)
+    else:
+        get_tracer().end_trace(span)
+
 # Add API routes
-api.add_resource(FileUploadResource, '/upload')
-api.add_resource(ExtractTextResource, '/extract/<string:file_id>')
-api.add_resource(SummarizeResource, '/summarize')
-api.add_resource(ValidateFieldsResource, '/validate')
-api.add_resource(HealthCheckResource, '/health')
+api.add_resource(FileUploadResource, '/upload', resource_class_kwargs=resource_kwargs)
+api.add_resource(BatchUploadResource, '/upload/batch', resource_class_kwargs=resource_kwargs)
+api.add_resource(JobResource, '/jobs/<string:job_id>', resource_class_kwargs=resource_kwargs)
+api.add_resource(ExtractTextResource, '/extract/<string:file_id>', resource_class_kwargs=resource_kwargs)
+api.add_resource(SummarizeResource, '/summarize', resource_class_kwargs=resource_kwargs)
+api.add_resource(ValidateFieldsResource, '/validate', resource_class_kwargs=resource_kwargs)
+api.add_resource(ValidateBatchResource, '/validate/batch', resource_class_kwargs=resource_kwargs)
+api.add_resource(HealthCheckResource, '/health', resource_class_kwargs=resource_kwargs)
+api.add_resource(ReadinessResource, '/ready', resource_class_kwargs=resource_kwargs)
+api.add_resource(MetricsResource, '/metrics', resource_class_kwargs=resource_kwargs)
+api.add_resource(StorageStatsResource, '/admin/storage', resource_class_kwargs=resource_kwargs)
 
 # Static file serving routes
 @app.route('/static/<path:filename>')
@@ -132,17 +209,23 @@ def home():
                 <p><strong>Available API Endpoints:</strong></p>
                 <ul>
                     <li>📤 <strong>POST /upload</strong> - Upload and process document</li>
+                    <li>📦 <strong>POST /upload/batch</strong> - Upload and process many documents or a zip</li>
                     <li>📄 <strong>POST /summarize</strong> - Summarize text with AI</li>
                     <li>✅ <strong>POST /validate</strong> - Validate extracted fields</li>
+                    <li>✅ <strong>POST /validate/batch</strong> - Validate many records, streamed as NDJSON</li>
                     <li>🔍 <strong>GET /extract/&lt;file_id&gt;</strong> - Get extracted text</li>
+                    <li>⏳ <strong>GET/DELETE /jobs/&lt;job_id&gt;</strong> - Poll or cancel an async upload</li>
                     <li>❤️ <strong>GET /health</strong> - API health check</li>
+                    <li>🚦 <strong>GET /ready</strong> - Model warm-up readiness</li>
+                    <li>📈 <strong>GET /metrics</strong> - Prometheus metrics</li>
+                    <li>💾 <strong>GET /admin/storage</strong> - Upload storage statistics</li>
                 </ul>
             </div>
             
             <div style="margin-top: 30px; opacity: 0.8;">
                 <p><strong>Features:</strong></p>
                 <p>🤖 AI Classification • 📝 Smart Summarization • 🔍 Field Extraction • ✅ Data Validation</p>
-                <p><strong>Supports:</strong> PDF, JPG, PNG, TXT files (Max: 16MB)</p>
+                <p><strong>Supports:</strong> PDF, JPG, PNG, TXT files (Max: 256MB)</p>
             </div>
         </div>
     </body>
@@ -151,7 +234,8 @@ def home():
 
 @app.errorhandler(413)
 def too_large(e):
-    return jsonify({'error': 'File too large. Maximum size is 16MB.'}), 413
+    body, status = payload_too_large()
+    return jsonify(body), status
 
 @app.errorhandler(404)
 def not_found(e):
@@ -169,4 +253,4 @@ if __name__ == '__main__':
     print("  🏠 Home: http://127.0.0.1:5001/")
     print("  ❤️  Health: http://127.0.0.1:5001/health")
     print("  📤 Upload: POST http://127.0.0.1:5001/upload")
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    app.run(debug=True, host='0.0.0.0', port=int(os.getenv('PORT', 5001)))
@@ -0,0 +1,222 @@
+"""ASGI entry point: the Flask app behind an event loop and a thread executor.
+
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:application
+    uvicorn --app-dir src asgi:application --port 5001
+
+The event loop receives request bodies and sends responses, so slow
+clients uploading or reading large payloads do not occupy a thread. Only
+once a request body has fully arrived is the Flask app run, on a bounded
+thread pool (ASGI_THREADS); the CPU-heavy stages then use the OCR process
+pool and the summarizer's batching thread as they do under WSGI. Streamed
+responses are pulled from the app one chunk at a time on the same pool.
+Bodies over MAX_CONTENT_LENGTH are refused with 413 as they arrive, and
+the part of a body spooled to disk is written from the loop's default
+executor.
+"""
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from api.resources import format_size
+from app import app
+
+# Request bodies larger than this are spooled to disk while they arrive
+SPOOL_MAX_BYTES = 1024 * 1024
+
+_DONE = object()
+
+
+class _Response:
+    __slots__ = ('status', 'headers', 'chunks')
+
+    def __init__(self):
+        self.status = None
+        self.headers = None
+        self.chunks = None
+
+
+class WSGIExecutorApp:
+    """Serves a WSGI application over ASGI, running it on a thread pool"""
+
+    def __init__(self, wsgi_app, threads=None, max_body=None):
+        self.wsgi_app = wsgi_app
+        self.threads = threads or int(os.getenv('ASGI_THREADS', 8))
+        # Each request runs at most two pipeline stages at once; the stage
+        # pool starts with the first request, after this
+        os.environ.setdefault('STAGE_WORKERS', str(max(8, 2 * self.threads)))
+        # Largest request body accepted, in bytes (None: no limit)
+        self.max_body = max_body
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Let requests already handed to the pool finish
+                await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def handle(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        if self.max_body is not None and self.declared_length(scope) > self.max_body:
+            await self.payload_too_large(send)
+            return
+
+        with SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as body:
+            size = 0
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                # Chunked bodies carry no Content-Length; count as they come
+                if self.max_body is not None and size > self.max_body:
+                    await self.payload_too_large(send)
+                    return
+                if size > SPOOL_MAX_BYTES:
+                    # On disk from here on: keep the write off the loop
+                    await loop.run_in_executor(None, body.write, chunk)
+                else:
+                    body.write(chunk)
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+
+            response = await loop.run_in_executor(
+                self.executor, self.start_app, self.build_environ(scope, body, size)
+            )
+            await send({
+                'type': 'http.response.start',
+                'status': response.status,
+                'headers': response.headers
+            })
+
+            chunks = response.chunks
+            try:
+                while True:
+                    chunk = await loop.run_in_executor(self.executor, next, chunks, _DONE)
+                    if chunk is _DONE:
+                        break
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            finally:
+                close = getattr(chunks, 'close', None)
+                if close is not None:
+                    await loop.run_in_executor(self.executor, close)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    @staticmethod
+    def declared_length(scope):
+        for name, value in scope.get('headers', []):
+            if name.lower() == b'content-length':
+                try:
+                    return int(value)
+                except ValueError:
+                    return 0
+        return 0
+
+    async def payload_too_large(self, send):
+        body = json.dumps({'error': f'File too large. Maximum size is {format_size(self.max_body)}.'})
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [(b'content-type', b'application/json'), (b'connection', b'close')]
+        })
+        await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': False})
+
+    def start_app(self, environ):
+        """Run the WSGI app up to its status line (in a pool thread)"""
+        response = _Response()
+
+        def start_response(status, headers, exc_info=None):
+            response.status = int(status.split(' ', 1)[0])
+            response.headers = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+            ]
+
+        iterable = self.wsgi_app(environ, start_response)
+        chunks = iter(iterable)
+        if response.status is None:
+            # start_response may be deferred until the first chunk
+            first = next(chunks, b'')
+            chunks = _prepend(first, chunks, iterable)
+        response.chunks = chunks
+        return response
+
+    @staticmethod
+    def build_environ(scope, body, size):
+        """WSGI environ for a request whose ``size`` byte body is in ``body``"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1] or 80),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            # The whole body has arrived, chunked or not: give its length so
+            # the app reads all of it
+            'wsgi.input_terminated': True,
+            'CONTENT_LENGTH': str(size),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f'HTTP_{name}'
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+
+class _prepend:
+    """Iterator yielding ``first`` and then the rest of ``chunks``, closing ``iterable``"""
+
+    def __init__(self, first, chunks, iterable):
+        self.first = first
+        self.chunks = chunks
+        self.iterable = iterable
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.first is not None:
+            first, self.first = self.first, None
+            return first
+        return next(self.chunks)
+
+    def close(self):
+        close = getattr(self.iterable, 'close', None)
+        if close is not None:
+            close()
+
+
+application = WSGIExecutorApp(app, max_body=app.config['MAX_CONTENT_LENGTH'])
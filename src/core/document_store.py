@@ -0,0 +1,77 @@
+import json
+import time
+
+from utils.forking import ForkSafeDatabase
+
+
+class DocumentStore(ForkSafeDatabase):
+    """SQLite index of processed uploads keyed by file_id.
+
+    Each record keeps where the original file lives, the cleaned OCR text,
+    the OCR confidence and the pipeline result, so the text of an upload
+    can be served again without touching the upload folder or re-running
+    OCR.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.open_db(db_path)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            'file_id TEXT PRIMARY KEY, '
+            'file_path TEXT NOT NULL, '
+            'filename TEXT, '
+            'text TEXT, '
+            'confidence REAL, '
+            'result TEXT, '
+            'created REAL)'
+        )
+        self._db.commit()
+
+    def put(self, file_id, file_path, filename, text=None, confidence=None, result=None):
+        """Insert or replace the record for ``file_id``"""
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO documents '
+                '(file_id, file_path, filename, text, confidence, result, created) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    file_id, file_path, filename, text, confidence,
+                    json.dumps(result) if result is not None else None,
+                    time.time()
+                )
+            )
+            self._db.commit()
+
+    def put_result(self, file_id, file_path, filename, result):
+        """Record a pipeline result; the text is taken from ``extracted_text``"""
+        result = dict(result)
+        text = result.pop('extracted_text', None)
+        confidence = result.get('ocr', {}).get('confidence')
+        self.put(file_id, file_path, filename, text, confidence, result)
+
+    def get(self, file_id):
+        """Return the record for ``file_id`` or None"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT file_id, file_path, filename, text, confidence, result, created '
+                'FROM documents WHERE file_id = ?',
+                (file_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'file_id': row[0],
+            'file_path': row[1],
+            'filename': row[2],
+            'text': row[3],
+            'confidence': row[4],
+            'result': json.loads(row[5]) if row[5] else None,
+            'created': row[6]
+        }
+
+    def count(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
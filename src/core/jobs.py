@@ -0,0 +1,379 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core.registry import get_registry
+from core.pipeline import DocumentPipeline, cacheable
+from utils.forking import ForkSafeDatabase
+from utils.metrics import record_stage_timings
+from utils.tracing import get_tracer
+
+ACTIVE_STATES = ('queued', 'running')
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+def _init_job_worker():
+    # A forked worker reuses the parent's components; this only loads what
+    # the parent had not finished loading yet
+    get_registry().load_all(warmup='eager')
+
+
+def run_document_job(file_path, original_filename, stages=None, trace=None):
+    """Job body, executed in a pool worker process.
+
+    ``trace`` (from ``trace_context``) continues the uploading request's
+    trace under its request id.
+    """
+    trace = trace or {}
+    with get_tracer().trace('job.run', trace.get('request_id'), trace.get('sampled'),
+                            filename=original_filename):
+        return DocumentPipeline(get_registry()).process_document(file_path, original_filename, stages)
+
+
+class JobStore(ForkSafeDatabase):
+    """SQLite record of upload jobs, so queued work survives a restart"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.open_db(db_path)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'job_id TEXT PRIMARY KEY, '
+            'file_id TEXT, '
+            'file_path TEXT NOT NULL, '
+            'filename TEXT, '
+            'options TEXT, '
+            'status TEXT NOT NULL, '
+            'result TEXT, '
+            'error TEXT, '
+            'created REAL, '
+            'started REAL, '
+            'finished REAL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)')
+        self._db.commit()
+
+    def create(self, job_id, file_id, file_path, filename, options):
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO jobs (job_id, file_id, file_path, filename, options, status, created) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, file_id, file_path, filename, json.dumps(options), 'queued', time.time())
+            )
+            self._db.commit()
+
+    def claim(self, job_id):
+        """Mark a queued job as running; False if another process got it first"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'running', started = ? WHERE job_id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def update(self, job_id, **fields):
+        if 'result' in fields and fields['result'] is not None:
+            fields['result'] = json.dumps(fields['result'])
+        columns = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            self._db.execute(
+                f'UPDATE jobs SET {columns} WHERE job_id = ?',
+                (*fields.values(), job_id)
+            )
+            self._db.commit()
+
+    def cancel(self, job_id):
+        """Mark an active job cancelled; returns the job as it now stands, or None.
+
+        A worker that later finds the job no longer queued (claim) or
+        running (when it finishes) drops it, in whichever process it runs.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE job_id = ? AND status IN (?, ?)",
+                (time.time(), job_id, *ACTIVE_STATES)
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def delete(self, job_id):
+        with self._lock:
+            self._db.execute('DELETE FROM jobs WHERE job_id = ?', (job_id,))
+            self._db.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT job_id, file_id, file_path, filename, options, status, result, error, '
+                'created, started, finished FROM jobs WHERE job_id = ?',
+                (job_id,)
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def active(self):
+        """Jobs that were queued or running, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT job_id, file_id, file_path, filename, options, status, result, error, '
+                'created, started, finished FROM jobs WHERE status IN (?, ?) ORDER BY created',
+                ACTIVE_STATES
+            ).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    @staticmethod
+    def _to_job(row):
+        return {
+            'job_id': row[0],
+            'file_id': row[1],
+            'file_path': row[2],
+            'filename': row[3],
+            'options': json.loads(row[4]) if row[4] else {},
+            'status': row[5],
+            'result': json.loads(row[6]) if row[6] else None,
+            'error': row[7],
+            'created': row[8],
+            'started': row[9],
+            'finished': row[10]
+        }
+
+
+class JobManager:
+    """Bounded job queue drained by a pool of worker processes.
+
+    ``submit`` never blocks: once ``max_queue`` jobs are waiting it raises
+    QueueFullError so the API can push back on clients. A dispatcher thread
+    hands queued jobs to the pool, at most one per worker, and
+    ``on_complete(job, result)`` is called in this process when a job
+    finishes. Jobs left queued or running by a previous process are picked
+    up again on start().
+
+    If a worker process dies, the pool is replaced and the jobs it was
+    running are queued again, to be run one at a time: a job that kills
+    its worker while running alone fails.
+    """
+
+    def __init__(self, store, workers=None, max_queue=None, on_complete=None):
+        self.store = store
+        self.workers = workers or int(os.getenv('JOB_WORKERS', 2))
+        self.max_queue = max_queue or int(os.getenv('JOB_QUEUE_SIZE', 100))
+        self.on_complete = on_complete
+
+        self._pending = deque()
+        self._running = {}
+        self._cond = threading.Condition()
+        self._pool = None
+        self._dispatcher = None
+        # Jobs that were running when a worker died, run alone from then on
+        self._suspects = set()
+
+    def start(self, recover=True):
+        if self._dispatcher is not None:
+            return self
+        self._pool = self._new_pool()
+
+        # Recovered jobs are re-queued even past max_queue: they were
+        # accepted before the restart. Queued jobs are safe to pick up in
+        # any process, since claim() hands each to one; jobs marked running
+        # are only reset when ``recover`` says no other process runs them.
+        for job in self.store.active():
+            if job['status'] == 'running':
+                if not recover:
+                    continue
+                self.store.update(job['job_id'], status='queued', started=None)
+            self._pending.append(job['job_id'])
+
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name='job-dispatcher', daemon=True
+        )
+        self._dispatcher.start()
+        return self
+
+    def _new_pool(self):
+        context = multiprocessing.get_context(os.getenv('JOB_START_METHOD', 'fork'))
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_job_worker
+        )
+
+    def _replace_pool(self, broken):
+        """Start a new worker pool if ``broken`` is still the current one"""
+        with self._cond:
+            if self._pool is broken:
+                print("Job worker pool broke; starting a new one")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._pool = self._new_pool()
+
+    def submit(self, file_id, file_path, filename, options=None):
+        """Queue a document for processing and return the new job"""
+        with self._cond:
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError(f"Job queue is full ({self.max_queue} waiting)")
+            job_id = str(uuid.uuid4())
+            self.store.create(job_id, file_id, file_path, filename, options or {})
+            self._pending.append(job_id)
+            self._cond.notify()
+        return self.store.get(job_id)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel an active job; returns the job as it now stands, or None"""
+        with self._cond:
+            job = self.store.get(job_id)
+            if job is None or job['status'] not in ACTIVE_STATES:
+                return job
+
+            if job_id in self._pending:
+                self._pending.remove(job_id)
+                self._suspects.discard(job_id)
+            future = self._running.get(job_id)
+            if future is not None:
+                # A job already executing cannot be interrupted; its result
+                # is discarded when it finishes
+                future.cancel()
+
+            return self.store.cancel(job_id)
+
+    def delete(self, job_id):
+        """Cancel the job if active and forget it"""
+        job = self.cancel(job_id)
+        if job is not None:
+            self.store.delete(job_id)
+        return job
+
+    def shutdown(self):
+        """Stop the worker pool; queued jobs are picked up by the next start()"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queued': len(self._pending),
+                'running': len(self._running)
+            }
+
+    def _requeue(self, job_id):
+        with self._cond:
+            current = self.store.get(job_id)
+            if current is None or current['status'] != 'running':
+                return
+            self.store.update(job_id, status='queued', started=None)
+            self._pending.appendleft(job_id)
+            self._cond.notify()
+
+    def _can_dispatch(self):
+        if not self._pending or len(self._running) >= self.workers:
+            return False
+        if not self._running:
+            return True
+        # A suspect job runs alone
+        return self._pending[0] not in self._suspects and not self._suspects.intersection(self._running)
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._can_dispatch():
+                    self._cond.wait()
+                job_id = self._pending.popleft()
+                job = self.store.get(job_id)
+                # Claimed atomically, as other server workers may share the store
+                if job is None or not self.store.claim(job_id):
+                    continue
+
+                pool = self._pool
+                try:
+                    future = pool.submit(
+                        run_document_job, job['file_path'], job['filename'],
+                        job['options'].get('stages'), job['options'].get('trace')
+                    )
+                except BrokenProcessPool:
+                    # A worker died since the last job finished; this one
+                    # never started
+                    self.store.update(job_id, status='queued', started=None)
+                    self._pending.appendleft(job_id)
+                    self._replace_pool(pool)
+                    continue
+                self._running[job_id] = future
+            future.add_done_callback(lambda f, job=job, pool=pool: self._finish(job, f, pool))
+
+    def _finish(self, job, future, pool):
+        job_id = job['job_id']
+        try:
+            if future.cancelled():
+                return
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                self._replace_pool(pool)
+                result = {'filename': job['filename'], 'status': 'failed',
+                          'error': 'Job worker process died'}
+                if job_id not in self._suspects:
+                    # Every job running in the pool fails with it, not only
+                    # the one that crashed it
+                    self._suspects.add(job_id)
+                    self._requeue(job_id)
+                    return
+            except Exception as e:
+                result = {'filename': job['filename'], 'status': 'failed', 'error': str(e)}
+            self._suspects.discard(job_id)
+
+            current = self.store.get(job_id)
+            if current is None or current['status'] != 'running':
+                # Cancelled or deleted while it ran
+                return
+
+            if self.on_complete is not None:
+                try:
+                    result = self.on_complete(job, result) or result
+                except Exception as e:
+                    print(f"Job {job_id} completion hook failed: {e}")
+
+            status = 'completed' if result.get('status') == 'completed' else 'failed'
+            self.store.update(
+                job_id,
+                status=status,
+                result=result,
+                error=result.get('error'),
+                finished=time.time()
+            )
+        finally:
+            with self._cond:
+                self._running.pop(job_id, None)
+                self._cond.notify()
+
+
+def build_job_manager(registry):
+    """Job manager that records finished jobs like a synchronous upload would"""
+    def on_complete(job, result):
+        # Stages ran in a worker process, whose metrics are not scraped
+        timings = result.pop('timings', None)
+        record_stage_timings(timings)
+        result['file_id'] = job['file_id']
+        registry.document_store.put_result(job['file_id'], job['file_path'], job['filename'], result)
+
+        cache_key = job['options'].get('cache_key')
+        if cache_key and cacheable(result):
+            registry.result_cache.set(cache_key, result)
+
+        if not job['options'].get('include_text'):
+            result.pop('extracted_text', None)
+        if job['options'].get('include_timings'):
+            result['timings'] = timings
+        return result
+
+    return JobManager(registry.job_store, on_complete=on_complete)
@@ -0,0 +1,306 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.stages import Stage, StageGraph, parse_timeouts
+from utils.metrics import stage_timer
+from utils.normalized_text import NormalizedText
+from utils.tracing import in_context
+
+# Result keys filled by each stage, in dependency order
+RESULT_KEYS = (
+    ('classify', 'classification'),
+    ('extract', 'extracted_fields'),
+    ('validate', 'validation'),
+    ('summarize', 'summary'),
+)
+
+
+class DocumentPipeline:
+    """OCR, cleaning, classification, extraction, validation and summarization.
+
+    Holds no request state, so it can run inside a request thread, a
+    streaming generator or a background job worker alike. Text is
+    normalized once, in the cleaning stage, and the resulting
+    ``NormalizedText`` (with its lowercase, token and sentence views) is
+    what every later stage reads. Every stage is
+    timed into the process metrics, and each result carries a ``timings``
+    breakdown in milliseconds that callers drop unless it was asked for.
+    Stages that run once for a whole batch (classification, summarization)
+    report the batch's time for each of its documents.
+
+    The stages form a graph (``STAGES``): summarization only needs the
+    cleaned text and the document type, so it runs alongside extraction
+    and validation. Callers may pass the stages they want (``stages``);
+    the ones those depend on run too, and the rest are skipped.
+
+    A document fails when a stage other selected stages depend on fails
+    for it. A stage nothing depends on (validation, summarization) that
+    fails or times out only leaves its result out: the document completes
+    with the stage's error under ``errors`` and, if it overran its limit,
+    the stage listed in ``timed_out``.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def process_document(self, file_path, original_filename, stages=None):
+        """Process uploaded document through the entire pipeline"""
+        return self.process_batch([(file_path, original_filename)], stages=stages)[0]
+
+    def process_batch(self, documents, max_workers=None, stages=None):
+        """Process several ``(file_path, original_filename)`` documents.
+
+        OCR is fanned out across threads (multi-page files additionally
+        use the OCR engine's page pool) and all summaries are submitted to
+        the summarizer together so they share batched model calls. Results
+        come back in input order; a failing document does not affect the
+        others.
+        """
+        started = time.perf_counter()
+        context = {
+            'documents': documents,
+            'max_workers': max_workers,
+            'filenames': [name for _, name in documents],
+            'timings': [{} for _ in documents]
+        }
+        results = self._run(context, stages)
+
+        pipeline_ms = round((time.perf_counter() - started) * 1000, 3)
+        for result in results:
+            result['timings']['pipeline'] = pipeline_ms
+        return results
+
+    def analyze_text(self, cleaned_text, original_filename, stages=None):
+        """Run classification, extraction, validation and summarization"""
+        return self.analyze_batch([cleaned_text], [original_filename], stages=stages)[0]
+
+    def analyze_batch(self, cleaned_texts, original_filenames, timings=None, stages=None):
+        """Run the text stages over several documents, summarizing them together"""
+        context = {
+            'ocr': [
+                {'text': NormalizedText.of(text), 'ocr': None, 'error': None}
+                for text in cleaned_texts
+            ],
+            'filenames': list(original_filenames),
+            'timings': timings if timings is not None else [{} for _ in cleaned_texts]
+        }
+        return self._run(context, stages, done=('ocr',))
+
+    def _run(self, context, stages, done=()):
+        """Run the stage graph over ``context`` and build the results"""
+        context['pipeline'] = self
+        selected = STAGES.resolve(stages) if stages is not None else list(STAGES.stages)
+        outcomes = STAGES.run(context, selected, done=done)
+        # Stages whose output another selected stage reads
+        required = {name for stage in selected for name in STAGES.stages[stage].requires}
+
+        documents = context.get('ocr')
+        if documents is None:
+            # The OCR stage itself failed or timed out
+            documents = [{'text': None, 'ocr': None, 'error': outcomes['ocr']['error']}
+                         for _ in context['filenames']]
+
+        results = []
+        for index, document in enumerate(documents):
+            result = {
+                'filename': context['filenames'][index],
+                'status': 'processing',
+                'timings': context['timings'][index]
+            }
+            results.append(result)
+            if stages is not None:
+                result['stages'] = selected
+
+            error = document['error']
+            stage_errors = {}
+            timed_out = []
+            for stage, key in RESULT_KEYS:
+                if error is not None:
+                    break
+                if stage not in selected:
+                    continue
+                outcome = outcomes[stage]
+                if outcome['status'] == 'success':
+                    value = context[stage][index]
+                    if not isinstance(value, Exception):
+                        result[key] = value
+                        continue
+                    stage_error = str(value)
+                else:
+                    stage_error = outcome['error']
+                    if outcome['status'] == 'timeout':
+                        timed_out.append(stage)
+                if stage in required:
+                    error = stage_error
+                else:
+                    stage_errors[stage] = stage_error
+
+            if error is not None:
+                result['status'] = 'failed'
+                result['error'] = error
+                continue
+
+            if stage_errors:
+                result['errors'] = stage_errors
+            if timed_out:
+                result['timed_out'] = timed_out
+
+            # Kept for the document store; callers drop it from their
+            # responses unless include_text=true
+            result['extracted_text'] = document['text']
+            result['status'] = 'completed'
+
+            ocr_result = document['ocr']
+            if ocr_result is not None:
+                result['ocr'] = {
+                    'confidence': ocr_result['confidence'],
+                    'text_length': len(document['text']),
+                    'page_count': ocr_result.get('page_count', 1)
+                }
+                if 'pages' in ocr_result:
+                    result['ocr']['page_confidence'] = [
+                        page['confidence'] for page in ocr_result['pages']
+                    ]
+        return results
+
+    # Stages. Each reads the outputs of the stages it requires from the
+    # context and returns one entry per document: a value, an exception
+    # for a document it failed on, or None where the document had already
+    # failed.
+
+    def ocr_stage(self, context):
+        """OCR and clean each file; ``{'text', 'ocr', 'error'}`` per document"""
+        documents = context['documents']
+        paths = [path for path, _ in documents]
+        if len(documents) == 1:
+            extracted = [self._extract(paths[0], context['timings'][0])]
+        else:
+            workers = context.get('max_workers') or self.registry.ocr_engine.max_workers
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                extracted = list(pool.map(in_context(self._extract), paths, context['timings']))
+
+        results = []
+        for ocr_result, timings in zip(extracted, context['timings']):
+            if ocr_result['status'] != 'success':
+                results.append({'text': None, 'ocr': None, 'error': ocr_result.get('error', 'OCR failed')})
+                continue
+            try:
+                with stage_timer('cleaning', timings):
+                    cleaned_text = self.registry.text_cleaner.clean_text(ocr_result['text'])
+            except Exception as e:
+                results.append({'text': None, 'ocr': None, 'error': str(e)})
+                continue
+            results.append({'text': cleaned_text, 'ocr': ocr_result, 'error': None})
+        return results
+
+    def _extract(self, file_path, timings):
+        """OCR one file, timing it into the document's timings"""
+        try:
+            with stage_timer('ocr', timings):
+                return self.registry.ocr_engine.extract_text(file_path)
+        except Exception as e:
+            return {'text': '', 'confidence': 0, 'status': 'error', 'error': str(e)}
+
+    def classify_stage(self, context):
+        """One scoring call for every document that has text"""
+        documents = context['ocr']
+        live = [index for index, document in enumerate(documents) if document['text'] is not None]
+        batch_timings = {}
+        try:
+            with stage_timer('classification', batch_timings):
+                classifications = self.registry.classifier.classify_batch(
+                    [documents[index]['text'] for index in live]
+                )
+        except Exception as e:
+            classifications = [e] * len(live)
+
+        results = [None] * len(documents)
+        for index, classification in zip(live, classifications):
+            context['timings'][index].update(batch_timings)
+            results[index] = classification
+        return results
+
+    def extract_stage(self, context):
+        results = []
+        for document, classification, timings in zip(context['ocr'], context['classify'], context['timings']):
+            if not isinstance(classification, dict):
+                results.append(None)
+                continue
+            try:
+                with stage_timer('extraction', timings):
+                    results.append(self.registry.field_extractor.extract_all_fields(
+                        document['text'], classification['document_type']
+                    ))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def validate_stage(self, context):
+        results = []
+        for fields, classification, timings in zip(context['extract'], context['classify'], context['timings']):
+            if not isinstance(fields, dict):
+                results.append(None)
+                continue
+            try:
+                with stage_timer('validation', timings):
+                    results.append(self.registry.field_validator.validate_extracted_fields(
+                        fields, classification['document_type']
+                    ))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def summarize_stage(self, context):
+        """Summaries of every classified document, batched into shared model calls"""
+        live = [
+            index for index, classification in enumerate(context['classify'])
+            if isinstance(classification, dict)
+        ]
+        summary_timings = {}
+        with stage_timer('summarization', summary_timings):
+            summaries = self.registry.summarizer.summarize_many(
+                [context['ocr'][index]['text'] for index in live],
+                [context['classify'][index]['document_type'] for index in live],
+                confidences=[context['classify'][index]['confidence'] for index in live]
+            )
+
+        results = [None] * len(context['classify'])
+        for index, summary in zip(live, summaries):
+            context['timings'][index].update(summary_timings)
+            results[index] = summary
+        return results
+
+
+def cacheable(result):
+    """True for a result worth serving again: completed, with every stage's output"""
+    return result.get('status') == 'completed' and 'errors' not in result
+
+
+# Seconds each stage may take, e.g. "summarize=30,ocr=120"; none by default
+STAGE_TIMEOUTS = parse_timeouts(os.getenv('STAGE_TIMEOUTS'))
+
+
+def _stage(name, method, requires=()):
+    def run(context):
+        # Timings go into dicts of the stage's own, merged into the
+        # documents' by _commit only if the stage finishes in time
+        timings = [{} for _ in context['timings']]
+        return method(context['pipeline'], dict(context, timings=timings)), timings
+
+    def commit(context, output):
+        results, timings = output
+        for shared, own in zip(context['timings'], timings):
+            shared.update(own)
+        context[name] = results
+
+    return Stage(name, run, requires, STAGE_TIMEOUTS.get(name), commit)
+
+
+STAGES = StageGraph([
+    _stage('ocr', DocumentPipeline.ocr_stage),
+    _stage('classify', DocumentPipeline.classify_stage, requires=('ocr',)),
+    _stage('extract', DocumentPipeline.extract_stage, requires=('ocr', 'classify')),
+    _stage('validate', DocumentPipeline.validate_stage, requires=('classify', 'extract')),
+    _stage('summarize', DocumentPipeline.summarize_stage, requires=('ocr', 'classify')),
+])
@@ -0,0 +1,312 @@
+import functools
+import os
+import threading
+import time
+
+from ocr.ocr_engine import OCREngine
+from ml.document_classifier import DocumentClassifier
+from ml.summarizer import TextSummarizer
+from validators.field_extractor import FieldExtractor
+from validators.field_validator import FieldValidator
+from utils.text_cleaner import TextCleaner
+from utils.cache import ResultCache
+from core.document_store import DocumentStore
+from core.upload_store import RetentionWorker, UploadStore
+from utils.forking import register_after_fork
+
+
+def build_result_cache():
+    """Upload result cache; RESULT_CACHE_PATH enables the SQLite tier"""
+    return ResultCache(
+        max_bytes=int(os.getenv('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        db_path=os.getenv('RESULT_CACHE_PATH') or None,
+        name='results'
+    )
+
+
+def build_document_store():
+    """Index of processed uploads, kept next to them by default"""
+    default_path = os.path.join(os.getenv('UPLOAD_FOLDER', 'uploads'), 'documents.db')
+    return DocumentStore(os.getenv('DOCUMENT_STORE_PATH', default_path))
+
+
+def build_job_store():
+    """Record of upload jobs, kept next to the uploads by default"""
+    from core.jobs import JobStore
+    default_path = os.path.join(os.getenv('UPLOAD_FOLDER', 'uploads'), 'jobs.db')
+    return JobStore(os.getenv('JOB_STORE_PATH', default_path))
+
+
+def build_upload_store():
+    """Content-addressed store of uploaded files, indexed next to them by default"""
+    return UploadStore(os.getenv('UPLOAD_FOLDER', 'uploads'), os.getenv('UPLOAD_INDEX_PATH') or None)
+
+
+class ComponentRegistry:
+    """Process-wide holder for the long-lived pipeline components.
+
+    Every component is built at most once per process, no matter how many
+    request threads ask for it at the same time, and its load state and
+    load time are kept for the health endpoint.
+    """
+
+    # The summarizer is built without its model; load_all() decides when
+    # the model is loaded according to the warm-up mode
+    COMPONENTS = {
+        'ocr_engine': OCREngine,
+        'classifier': DocumentClassifier,
+        'summarizer': functools.partial(TextSummarizer, load_model=False),
+        'field_extractor': FieldExtractor,
+        'field_validator': FieldValidator,
+        'text_cleaner': TextCleaner,
+        'result_cache': build_result_cache,
+        'document_store': build_document_store,
+        'upload_store': build_upload_store,
+        'job_store': build_job_store,
+    }
+
+    WARMUP_MODES = ('eager', 'background', 'lazy')
+    
+    def __init__(self, factories=None):
+        self.warmup_mode = None
+        self._job_manager = None
+        self._job_lock = threading.Lock()
+        self._retention = None
+        self._factories = dict(factories or self.COMPONENTS)
+        self._instances = {}
+        self._locks = {name: threading.Lock() for name in self._factories}
+        self._status = {
+            name: {'state': 'not_loaded', 'load_time': None, 'error': None}
+            for name in self._factories
+        }
+        register_after_fork(self._after_fork)
+
+    def _after_fork(self):
+        # The job dispatcher and retention threads belong to the parent process
+        self._job_manager = None
+        self._job_lock = threading.Lock()
+        self._retention = None
+        self._locks = {name: threading.Lock() for name in self._factories}
+
+    def get(self, name):
+        """Return the shared instance of a component, building it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Unknown component: {name}")
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+
+            status = self._status[name]
+            status['state'] = 'loading'
+            started = time.perf_counter()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                status['state'] = 'failed'
+                status['error'] = str(e)
+                raise
+            status['load_time'] = round(time.perf_counter() - started, 3)
+            status['state'] = 'ready'
+            status['error'] = None
+            self._instances[name] = instance
+            return instance
+
+    def load_all(self, warmup='eager'):
+        """Build every registered component up front.
+
+        ``warmup`` controls the summarization model: ``eager`` loads it
+        before returning, ``background`` loads it on a worker thread so the
+        server can bind right away, and ``lazy`` waits for the first
+        summarize request.
+        """
+        if warmup not in self.WARMUP_MODES:
+            raise ValueError(f"Unknown warm-up mode: {warmup}")
+        self.warmup_mode = warmup
+        
+        for name in self._factories:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Could not load component {name}: {e}")
+        
+        summarizer = self._instances.get('summarizer')
+        if summarizer is not None:
+            if warmup == 'eager':
+                summarizer.load_model()
+            elif warmup == 'background':
+                summarizer.start_background_load()
+        return self
+
+    def status(self):
+        """Load state and load time (seconds) for every component"""
+        status = {name: dict(status) for name, status in self._status.items()}
+        summarizer = self._instances.get('summarizer')
+        if summarizer is not None:
+            status['summarizer'].update(summarizer.model_status())
+        return status
+
+    def collect_metrics(self):
+        """Gauges for /metrics: component state, queue depths and cache statistics"""
+        collected = [(
+            'smartdoc_component_ready', 'gauge', 'Whether each component has loaded (1) or not (0)',
+            [({'component': name}, int(status['state'] == 'ready')) for name, status in self._status.items()]
+        )]
+        
+        summarizer = self._instances.get('summarizer')
+        if summarizer is not None:
+            batching = summarizer.batcher.stats()
+            collected.append((
+                'smartdoc_model_ready', 'gauge', 'Whether the summarization model is loaded',
+                [({'model': summarizer.model_id}, int(summarizer.model_loaded))]
+            ))
+            collected.append((
+                'smartdoc_summarizer_queue_depth', 'gauge', 'Texts waiting for a summarization batch',
+                [({}, batching['queue_depth'])]
+            ))
+        
+        if self.jobs_started():
+            jobs = self.job_manager.stats()
+            collected.append((
+                'smartdoc_jobs', 'gauge', 'Upload jobs by state',
+                [({'state': 'queued'}, jobs['queued']), ({'state': 'running'}, jobs['running'])]
+            ))
+        
+        caches = []
+        if 'result_cache' in self._instances:
+            caches.append(('results', self._instances['result_cache']))
+        if summarizer is not None:
+            caches.append(('summaries', summarizer.cache))
+        if caches:
+            stats = [(name, cache.stats()) for name, cache in caches]
+            for key, kind, help_text in (
+                    ('hits', 'counter', 'Cache lookups answered'),
+                    ('misses', 'counter', 'Cache lookups not answered'),
+                    ('evictions', 'counter', 'Entries evicted from the memory tier'),
+                    ('entries', 'gauge', 'Entries in the memory tier'),
+                    ('hit_rate', 'gauge', 'Share of lookups answered')):
+                suffix = '_total' if kind == 'counter' else ''
+                collected.append((
+                    f'smartdoc_cache_{key}{suffix}', kind, help_text,
+                    [({'cache': name}, values[key]) for name, values in stats]
+                ))
+        
+        return collected
+
+    def is_loaded(self):
+        return all(s['state'] == 'ready' for s in self._status.values())
+
+    def is_ready(self):
+        """True once every component is built and the model warm-up is over"""
+        if not self.is_loaded():
+            return False
+        if self.warmup_mode == 'lazy':
+            return True
+        return self.summarizer.is_ready()
+
+    @property
+    def ocr_engine(self):
+        return self.get('ocr_engine')
+
+    @property
+    def classifier(self):
+        return self.get('classifier')
+
+    @property
+    def summarizer(self):
+        return self.get('summarizer')
+
+    @property
+    def field_extractor(self):
+        return self.get('field_extractor')
+
+    @property
+    def field_validator(self):
+        return self.get('field_validator')
+
+    @property
+    def text_cleaner(self):
+        return self.get('text_cleaner')
+
+    @property
+    def result_cache(self):
+        return self.get('result_cache')
+
+    @property
+    def document_store(self):
+        return self.get('document_store')
+
+    @property
+    def upload_store(self):
+        return self.get('upload_store')
+
+    @property
+    def job_store(self):
+        """Upload job records; reading them does not start the job workers"""
+        return self.get('job_store')
+
+    def jobs_started(self):
+        return self._job_manager is not None
+
+    def start_jobs(self, recover=True):
+        """Start the background job queue in this process.
+
+        ``recover`` re-queues jobs a previous process left unfinished; when
+        several server workers share one job store, only one should.
+        """
+        if self._job_manager is None:
+            with self._job_lock:
+                if self._job_manager is None:
+                    from core.jobs import build_job_manager
+                    self._job_manager = build_job_manager(self).start(recover=recover)
+        return self._job_manager
+
+    @property
+    def job_manager(self):
+        """Background upload job queue; its worker pool starts on first use"""
+        return self._job_manager or self.start_jobs()
+
+    @property
+    def retention(self):
+        return self._retention
+
+    def start_retention(self):
+        """Start expiring stored uploads in this process when UPLOAD_RETENTION_TTL is set"""
+        ttl = float(os.getenv('UPLOAD_RETENTION_TTL', 0))
+        if ttl <= 0:
+            return None
+        with self._job_lock:
+            if self._retention is None:
+                self._retention = RetentionWorker(
+                    self.upload_store,
+                    ttl,
+                    action=os.getenv('UPLOAD_RETENTION_ACTION', 'compress'),
+                    interval=float(os.getenv('UPLOAD_RETENTION_INTERVAL', 3600)),
+                    in_use=self._active_job_paths
+                ).start()
+        return self._retention
+
+    def _active_job_paths(self):
+        if not self.jobs_started():
+            return []
+        return [job['file_path'] for job in self._job_manager.store.active()]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide component registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ComponentRegistry()
+    return _registry
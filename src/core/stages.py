@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.forking import register_after_fork
+from utils.tracing import in_context
+
+# How often to re-check deadlines while a stage with a timeout is queued
+# on the pool and has not started yet
+_POLL_SECONDS = 0.05
+
+
+class Stage:
+    """A named pipeline step, the stages whose outputs it reads, and its time limit.
+
+    ``func`` is called with the run's context dict and returns the stage's
+    output, which is stored in the context under the stage's name for the
+    stages that require it. ``commit(context, output)`` replaces that
+    storing step; it runs on the thread driving the graph, and only for a
+    stage that finished in time, so ``func`` should leave the shared context
+    alone and return everything it produced.
+    """
+
+    def __init__(self, name, func, requires=(), timeout=None, commit=None):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.timeout = timeout
+        self.commit = commit
+
+
+def parse_timeouts(spec):
+    """``{'summarize': 30.0, ...}`` from ``"summarize=30,ocr=120"``"""
+    timeouts = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            name, _, seconds = item.partition('=')
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+class StageGraph:
+    """Runs stages as soon as the stages they require have finished.
+
+    Stages whose inputs are ready at the same time run concurrently on a
+    shared thread pool; a stage with nothing running alongside it runs on
+    the calling thread instead, unless it has a timeout (only pool threads
+    can be held to one). A stage that fails or overruns its timeout is
+    reported and the stages depending on it are skipped; an overrunning
+    stage's thread is left to finish, and its output is discarded.
+
+    The pool (``max_workers``, STAGE_WORKERS when not given, read when the
+    pool starts) is shared by every run in the process, so it caps the
+    stages running at once across all requests; an overrunning stage keeps
+    its thread until it returns. The servers default STAGE_WORKERS to two
+    per request thread, as a request runs at most two stages at a time.
+    """
+
+    def __init__(self, stages, max_workers=None):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for name in stage.requires:
+                if name not in self.stages:
+                    raise ValueError(f"Stage {stage.name} requires unknown stage {name}")
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        register_after_fork(self._after_fork)
+
+    def _after_fork(self):
+        # Pool threads belong to the parent process
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers or int(os.getenv('STAGE_WORKERS', 8)),
+                        thread_name_prefix='stage'
+                    )
+        return self._executor
+
+    def resolve(self, names):
+        """``names`` and every stage they depend on, in declaration order"""
+        unknown = set(names) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+        needed = set()
+        todo = list(names)
+        while todo:
+            name = todo.pop()
+            if name not in needed:
+                needed.add(name)
+                todo.extend(self.stages[name].requires)
+        return [name for name in self.stages if name in needed]
+
+    def run(self, context, names=None, done=()):
+        """Run the selected stages (all by default) over ``context``.
+
+        Stages in ``done`` are taken as already complete, their outputs
+        already in the context. Returns ``{stage: {'status', 'error'}}``
+        with status ``success``, ``error``, ``timeout`` or ``skipped``.
+        """
+        selected = self.resolve(names) if names is not None else list(self.stages)
+        outcomes = {name: {'status': 'success', 'error': None} for name in done}
+        waiting = [name for name in selected if name not in outcomes]
+        running = {}
+        started = {}
+
+        def call(stage):
+            started[stage.name] = time.perf_counter()
+            return stage.func(context)
+
+        def finish(name, status, error=None, output=None):
+            if status == 'success':
+                commit = self.stages[name].commit
+                try:
+                    if commit is None:
+                        context[name] = output
+                    else:
+                        commit(context, output)
+                except Exception as e:
+                    status, error = 'error', str(e)
+            outcomes[name] = {'status': status, 'error': error}
+
+        while waiting or running:
+            # Skip stages whose inputs failed; collect the ones that can start
+            ready = []
+            for name in list(waiting):
+                states = [outcomes.get(required, {}).get('status') for required in self.stages[name].requires]
+                if any(state not in (None, 'success') for state in states):
+                    waiting.remove(name)
+                    finish(name, 'skipped', 'A stage it depends on did not complete')
+                elif all(state == 'success' for state in states):
+                    waiting.remove(name)
+                    ready.append(self.stages[name])
+
+            inline = None
+            if len(ready) == 1 and not running and ready[0].timeout is None:
+                inline = ready.pop()
+            for stage in ready:
+                # Pool threads continue the caller's trace
+                running[self.executor.submit(in_context(call), stage)] = stage.name
+
+            if inline is not None:
+                try:
+                    finish(inline.name, 'success', output=call(inline))
+                except Exception as e:
+                    finish(inline.name, 'error', str(e))
+                continue
+
+            if not running:
+                if waiting:
+                    # Only possible if stages depend on ones never selected
+                    for name in waiting:
+                        finish(name, 'skipped', 'A stage it depends on was not run')
+                break
+
+            finished, _ = wait(running, timeout=self._next_deadline(running, started),
+                               return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    finish(name, 'success', output=future.result())
+                except Exception as e:
+                    finish(name, 'error', str(e))
+
+            now = time.perf_counter()
+            for future, name in list(running.items()):
+                timeout = self.stages[name].timeout
+                if timeout is not None and name in started and now - started[name] >= timeout:
+                    del running[future]
+                    finish(name, 'timeout', f"Stage {name} timed out after {timeout:g}s")
+
+        return outcomes
+
+    def _next_deadline(self, running, started):
+        """Seconds until the first running stage's timeout, or None"""
+        deadlines = []
+        now = time.perf_counter()
+        for name in running.values():
+            timeout = self.stages[name].timeout
+            if timeout is None:
+                continue
+            if name not in started:
+                deadlines.append(_POLL_SECONDS)
+            else:
+                deadlines.append(max(0.0, started[name] + timeout - now))
+        return min(deadlines) if deadlines else None
@@ -0,0 +1,364 @@
+import fcntl
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from utils.forking import ForkSafeDatabase
+
+CHUNK_SIZE = 1024 * 1024
+
+# Bytes kept from the start of an upload to recognise its type
+SNIFF_BYTES = 512
+
+# Leading bytes of the binary formats the OCR engine reads
+SIGNATURES = (
+    (b'%PDF-', 'pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+    (b'PK\x03\x04', 'zip'),
+)
+
+
+def sniff_file_type(head):
+    """File type of content starting with ``head``, or None when unrecognised"""
+    for signature, file_type in SIGNATURES:
+        if head.startswith(signature):
+            return file_type
+    # "BM" alone is too common a start for text; check the reserved
+    # header bytes, which are always zero
+    if head[:2] == b'BM' and head[6:10] == b'\x00\x00\x00\x00':
+        return 'bmp'
+    if not head or b'\x00' in head:
+        return None
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # Allow a multi-byte character cut off at the end of the sample
+        if e.start < len(head) - 3:
+            return None
+    return 'txt'
+
+
+class HashingFile:
+    """Temporary file in the upload folder that hashes what is written to it.
+
+    Request bodies are written into it chunk by chunk as they are parsed,
+    so the content hash and file type are known once the upload has been
+    received, without reading the file again. The file is deleted when
+    closed; ``UploadStore.commit`` links it into place before that.
+    """
+
+    def __init__(self, folder):
+        self.file = tempfile.NamedTemporaryFile(dir=folder, prefix='.upload-', suffix='.part')
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+
+    def write(self, data):
+        if len(self.head) < SNIFF_BYTES:
+            self.head += bytes(data[:SNIFF_BYTES - len(self.head)])
+        self.digest.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    @property
+    def sha256(self):
+        return self.digest.hexdigest()
+
+    @property
+    def file_type(self):
+        return sniff_file_type(self.head)
+
+    def __getattr__(self, name):
+        # read, seek, tell, flush, close, name... of the underlying file
+        return getattr(self.file, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+
+class UploadStore(ForkSafeDatabase):
+    """Uploaded files kept once per distinct content, with a metadata index.
+
+    Files are named by their SHA-256 and sharded into two levels of
+    subdirectories by its leading hex digits (``ab/cd/abcd....pdf``), so no
+    directory grows past a few hundred entries. Uploading the same bytes
+    again reuses the file already stored; each upload still gets its own
+    file_id in the document store. A SQLite index records every file's
+    type, size, upload count, when it was last uploaded and whether the
+    original is still stored, compressed or deleted by retention.
+    """
+
+    STATES = ('stored', 'compressed', 'deleted')
+
+    def __init__(self, folder, index_path=None):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.index_path = index_path or os.path.join(folder, 'uploads.db')
+        self.open_db(self.index_path)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS uploads ('
+            'sha256 TEXT PRIMARY KEY, '
+            'file_type TEXT NOT NULL, '
+            'path TEXT NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'stored_size INTEGER NOT NULL, '
+            'uploads INTEGER NOT NULL, '
+            'state TEXT NOT NULL, '
+            'created REAL, '
+            'last_seen REAL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS uploads_expiry ON uploads (state, last_seen)')
+        self._db.commit()
+
+    def temporary_file(self):
+        """A ``HashingFile`` to receive an upload into"""
+        return HashingFile(self.folder)
+
+    def path_for(self, sha256, file_type):
+        return os.path.join(self.folder, sha256[:2], sha256[2:4], f"{sha256}.{file_type}")
+
+    def commit(self, upload, file_type):
+        """Keep a received ``HashingFile`` under its content hash.
+
+        Returns the stored path and whether the content was new. Content
+        whose original retention already removed is stored again.
+        """
+        upload.flush()
+        path = self.path_for(upload.sha256, file_type)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        created = self._link(upload.name, path)
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO uploads '
+                '(sha256, file_type, path, size, stored_size, uploads, state, created, last_seen) '
+                "VALUES (?, ?, ?, ?, ?, 1, 'stored', ?, ?) "
+                'ON CONFLICT (sha256) DO UPDATE SET uploads = uploads + 1, last_seen = excluded.last_seen, '
+                "path = excluded.path, stored_size = excluded.stored_size, state = 'stored'",
+                (upload.sha256, file_type, path, upload.size, upload.size, now, now)
+            )
+            self._db.commit()
+
+        # Retention removes a file only in the transaction that marks it
+        # expired, so once the row is 'stored' again the file stays. If that
+        # happened between the link and the update above, put it back.
+        if not os.path.exists(path):
+            created = self._link(upload.name, path)
+        if created and os.path.exists(f"{path}.gz"):
+            # The original is back; drop the copy retention compressed
+            os.remove(f"{path}.gz")
+        return path, created
+
+    @staticmethod
+    def _link(source, path):
+        try:
+            os.link(source, path)
+        except FileExistsError:
+            return False
+        except OSError:
+            # Filesystems without hard links: copy, then move into place
+            if os.path.exists(path):
+                return False
+            partial = f"{source}.copy"
+            shutil.copyfile(source, partial)
+            os.replace(partial, path)
+        return True
+
+    def get(self, sha256):
+        """Index record of a stored file, or None"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT sha256, file_type, path, size, stored_size, uploads, state, created, last_seen '
+                'FROM uploads WHERE sha256 = ?',
+                (sha256,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(
+            ('sha256', 'file_type', 'path', 'size', 'stored_size', 'uploads', 'state', 'created', 'last_seen'),
+            row
+        ))
+
+    def expire(self, ttl, action='delete', exclude=(), limit=100):
+        """Delete or gzip originals not uploaded again for ``ttl`` seconds.
+
+        Extracted text and results live in the document store and are
+        kept. Paths in ``exclude`` (files queued for processing) are
+        skipped. Returns how many files were expired.
+        """
+        if action not in ('delete', 'compress'):
+            raise ValueError(f"Unknown retention action: {action}")
+        cutoff = time.time() - ttl
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sha256, path FROM uploads WHERE state = 'stored' AND last_seen < ? "
+                'ORDER BY last_seen LIMIT ?',
+                (cutoff, limit + len(exclude))
+            ).fetchall()
+
+        expired = 0
+        for sha256, path in rows:
+            if path in exclude:
+                continue
+            try:
+                stored_size = self._compress(path) if action == 'compress' else 0
+            except FileNotFoundError:
+                stored_size = 0
+            state = 'compressed' if action == 'compress' and stored_size else 'deleted'
+            if self._expire_file(sha256, path, state, stored_size, cutoff):
+                expired += 1
+            elif stored_size:
+                # Uploaded again meanwhile; the original stays
+                os.remove(f"{path}.gz")
+        return expired
+
+    def _expire_file(self, sha256, path, state, stored_size, cutoff):
+        """Mark a file expired and remove its original, atomically.
+
+        The row is claimed with a conditional update, which fails if the
+        content was uploaded again since it was selected, and the original
+        is removed before that transaction commits. SQLite holds its write
+        lock until then, so a concurrent ``commit`` (in any process) either
+        refreshed the row first or finds it expired and links the file anew.
+        """
+        with self._lock:
+            try:
+                cursor = self._db.execute(
+                    "UPDATE uploads SET state = ?, stored_size = ? "
+                    "WHERE sha256 = ? AND state = 'stored' AND last_seen < ?",
+                    (state, stored_size, sha256, cutoff)
+                )
+                if cursor.rowcount != 1:
+                    self._db.rollback()
+                    return False
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._db.commit()
+        return True
+
+    @staticmethod
+    def _compress(path):
+        """Gzip ``path`` next to itself; returns the compressed size"""
+        partial = f"{path}.gz.part"
+        with open(path, 'rb') as source, gzip.open(partial, 'wb') as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+        os.replace(partial, f"{path}.gz")
+        return os.path.getsize(f"{path}.gz")
+
+    def stats(self):
+        """File counts and sizes by state and type"""
+        with self._lock:
+            by_state = self._db.execute(
+                'SELECT state, COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0), '
+                'COALESCE(SUM(uploads), 0), COALESCE(SUM(size * (uploads - 1)), 0) '
+                'FROM uploads GROUP BY state'
+            ).fetchall()
+            by_type = self._db.execute(
+                "SELECT file_type, COUNT(*), COALESCE(SUM(stored_size), 0) FROM uploads "
+                "WHERE state != 'deleted' GROUP BY file_type"
+            ).fetchall()
+
+        states = {state: {'files': 0, 'original_bytes': 0, 'stored_bytes': 0} for state in self.STATES}
+        uploads = deduplicated = 0
+        for state, files, size, stored_size, state_uploads, saved in by_state:
+            states[state] = {'files': files, 'original_bytes': size, 'stored_bytes': stored_size}
+            uploads += state_uploads
+            deduplicated += saved
+
+        disk = shutil.disk_usage(self.folder)
+        return {
+            'files': sum(state['files'] for state in states.values()),
+            'uploads': uploads,
+            'stored_bytes': sum(state['stored_bytes'] for state in states.values()),
+            'deduplicated_bytes': deduplicated,
+            'states': states,
+            'types': {file_type: {'files': files, 'stored_bytes': size} for file_type, files, size in by_type},
+            'disk': {'total': disk.total, 'used': disk.used, 'free': disk.free}
+        }
+
+
+class RetentionWorker:
+    """Background thread that expires stored originals after a TTL.
+
+    Every ``interval`` seconds, originals not uploaded again for ``ttl``
+    seconds are deleted or gzipped (``action``) in batches. ``in_use``
+    returns the paths that must be kept for now, such as files of queued
+    jobs. Several processes (server workers) may each run one against the
+    same store; a lock file lets one of them sweep at a time.
+    """
+
+    def __init__(self, store, ttl, action='delete', interval=3600, in_use=None):
+        self.store = store
+        self.ttl = ttl
+        self.action = action
+        self.interval = interval
+        self.in_use = in_use
+        self.last_run = None
+        self.last_expired = 0
+        self.total_expired = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='upload-retention', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def sweep(self):
+        """Expire everything past the TTL now; returns how many files"""
+        with open(os.path.join(self.store.folder, '.retention.lock'), 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is sweeping
+                return 0
+            exclude = set(self.in_use()) if self.in_use is not None else set()
+            expired = 0
+            while True:
+                batch = self.store.expire(self.ttl, self.action, exclude)
+                expired += batch
+                if not batch:
+                    break
+        self.last_run = time.time()
+        self.last_expired = expired
+        self.total_expired += expired
+        return expired
+
+    def status(self):
+        return {
+            'ttl_seconds': self.ttl,
+            'action': self.action,
+            'interval_seconds': self.interval,
+            'last_run': self.last_run,
+            'last_expired': self.last_expired,
+            'total_expired': self.total_expired
+        }
+
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Upload retention sweep failed: {e}")
+            if self._stop.wait(self.interval):
+                return
@@ -0,0 +1,85 @@
+"""Inference backends for the summarization model.
+
+Each loader returns a transformers ``pipeline`` for summarization, so the
+summarizer calls every backend the same way:
+
+- ``torch``: full-precision PyTorch, as before
+- ``quantized``: PyTorch with the Linear layers dynamically quantized to int8
+- ``onnx``: an ONNX Runtime export of the model, loaded through optimum
+
+The heavy libraries are imported by the loader that needs them only.
+"""
+import os
+
+DISTILLED_MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
+
+
+def set_torch_threads(threads):
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def load_torch(model_name, threads=None):
+    """Full-precision model on CPU"""
+    from transformers import pipeline
+    set_torch_threads(threads)
+    return pipeline("summarization", model=model_name, device=-1)
+
+
+def load_quantized(model_name, threads=None):
+    """Model with dynamic int8 quantization of its Linear layers"""
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+    set_torch_threads(threads)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("summarization", model=model, tokenizer=tokenizer, device=-1)
+
+
+def load_onnx(model_name, threads=None):
+    """ONNX Runtime model, exported on first use unless SUMMARIZER_ONNX_PATH holds one"""
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+
+    session_options = onnxruntime.SessionOptions()
+    if threads:
+        session_options.intra_op_num_threads = threads
+        session_options.inter_op_num_threads = 1
+
+    export_path = os.getenv('SUMMARIZER_ONNX_PATH')
+    if export_path and os.path.isdir(export_path):
+        model = ORTModelForSeq2SeqLM.from_pretrained(export_path, session_options=session_options)
+        tokenizer = AutoTokenizer.from_pretrained(export_path)
+    else:
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            model_name, export=True, session_options=session_options
+        )
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if export_path:
+            # Keep the export so later starts skip it
+            model.save_pretrained(export_path)
+            tokenizer.save_pretrained(export_path)
+
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+
+BACKENDS = {
+    'torch': load_torch,
+    'quantized': load_quantized,
+    'onnx': load_onnx
+}
+
+
+def load_backend(backend, model_name, threads=None):
+    """Load ``model_name`` with the named backend"""
+    try:
+        loader = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown summarizer backend '{backend}'. "
+                         f"Choose one of: {', '.join(BACKENDS)}")
+    return loader(model_name, threads)
@@ -0,0 +1,202 @@
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+from utils.metrics import get_metrics
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class _PendingRequest:
+    __slots__ = ('text', 'max_length', 'min_length', 'group', 'future')
+
+    def __init__(self, text, max_length, min_length, group):
+        self.text = text
+        self.max_length = max_length
+        self.min_length = min_length
+        self.group = group
+        self.future = Future()
+
+
+class BatchScheduler:
+    """Micro-batching queue in front of a summarization pipeline.
+
+    Callers submit one text at a time and get a Future back. A single
+    worker thread collects pending requests for up to ``max_wait_ms`` or
+    until ``max_batch_size`` are waiting, sorts them by length so texts
+    of similar size share a pipeline call (less padding), runs each group
+    through ``run_batch`` and resolves the callers' futures.
+
+    ``run_batch(texts, max_length, min_length)`` must return one summary
+    string per input text, in order.
+    """
+
+    def __init__(self, run_batch, max_batch_size=None, max_wait_ms=None, length_ratio=2.0):
+        if max_batch_size is None:
+            max_batch_size = int(os.getenv('SUMMARIZER_BATCH_SIZE', 8))
+        if max_wait_ms is None:
+            max_wait_ms = float(os.getenv('SUMMARIZER_BATCH_WAIT_MS', 10))
+
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        # Longest text in a pipeline call may be at most this many times
+        # longer than the shortest one
+        self.length_ratio = length_ratio
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_pid = None
+        self._thread_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._pipeline_calls = 0
+        self._inference_time = 0.0
+        self._batch_sizes = defaultdict(int)
+
+    def reset_after_fork(self):
+        """Drop state inherited from the parent; a forked child has no worker thread"""
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_pid = None
+        self._thread_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def submit(self, text, max_length, min_length, group=None):
+        """Queue one text for summarization and return a Future of the summary.
+
+        Requests are only batched with others in the same ``group``; the
+        summarizer uses the caller's requested max_length so that summaries
+        asked for at different sizes never share a generation call.
+        """
+        self._ensure_worker()
+        request = _PendingRequest(text, max_length, min_length, group)
+        self._queue.put(request)
+        return request.future
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so a pre-forked worker process has
+        # to start its own
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or self._thread_pid != pid or not self._thread.is_alive():
+                if self._thread_pid != pid:
+                    self._queue = queue.Queue()
+                self._thread = threading.Thread(
+                    target=self._worker, name='summarizer-batcher', daemon=True
+                )
+                self._thread_pid = pid
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            with self._stats_lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._batch_sizes[len(batch)] += 1
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        groups = defaultdict(list)
+        for request in batch:
+            groups[request.group].append(request)
+
+        for requests in groups.values():
+            for bucket in self._length_buckets(requests):
+                self._run(bucket)
+
+    def _length_buckets(self, requests):
+        """Split requests into runs of similar length to limit padding"""
+        requests = sorted(requests, key=lambda r: len(r.text))
+        bucket = []
+        for request in requests:
+            if bucket and len(request.text) > self.length_ratio * max(1, len(bucket[0].text)):
+                yield bucket
+                bucket = []
+            bucket.append(request)
+        if bucket:
+            yield bucket
+
+    def _run(self, bucket):
+        texts = [r.text for r in bucket]
+        # One generation call serves the whole bucket, so use the loosest
+        # length bounds any of its members asked for
+        max_length = max(r.max_length for r in bucket)
+        min_length = min(r.min_length for r in bucket)
+
+        started = time.perf_counter()
+        try:
+            summaries = self.run_batch(texts, max_length=max_length, min_length=min_length)
+        except Exception as e:
+            for request in bucket:
+                request.future.set_exception(e)
+            return
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._stats_lock:
+                self._pipeline_calls += 1
+                self._inference_time += elapsed
+            metrics = get_metrics()
+            metrics.observe('smartdoc_model_inference_seconds', elapsed)
+            metrics.observe('smartdoc_model_batch_size', len(bucket), buckets=BATCH_SIZE_BUCKETS)
+
+        if len(summaries) != len(bucket):
+            # Never leave a caller waiting on a summary that will not come
+            error = ValueError(f"Expected {len(bucket)} summaries, got {len(summaries)}")
+            for request in bucket:
+                request.future.set_exception(error)
+            return
+        for request, summary in zip(bucket, summaries):
+            request.future.set_result(summary)
+
+    def load(self):
+        """Queue depth, batch size and mean model call time, for routing decisions"""
+        with self._stats_lock:
+            calls = self._pipeline_calls
+            inference_time = self._inference_time
+        return {
+            'queue_depth': self._queue.qsize(),
+            'max_batch_size': self.max_batch_size,
+            'avg_inference_ms': inference_time * 1000 / calls if calls else 0.0
+        }
+
+    def stats(self):
+        """Batch occupancy and inference time since startup"""
+        with self._stats_lock:
+            batches = self._batches
+            avg_size = self._requests / batches if batches else 0
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 2),
+                'queue_depth': self._queue.qsize(),
+                'batches': batches,
+                'requests': self._requests,
+                'pipeline_calls': self._pipeline_calls,
+                'avg_batch_size': round(avg_size, 2),
+                'avg_occupancy': round(avg_size / self.max_batch_size, 3) if batches else 0,
+                'batch_size_histogram': {str(k): v for k, v in sorted(self._batch_sizes.items())},
+                'avg_inference_ms': round(self._inference_time * 1000 / self._pipeline_calls, 2)
+                if self._pipeline_calls else 0
+            }
@@ -1,7 +1,11 @@
-import re
+import os
+
+from utils.normalized_text import NormalizedText
+from utils.tracing import traced
+
 
 class DocumentClassifier:
-    def __init__(self):
+    def __init__(self, model_path=None):
         print("DocumentClassifier initialized")
         self.document_keywords = {
             'invoice': ['invoice', 'bill', 'amount', 'total', 'gst', 'tax'],
@@ -10,25 +14,72 @@ class DocumentClassifier:
             'pan': ['pan', 'permanent', 'account', 'number'],
             'other': ['document', 'text']
         }
-    
-    def classify_document(self, text):
-        """Simple keyword-based classification"""
-        if not text:
-            return {
-                'document_type': 'other',
-                'confidence': 0,
-                'method': 'rule_based'
-            }
-            
-        text_lower = text.lower()
-        scores = {}
+        self.build_index()
         
+        # Optional trained model (scikit-learn pipeline saved with joblib)
+        self.model = None
+        model_path = model_path or os.getenv('DOCUMENT_CLASSIFIER_MODEL')
+        if model_path:
+            self.load_model(model_path)
+    
+    def build_index(self):
+        """Map each keyword to the document types it counts towards"""
+        self.keyword_index = {}
         for doc_type, keywords in self.document_keywords.items():
-            score = 0
             for keyword in keywords:
-                score += len(re.findall(r'\b' + keyword + r'\b', text_lower))
-            scores[doc_type] = score
+                self.keyword_index.setdefault(keyword.lower(), []).append(doc_type)
+    
+    def load_model(self, model_path):
+        """Load a trained text classification pipeline, once"""
+        try:
+            import joblib
+            self.model = joblib.load(model_path)
+            print(f"Classifier model loaded from {model_path}")
+        except Exception as e:
+            self.model = None
+            print(f"Could not load classifier model: {e}")
+            print("Falling back to rule-based classification")
+        return self.model is not None
+    
+    def train_model(self, texts, labels, model_path=None):
+        """Fit a TF-IDF + logistic regression model and optionally save it"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import Pipeline
+        
+        model = Pipeline([
+            ('tfidf', TfidfVectorizer(lowercase=True, ngram_range=(1, 2), sublinear_tf=True)),
+            ('classifier', LogisticRegression(max_iter=1000))
+        ])
+        model.fit(texts, labels)
+        self.model = model
+        
+        if model_path:
+            import joblib
+            joblib.dump(model, model_path)
+        return model
+    
+    def score_text(self, text):
+        """Keyword hit counts per document type.
         
+        The text is tokenized once (a ``NormalizedText`` reuses its token
+        counts) and every keyword is looked up in them. Scores are
+        additive, so a long document can be classified from the sum of its
+        pages' scores.
+        """
+        token_counts = NormalizedText.of(text).token_counts
+        scores = dict.fromkeys(self.document_keywords, 0)
+        
+        for keyword, doc_types in self.keyword_index.items():
+            count = token_counts.get(keyword)
+            if count:
+                for doc_type in doc_types:
+                    scores[doc_type] += count
+        
+        return scores
+    
+    def classify_scores(self, scores):
+        """Turn keyword scores into a classification result"""
         predicted_type = max(scores, key=scores.get)
         confidence = scores[predicted_type] / (sum(scores.values()) + 1) * 100
         
@@ -37,3 +88,51 @@ class DocumentClassifier:
             'confidence': round(confidence, 2),
             'method': 'rule_based'
         }
+    
+    def classify_document(self, text):
+        """Classify one document with the trained model, or by keywords"""
+        return self.classify_batch([text])[0]
+    
+    @traced(
+        'classifier.classify_batch',
+        lambda self, texts: {
+            'documents': len(texts),
+            'text_length': sum(len(text) for text in texts if text),
+            'method': 'rule_based' if self.model is None else 'ml'
+        },
+        lambda results: {'document_types': [result['document_type'] for result in results]}
+    )
+    def classify_batch(self, texts):
+        """Classify several documents; the model scores them in one call"""
+        results = [None] * len(texts)
+        model_inputs = []
+        
+        for index, text in enumerate(texts):
+            if not text:
+                results[index] = {
+                    'document_type': 'other',
+                    'confidence': 0,
+                    'method': 'rule_based'
+                }
+            elif self.model is None:
+                results[index] = self.classify_scores(self.score_text(text))
+            else:
+                model_inputs.append(index)
+        
+        if model_inputs:
+            try:
+                probabilities = self.model.predict_proba([texts[i] for i in model_inputs])
+                classes = self.model.classes_
+                for index, row in zip(model_inputs, probabilities):
+                    best = row.argmax()
+                    results[index] = {
+                        'document_type': str(classes[best]),
+                        'confidence': round(float(row[best]) * 100, 2),
+                        'method': 'ml'
+                    }
+            except Exception as e:
+                print(f"Classifier model failed: {e}")
+                for index in model_inputs:
+                    results[index] = self.classify_scores(self.score_text(texts[index]))
+        
+        return results
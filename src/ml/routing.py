@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import defaultdict
+
+from utils.metrics import get_metrics
+
+PATHS = ('model', 'rule_based', 'cache')
+
+
+class SummaryRouter:
+    """Chooses, for each document, between BART and the rule-based summaries.
+
+    The rule-based summaries of invoices and ID cards are already good and
+    cost microseconds, and short documents gain little from the model, so
+    those go to the rule-based path:
+
+    - ``rule_types``: document types routed to the rule-based path when the
+      classifier is at least ``min_confidence`` sure of the type (a type
+      given by the caller counts as certain)
+    - ``max_tokens``: documents of at most this many tokens
+    - ``max_queue``: when this many texts are already waiting for the
+      model, new documents are summarized rule-based instead (0: no limit)
+    - ``slo_ms``: latency objective; when the expected model latency (the
+      average batch time, times the batches queued ahead plus one) exceeds
+      it, documents degrade to the rule-based path until the queue drains
+      (0: off)
+
+    Every decision is counted by path and reason, and every summary's
+    latency by path, in ``stats()`` and the process metrics.
+    """
+
+    def __init__(self, rule_types=None, max_tokens=None, min_confidence=None, max_queue=None,
+                 slo_ms=None):
+        if rule_types is None:
+            rule_types = os.getenv('SUMMARIZER_RULE_TYPES', 'invoice,pan,aadhar').split(',')
+        self.rule_types = {doc_type.strip() for doc_type in rule_types if doc_type.strip()}
+        if max_tokens is None:
+            max_tokens = int(os.getenv('SUMMARIZER_RULE_MAX_TOKENS', 100))
+        self.max_tokens = max_tokens
+        if min_confidence is None:
+            min_confidence = float(os.getenv('SUMMARIZER_RULE_MIN_CONFIDENCE', 50))
+        self.min_confidence = min_confidence
+        if max_queue is None:
+            max_queue = int(os.getenv('SUMMARIZER_MAX_QUEUE', 0))
+        self.max_queue = max_queue
+        if slo_ms is None:
+            slo_ms = float(os.getenv('SUMMARIZER_SLO_MS', 0))
+        self.slo_ms = slo_ms
+
+        self._lock = threading.Lock()
+        self._reasons = defaultdict(int)
+        self._counts = defaultdict(int)
+        self._latency = defaultdict(float)
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+    def route(self, tokens, document_type, confidence=None, load=None):
+        """``(path, reason)`` for a document of ``tokens`` estimated model tokens.
+
+        ``load`` is the batcher's ``load()``; without it the queue and SLO
+        checks are skipped.
+        """
+        if document_type in self.rule_types and (confidence is None or confidence >= self.min_confidence):
+            return 'rule_based', 'document_type'
+        if tokens <= self.max_tokens:
+            return 'rule_based', 'short'
+        if load is not None:
+            if self.max_queue and load['queue_depth'] >= self.max_queue:
+                return 'rule_based', 'queue_full'
+            if self.slo_ms and self.expected_model_ms(load) > self.slo_ms:
+                return 'rule_based', 'slo'
+        return 'model', 'model'
+
+    @staticmethod
+    def expected_model_ms(load):
+        """Time a text submitted now would take to summarize, from the batcher's load"""
+        batches_ahead = load['queue_depth'] // load['max_batch_size']
+        return load['avg_inference_ms'] * (batches_ahead + 1)
+
+    def record(self, path, reason, elapsed):
+        """Count a summary served by ``path`` and its latency in seconds"""
+        with self._lock:
+            self._reasons[(path, reason)] += 1
+            self._counts[path] += 1
+            self._latency[path] += elapsed
+        metrics = get_metrics()
+        metrics.inc('smartdoc_summary_route_total', {'path': path, 'reason': reason})
+        metrics.observe('smartdoc_summary_duration_seconds', elapsed, {'path': path})
+
+    def stats(self):
+        with self._lock:
+            paths = {
+                path: {
+                    'count': self._counts[path],
+                    'avg_ms': round(self._latency[path] * 1000 / self._counts[path], 3)
+                    if self._counts[path] else 0,
+                    'reasons': {
+                        reason: count for (name, reason), count in sorted(self._reasons.items())
+                        if name == path
+                    }
+                }
+                for path in PATHS
+            }
+        return {
+            'rule_types': sorted(self.rule_types),
+            'max_tokens': self.max_tokens,
+            'min_confidence': self.min_confidence,
+            'max_queue': self.max_queue,
+            'slo_ms': self.slo_ms,
+            'paths': paths
+        }
@@ -1,68 +1,430 @@
+import functools
+import hashlib
+import itertools
+import os
 import re
+import threading
+import time
+
+from ml.backends import DISTILLED_MODEL_NAME, load_backend
+from ml.batching import BatchScheduler
+from ml.routing import SummaryRouter
+from utils.cache import ResultCache
+from utils.forking import register_after_fork
+from utils.normalized_text import NormalizedText
+from utils.tracing import traced
+
+AMOUNT_PATTERN = re.compile(r'[\$₹]\s*[\d,]+\.?\d*')
+COMPANY_PATTERN = re.compile(r'(Company|From|Invoice from):?\s*([A-Za-z\s&.,]+)', re.IGNORECASE)
+NAME_PATTERNS = (
+    re.compile(r'Name:?\s*([A-Za-z\s]+)'),
+    re.compile(r'([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)'),
+)
+
 
 class TextSummarizer:
-    def __init__(self):
+    MODEL_NAME = "facebook/bart-large-cnn"
+    # Longest text, in characters, sent to the model without chunking
+    TRUNCATE_CHARS = 1024
+    # The issuer of an invoice and the holder of an ID card are looked for
+    # in this many leading characters, not the whole text
+    HEAD_CHARS = 16 * 1024
+    # Trailing characters first searched for an invoice's total; the
+    # window grows fourfold until an amount is found, up to TAIL_MAX_CHARS
+    TAIL_CHARS = 4 * 1024
+    TAIL_MAX_CHARS = 256 * 1024
+    
+    def __init__(self, load_model=True, wait_timeout=None, backend=None, model_name=None,
+                 threads=None, cache=None, router=None):
         print("TextSummarizer initialized")
+        # Inference backend (torch, quantized or onnx), model and CPU threads
+        self.backend = backend or os.getenv('SUMMARIZER_BACKEND', 'torch')
+        model_name = model_name or os.getenv('SUMMARIZER_MODEL', self.MODEL_NAME)
+        if model_name == 'distilled':
+            model_name = DISTILLED_MODEL_NAME
+        self.model_name = model_name
+        if threads is None:
+            threads = int(os.getenv('SUMMARIZER_THREADS', 0)) or None
+        self.threads = threads
         self.summarizer = None
         self.model_loaded = False
+        self.model_state = 'not_loaded'
+        self.model_load_time = None
+        # Seconds a request may wait for a model that is still loading
+        # before it falls back to the rule-based summary
+        if wait_timeout is None:
+            wait_timeout = float(os.getenv('SUMMARIZER_WAIT_TIMEOUT', 0))
+        self.wait_timeout = wait_timeout
+        # Long documents are split into model-sized chunks, summarized
+        # together and then summarized again from the chunk summaries
+        self.chunked = os.getenv('SUMMARIZER_CHUNKED', 'true').lower() == 'true'
+        self.chunk_tokens = int(os.getenv('SUMMARIZER_CHUNK_TOKENS', 900))
+        self.max_chunks = int(os.getenv('SUMMARIZER_MAX_CHUNKS', 16))
+        self.max_input_tokens = int(os.getenv('SUMMARIZER_MAX_INPUT_TOKENS', 8192))
+        self.max_reduce_depth = 3
+        # Summaries already produced, keyed by text, type, length, model and
+        # chunking settings (cache_tag)
+        if cache is None:
+            cache = ResultCache(
+                max_bytes=int(os.getenv('SUMMARY_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+                db_path=os.getenv('SUMMARY_CACHE_PATH') or None,
+                name='summaries'
+            )
+        self.cache = cache
+        # Picks BART or the rule-based summary for each document
+        self.router = router or SummaryRouter()
+        # The pipeline is shared by every request thread
+        self._inference_lock = threading.Lock()
+        # Concurrent requests are grouped into batched pipeline calls
+        self.batcher = BatchScheduler(self._run_pipeline_batch)
+        self._load_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._load_finished = threading.Event()
+        self._load_thread = None
+        
+        # Forked workers (job pool, pre-forking servers) inherit this object
+        # but none of its threads
+        register_after_fork(self._after_fork)
+        
+        if load_model:
+            self.load_model()
+    
+    def _after_fork(self):
+        # Locks may have been held by a parent thread at fork time
+        self._inference_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        if not self._load_finished.is_set():
+            # The parent's loader thread did not come along
+            self._load_thread = None
+            self.model_state = 'not_loaded'
+        self.batcher.reset_after_fork()
+        self.router.reset_after_fork()
+    
+    def load_model(self):
+        """Load the summarization pipeline, importing the backend only now"""
+        with self._load_lock:
+            if self._load_finished.is_set():
+                return self.model_loaded
+            
+            self.model_state = 'loading'
+            started = time.perf_counter()
+            try:
+                print(f"Loading {self.model_name} ({self.backend}) for summarization...")
+                self.summarizer = load_backend(self.backend, self.model_name, self.threads)
+                self.model_loaded = True
+                self.model_state = 'ready'
+                print("Summarization model loaded successfully!")
+                self.invalidate_stale_summaries()
+            except Exception as e:
+                self.model_state = 'failed'
+                print(f"Could not load summarization model: {e}")
+                print("Falling back to rule-based summarization")
+            finally:
+                self.model_load_time = round(time.perf_counter() - started, 3)
+                self._load_finished.set()
+        
+        return self.model_loaded
+    
+    def start_background_load(self):
+        """Load the model on a daemon thread so the caller is not blocked"""
+        with self._thread_lock:
+            if self._load_thread is None and not self._load_finished.is_set():
+                self.model_state = 'loading'
+                self._load_thread = threading.Thread(
+                    target=self.load_model,
+                    name='summarizer-warmup',
+                    daemon=True
+                )
+                self._load_thread.start()
+        return self._load_thread
+    
+    def is_ready(self):
+        """True once model loading has finished, successfully or not"""
+        return self._load_finished.is_set()
+    
+    def wait_until_ready(self, timeout=None):
+        return self._load_finished.wait(timeout)
+    
+    def model_available(self):
+        """Whether the model can serve this request, honouring wait_timeout"""
+        if self.model_loaded:
+            return True
+        
+        # Lazy mode: the first request triggers the load
+        self.start_background_load()
+        if self.wait_timeout > 0:
+            self._load_finished.wait(self.wait_timeout)
+        return self.model_loaded
+    
+    @property
+    def model_id(self):
+        """Identifies the model and backend producing summaries"""
+        return f"{self.model_name}:{self.backend}"
+    
+    @property
+    def cache_tag(self):
+        """Tags cached model summaries: the model plus the settings shaping its output.
         
-        try:
-            from transformers import pipeline
-            print("Loading BART model for summarization...")
-            self.summarizer = pipeline(
-                "summarization", 
-                model="facebook/bart-large-cnn",
-                device=-1  # Use CPU
+        A change to the chunking settings changes the tag, so summaries
+        made under the old ones are not served, and are dropped once the
+        model loads.
+        """
+        if self.chunked:
+            shaping = f"chunks={self.chunk_tokens}x{self.max_chunks},input={self.max_input_tokens}"
+        else:
+            shaping = f"truncate={self.TRUNCATE_CHARS}"
+        return f"{self.model_id}:{shaping}"
+    
+    def summary_key(self, clean_text, document_type, max_length, mode):
+        """Cache key of a summary: cleaned text hash plus every parameter shaping it"""
+        digest = hashlib.sha256(clean_text.encode('utf-8')).hexdigest()
+        return f"{digest}:{document_type}:{max_length}:{mode}"
+    
+    def invalidate_cache(self, tag=None):
+        """Forget summaries cached under ``tag`` (see cache_tag), or all of them"""
+        self.cache.invalidate(tag)
+    
+    def invalidate_stale_summaries(self):
+        """Drop summaries from any model or settings other than the ones now loaded"""
+        for tag in self.cache.tags():
+            if tag not in (self.cache_tag, 'rule_based'):
+                self.cache.invalidate(tag)
+    
+    def model_status(self):
+        return {
+            'model': self.model_name,
+            'backend': self.backend,
+            'threads': self.threads,
+            'model_state': self.model_state,
+            'model_load_time': self.model_load_time,
+            'batching': self.batcher.stats(),
+            'routing': self.router.stats(),
+            'summary_cache': self.cache.stats()
+        }
+    
+    def _run_pipeline_batch(self, texts, max_length, min_length):
+        """Run one batched generation call; used by the batch scheduler"""
+        with self._inference_lock:
+            outputs = self.summarizer(
+                texts,
+                max_length=max_length,
+                min_length=min_length,
+                do_sample=False,
+                truncation=True,
+                batch_size=len(texts)
             )
-            self.model_loaded = True
-            print("BART model loaded successfully!")
-        except Exception as e:
-            print(f"Could not load BART model: {e}")
-            print("Falling back to rule-based summarization")
+        return [output['summary_text'] for output in outputs]
     
-    def summarize_text(self, text, document_type='other', max_length=150):
+    @traced(
+        'summarizer.summarize_text',
+        lambda self, text, document_type='other', max_length=150, confidence=None: {
+            'text_length': len(text) if text else 0,
+            'document_type': document_type
+        }
+    )
+    def summarize_text(self, text, document_type='other', max_length=150, confidence=None):
         """Main summarization method with improved fallback"""
-        if not text or len(text.strip()) < 50:
-            return "Document too short to generate a meaningful summary."
+        return self.summarize_many([text], [document_type], max_length, [confidence])[0]
+    
+    @traced(
+        'summarizer.summarize_many',
+        lambda self, texts, document_types, max_length=150, confidences=None: {
+            'documents': len(texts),
+            'text_length': sum(len(text) for text in texts if text),
+            'document_types': list(document_types),
+            'model_id': self.model_id,
+            'model_loaded': self.model_loaded
+        }
+    )
+    def summarize_many(self, texts, document_types, max_length=150, confidences=None):
+        """Summarize several texts, submitting all model work at once.
         
-        # Clean the text first
-        clean_text = self.clean_text_for_summary(text)
+        Each text is routed by ``self.router`` to BART or to the rule-based
+        summary, using its type, its length, the classifier's confidence
+        in that type (``confidences``; None means the type is certain) and
+        the model's queue. Every text that goes to BART is queued on the
+        batch scheduler before any result is awaited, so documents
+        summarized together share batched pipeline calls.
+        """
+        summaries = [None] * len(texts)
+        pending = []
+        use_model = None
+        if confidences is None:
+            confidences = [None] * len(texts)
         
-        # Try ML-based summarization first
-        if self.model_loaded and self.summarizer:
-            try:
-                print("Using BART model for summarization...")
-                
-                # Adjust max_length based on input length
-                input_length = len(clean_text.split())
-                adjusted_max_length = min(max_length, max(30, input_length // 3))
-                min_length = max(20, adjusted_max_length // 3)
-                
-                # Truncate if too long for the model
-                if len(clean_text) > 1024:
-                    clean_text = clean_text[:1024]
-                
-                summary = self.summarizer(
-                    clean_text,
-                    max_length=adjusted_max_length,
-                    min_length=min_length,
-                    do_sample=False,
-                    truncation=True
+        for index, (text, document_type, confidence) in enumerate(zip(texts, document_types, confidences)):
+            started = time.perf_counter()
+            # Normalized text is already stripped; skip copying it again
+            if not text or len(text if isinstance(text, NormalizedText) else text.strip()) < 50:
+                summaries[index] = "Document too short to generate a meaningful summary."
+                self.router.record('rule_based', 'too_short', time.perf_counter() - started)
+                continue
+            
+            # Clean the text first
+            clean_text = self.clean_text_for_summary(text)
+            
+            if use_model is None:
+                use_model = bool(self.model_available() and self.summarizer)
+            if use_model:
+                path, reason = self.router.route(
+                    self.estimate_tokens(clean_text), document_type, confidence, self.batcher.load()
                 )
-                
-                result = summary[0]['summary_text']
+            else:
+                path, reason = 'rule_based', 'model_unavailable'
+            
+            # Summaries produced before are served from the cache
+            mode = self.cache_tag if path == 'model' else 'rule_based'
+            key = self.summary_key(clean_text, document_type, max_length, mode)
+            cached = self.cache.get(key)
+            if cached is not None:
+                summaries[index] = cached['summary']
+                self.router.record('cache', reason, time.perf_counter() - started)
+                continue
+            
+            if path == 'model':
+                try:
+                    pending.append((index, clean_text, document_type, key, started,
+                                    self._submit_document(clean_text, max_length)))
+                    continue
+                except Exception as e:
+                    print(f"BART summarization failed: {e}")
+                    print("Falling back to rule-based summarization")
+                    summaries[index] = self.enhanced_rule_based_summary(clean_text, document_type)
+                    self.router.record('rule_based', 'model_error', time.perf_counter() - started)
+                    continue
+            
+            # Rule-based summarization
+            summaries[index] = self.enhanced_rule_based_summary(clean_text, document_type)
+            self.cache.set(key, {'summary': summaries[index]}, tag=mode)
+            self.router.record('rule_based', reason, time.perf_counter() - started)
+        
+        for index, clean_text, document_type, key, started, resolve in pending:
+            try:
+                result = resolve()
                 print(f"BART summary generated: {len(result)} characters")
-                return result
-                
+                summaries[index] = result
+                self.cache.set(key, {'summary': result}, tag=self.cache_tag)
+                self.router.record('model', 'model', time.perf_counter() - started)
             except Exception as e:
+                # The fallback is not cached under the model's key
                 print(f"BART summarization failed: {e}")
                 print("Falling back to rule-based summarization")
+                summaries[index] = self.enhanced_rule_based_summary(clean_text, document_type)
+                self.router.record('rule_based', 'model_error', time.perf_counter() - started)
+        
+        return summaries
+    
+    def _submit_document(self, clean_text, max_length):
+        """Queue a document for BART; returns a callable that waits for its summary.
+        
+        Text that fits the model window is summarized directly. Longer text
+        is split into chunks which are all queued at once (so they share
+        batched pipeline calls), and the chunk summaries are reduced when
+        the result is collected.
+        """
+        print("Using BART model for summarization...")
+        
+        if not self.chunked:
+            # Truncate if too long for the model
+            future = self._submit(clean_text[:self.TRUNCATE_CHARS], max_length)
+            return future.result
         
-        # Fallback to enhanced rule-based summarization
-        return self.enhanced_rule_based_summary(clean_text, document_type)
+        chunks = self.split_chunks(clean_text)
+        if len(chunks) == 1:
+            return self._submit(chunks[0], max_length).result
+        
+        print(f"Summarizing long document in {len(chunks)} chunks")
+        futures = [self._submit(chunk, max_length) for chunk in chunks]
+        return functools.partial(self._reduce, futures, max_length)
+    
+    def _submit(self, clean_text, max_length):
+        """Queue one model-sized text for BART and return a Future of its summary"""
+        # Adjust max_length based on input length
+        input_length = len(clean_text.split())
+        adjusted_max_length = min(max_length, max(30, input_length // 3))
+        min_length = max(20, adjusted_max_length // 3)
+        
+        return self.batcher.submit(
+            clean_text,
+            max_length=adjusted_max_length,
+            min_length=min_length,
+            group=max_length
+        )
+    
+    def _reduce(self, futures, max_length, depth=1):
+        """Combine chunk summaries, summarizing again until they fit one call"""
+        combined = ' '.join(future.result() for future in futures)
+        
+        chunks = self.split_chunks(combined)
+        if len(chunks) > 1 and depth < self.max_reduce_depth:
+            futures = [self._submit(chunk, max_length) for chunk in chunks]
+            return self._reduce(futures, max_length, depth + 1)
+        
+        return self._submit(chunks[0], max_length).result()
+    
+    @staticmethod
+    def estimate_tokens(text):
+        """Model tokens in ``text``, estimated at four characters a token without reading it"""
+        return (len(text) + 3) // 4
+    
+    def count_tokens(self, text):
+        """Model tokens in ``text``, estimated from words without a tokenizer"""
+        tokenizer = getattr(self.summarizer, 'tokenizer', None)
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False))
+        return (len(text.split()) * 4 + 2) // 3
+    
+    def split_chunks(self, text):
+        """Split text at sentence boundaries into chunks of at most chunk_tokens.
+        
+        At most ``max_chunks`` chunks and ``max_input_tokens`` tokens are
+        kept; the rest of the text is dropped so latency stays bounded.
+        """
+        budget = min(self.max_input_tokens, self.max_chunks * self.chunk_tokens)
+        chunks = []
+        current = []
+        current_tokens = 0
+        used = 0
+        
+        for sentence in self._chunk_units(text):
+            tokens = self.count_tokens(sentence)
+            if used + tokens > budget:
+                break
+            if current and current_tokens + tokens > self.chunk_tokens:
+                if len(chunks) + 1 >= self.max_chunks:
+                    break
+                chunks.append(' '.join(current))
+                current = []
+                current_tokens = 0
+            current.append(sentence)
+            current_tokens += tokens
+            used += tokens
+        
+        if current:
+            chunks.append(' '.join(current))
+        return chunks or [text[:self.TRUNCATE_CHARS]]
+    
+    def _chunk_units(self, text):
+        """Sentences of the text, with over-long sentences split into word runs"""
+        for sentence in re.split(r'(?<=[.!?])\s+', text):
+            if not sentence:
+                continue
+            if self.count_tokens(sentence) <= self.chunk_tokens:
+                yield sentence
+                continue
+            words = sentence.split()
+            # Words per piece, leaving headroom for words of several tokens
+            step = max(1, self.chunk_tokens // 2)
+            for offset in range(0, len(words), step):
+                yield ' '.join(words[offset:offset + step])
     
     def clean_text_for_summary(self, text):
         """Clean text specifically for summarization"""
+        if isinstance(text, NormalizedText):
+            # Whitespace is already collapsed and the ends stripped
+            return text
+        
         # Remove excessive whitespace
         text = re.sub(r'\s+', ' ', text)
         
@@ -70,15 +432,21 @@ class TextSummarizer:
         lines = text.split('\n')
         meaningful_lines = [line.strip() for line in lines if len(line.strip()) > 10]
         
-        return ' '.join(meaningful_lines).strip()
+        return NormalizedText(' '.join(meaningful_lines).strip())
     
     def enhanced_rule_based_summary(self, text, document_type):
-        """Enhanced rule-based summarization with document-specific logic"""
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 15]
+        """Enhanced rule-based summarization with document-specific logic.
+        
+        Sentences are split off lazily and each summarizer stops reading
+        once it has its facts, so the cost of a summary hardly grows with
+        the size of the document.
+        """
+        sentences = (s for s in NormalizedText.of(text).iter_sentences() if len(s) > 15)
         
-        if len(sentences) == 0:
+        first = next(sentences, None)
+        if first is None:
             return "Unable to generate summary from the provided text."
+        sentences = itertools.chain((first,), sentences)
         
         # Document-specific summarization
         if document_type == 'invoice':
@@ -95,18 +463,19 @@ class TextSummarizer:
         key_info = []
         
         # Look for company name
-        company_match = re.search(r'(Company|From|Invoice from):?\s*([A-Za-z\s&.,]+)', full_text, re.IGNORECASE)
+        company_match = COMPANY_PATTERN.search(full_text, 0, self.HEAD_CHARS)
         if company_match:
             key_info.append(f"Invoice from {company_match.group(2).strip()}")
         
         # Look for amounts
-        amounts = re.findall(r'[\$₹]\s*[\d,]+\.?\d*', full_text)
-        if amounts:
-            total_amount = amounts[-1]  # Usually the last amount is total
+        total_amount = self.last_amount(full_text)  # Usually the last amount is total
+        if total_amount:
             key_info.append(f"total amount {total_amount}")
         
         # Look for services/items
-        for sentence in sentences[:5]:
+        read = 0
+        for sentence in itertools.islice(sentences, 5):
+            read += 1
             if any(word in sentence.lower() for word in ['service', 'product', 'item', 'development', 'design']):
                 key_info.append(f"for {sentence.lower()}")
                 break
@@ -114,7 +483,28 @@ class TextSummarizer:
         if key_info:
             return '. '.join(key_info).capitalize() + '.'
         else:
-            return f"Invoice document with {len(sentences)} line items processed."
+            # Nothing found; only now are the remaining sentences counted
+            return f"Invoice document with {read + sum(1 for _ in sentences)} line items processed."
+    
+    def last_amount(self, text):
+        """The last currency amount in the end of ``text``, scanning back from it.
+        
+        An amount never contains a currency sign, so amounts start at the
+        same places wherever a scan begins, and the last one found in a
+        trailing window is the last in the text. Amounts further than
+        ``TAIL_MAX_CHARS`` from the end are not looked for.
+        """
+        window = self.TAIL_CHARS
+        while True:
+            start = max(0, len(text) - window)
+            match = None
+            for match in AMOUNT_PATTERN.finditer(text, start):
+                pass
+            if match is not None:
+                return match.group()
+            if start == 0 or window >= self.TAIL_MAX_CHARS:
+                return None
+            window = min(window * 4, self.TAIL_MAX_CHARS)
     
     def summarize_resume(self, sentences, full_text):
         """Resume-specific summarization"""
@@ -137,13 +527,8 @@ class TextSummarizer:
         doc_name = "PAN Card" if doc_type == 'pan' else "Aadhar Card"
         
         # Look for name
-        name_patterns = [
-            r'Name:?\s*([A-Za-z\s]+)',
-            r'([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)'
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, full_text)
+        for pattern in NAME_PATTERNS:
+            match = pattern.search(full_text, 0, self.HEAD_CHARS)
             if match:
                 name = match.group(1).strip()
                 return f"{doc_name} belonging to {name}."
@@ -152,6 +537,7 @@ class TextSummarizer:
     
     def generic_summary(self, sentences):
         """Generic summarization for unknown document types"""
+        sentences = list(itertools.islice(sentences, 3))
         if len(sentences) >= 3:
             return '. '.join(sentences[:3]) + '.'
         elif len(sentences) >= 1:
@@ -0,0 +1,130 @@
+import json
+import time
+from collections import OrderedDict
+
+from utils.forking import ForkSafeDatabase
+
+
+class ResultCache(ForkSafeDatabase):
+    """Two-tier cache for JSON-serialisable results.
+
+    The memory tier is an LRU bounded by the total size of the stored JSON
+    (``max_bytes``). When ``db_path`` is given, entries are also written to
+    a SQLite file so they survive restarts; a disk hit is promoted back
+    into memory. Values are stored serialised, so every ``get`` returns a
+    fresh copy the caller is free to modify.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, db_path=None, name='cache'):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._size = 0
+        self.open_db(db_path)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self._db is not None:
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, tag TEXT, created REAL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS entries_tag ON entries (tag)')
+            self._db.commit()
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(entry[0])
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value, tag FROM entries WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value, tag=None):
+        """Store ``value``; ``tag`` groups entries for invalidate()"""
+        payload = json.dumps(value)
+        with self._lock:
+            self._store(key, payload, tag)
+            if self._db is not None:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO entries (key, value, tag, created) VALUES (?, ?, ?, ?)',
+                    (key, payload, tag, time.time())
+                )
+                self._db.commit()
+
+    def _store(self, key, payload, tag):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old[0])
+
+        self._entries[key] = (payload, tag)
+        self._size += size
+
+        while self._size > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self, tag=None):
+        """Drop every entry with ``tag``, or everything when tag is None"""
+        with self._lock:
+            if tag is None:
+                self._entries.clear()
+                self._size = 0
+            else:
+                for key in [k for k, (_, t) in self._entries.items() if t == tag]:
+                    payload, _ = self._entries.pop(key)
+                    self._size -= len(payload)
+
+            if self._db is not None:
+                if tag is None:
+                    self._db.execute('DELETE FROM entries')
+                else:
+                    self._db.execute('DELETE FROM entries WHERE tag = ?', (tag,))
+                self._db.commit()
+
+    def tags(self):
+        """Tags of the stored entries, in memory and on disk"""
+        with self._lock:
+            tags = {tag for _, tag in self._entries.values()}
+            if self._db is not None:
+                tags.update(row[0] for row in self._db.execute('SELECT DISTINCT tag FROM entries'))
+        tags.discard(None)
+        return tags
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'persistent': self._db is not None,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0
+            }
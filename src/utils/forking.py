@@ -0,0 +1,51 @@
+import functools
+import os
+import sqlite3
+import threading
+import weakref
+
+
+def _call_if_alive(method_ref):
+    method = method_ref()
+    if method is not None:
+        method()
+
+
+def register_after_fork(method):
+    """Call the bound ``method`` in every forked child while its object is alive.
+
+    Pre-forking servers and fork-based process pools inherit objects built
+    before the fork, but none of their threads, and locks or connections
+    held at fork time are not safe to keep using.
+    """
+    os.register_at_fork(
+        after_in_child=functools.partial(_call_if_alive, weakref.WeakMethod(method))
+    )
+
+
+class ForkSafeDatabase:
+    """Mixin for objects keeping a SQLite connection in ``_db``, guarded by ``_lock``.
+
+    Neither the connection nor the lock may be used by a forked child, so
+    ``open_db`` also arranges for every child to open its own.
+    """
+
+    def open_db(self, path):
+        """Connect to the SQLite file ``path``, creating its directory; None for no database"""
+        self._db_path = path
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = self._connect_db()
+        register_after_fork(self._reopen_db)
+
+    def _connect_db(self):
+        return sqlite3.connect(self._db_path, check_same_thread=False)
+
+    def _reopen_db(self):
+        self._lock = threading.Lock()
+        if self._db is not None:
+            self._db = self._connect_db()
@@ -0,0 +1,169 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a cached lookup up to a long multi-page OCR run
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """In-process counters and histograms, rendered in Prometheus text format.
+
+    Metrics are created on first use. Values owned by other components
+    (queue depths, cache statistics) are read at scrape time through
+    collectors: callables returning ``(name, type, help, samples)`` tuples
+    where samples is a list of ``(labels dict, value)``.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, labels=None, amount=1):
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name, value, labels=None, buckets=None):
+        """Record ``value``; ``buckets`` overrides the default upper bounds"""
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(tuple(buckets or self.buckets))
+            histogram.observe(value)
+
+    def register_collector(self, collector):
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self, collectors=()):
+        """The current values in Prometheus text exposition format"""
+        lines = []
+
+        def header(name, kind):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for name in sorted(self._counters):
+                header(name, 'counter')
+                for key, value in self._counters[name].items():
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+            for name in sorted(self._histograms):
+                header(name, 'histogram')
+                for key, histogram in self._histograms[name].items():
+                    cumulative = 0
+                    bounds = histogram.buckets + (float('inf'),)
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        labels = _format_labels(key + (('le', _format_value(float(bound))),))
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.total)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+
+        for collector in list(self._collectors) + list(collectors):
+            try:
+                collected = collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, samples in collected:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    labels = tuple(sorted((labels or {}).items()))
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+_metrics = MetricsRegistry()
+_metrics.describe('smartdoc_stage_duration_seconds', 'Time spent in each pipeline stage')
+_metrics.describe('smartdoc_stage_total', 'Pipeline stage executions by outcome')
+_metrics.describe('smartdoc_model_inference_seconds', 'Summarization model call duration')
+_metrics.describe('smartdoc_model_batch_size', 'Texts per summarization model call')
+_metrics.describe('smartdoc_summary_route_total', 'Summaries by path (model, rule_based, cache) and routing reason')
+_metrics.describe('smartdoc_summary_duration_seconds', 'Time to produce a summary, by path')
+_metrics.describe('smartdoc_http_requests_total', 'HTTP requests by endpoint and status')
+_metrics.describe('smartdoc_http_request_duration_seconds', 'HTTP request duration by endpoint')
+
+
+def get_metrics():
+    """The process-wide metrics registry"""
+    return _metrics
+
+
+@contextmanager
+def stage_timer(stage, timings=None):
+    """Time a pipeline stage into the stage histogram and counter.
+
+    When ``timings`` is a dict the elapsed milliseconds are also added to
+    it under the stage name, for per-request breakdowns.
+    """
+    started = time.perf_counter()
+    status = 'success'
+    try:
+        yield
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _metrics.observe('smartdoc_stage_duration_seconds', elapsed, {'stage': stage})
+        _metrics.inc('smartdoc_stage_total', {'stage': stage, 'status': status})
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0) + elapsed * 1000, 3)
+
+
+def record_stage_timings(timings, exclude=('pipeline', 'total')):
+    """Add a timings breakdown measured in another process to the stage metrics"""
+    for stage, elapsed_ms in (timings or {}).items():
+        if stage in exclude:
+            continue
+        _metrics.observe('smartdoc_stage_duration_seconds', elapsed_ms / 1000, {'stage': stage})
+        _metrics.inc('smartdoc_stage_total', {'stage': stage, 'status': 'success'})
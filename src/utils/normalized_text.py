@@ -0,0 +1,59 @@
+import re
+from collections import Counter
+from functools import cached_property
+
+TOKEN_PATTERN = re.compile(r'\w+')
+# A run of text between sentence terminators, without surrounding whitespace
+SENTENCE_PATTERN = re.compile(r'[^.!?\s](?:[^.!?]*[^.!?\s])?')
+
+
+class NormalizedText(str):
+    """Cleaned document text, with the views pipeline stages derive from it.
+
+    ``TextCleaner.clean_text`` produces one per document. Being a ``str``,
+    it goes anywhere the cleaned text did; the lowercase and uppercase
+    copies, the word tokens and the sentences are computed on first use and
+    then shared by every stage that needs them, instead of each stage
+    re-deriving its own.
+    """
+
+    @classmethod
+    def of(cls, text):
+        """``text`` if it is already normalized, otherwise wrapped as is (not cleaned)"""
+        return text if isinstance(text, cls) else cls(text)
+
+    def __reduce__(self):
+        # Pickle as the text alone, without the cached views
+        return (self.__class__, (str(self),))
+
+    @cached_property
+    def lower_text(self):
+        return str.lower(self)
+
+    @cached_property
+    def upper_text(self):
+        return str.upper(self)
+
+    @cached_property
+    def tokens(self):
+        """Lowercase word tokens, in order"""
+        return TOKEN_PATTERN.findall(self.lower_text)
+
+    @cached_property
+    def token_counts(self):
+        return Counter(self.tokens)
+
+    @cached_property
+    def sentence_spans(self):
+        """``(start, end)`` offsets of the sentences, split at . ! and ? and stripped"""
+        return [match.span() for match in SENTENCE_PATTERN.finditer(self)]
+
+    @cached_property
+    def sentences(self):
+        return SENTENCE_PATTERN.findall(self)
+
+    def iter_sentences(self):
+        """The sentences one at a time, found only as far as they are read"""
+        if 'sentences' in self.__dict__:
+            return iter(self.sentences)
+        return (match.group() for match in SENTENCE_PATTERN.finditer(self))
@@ -1,19 +1,26 @@
 import re
 
+from utils.normalized_text import NormalizedText
+
+# Anything but word characters, whitespace and punctuation
+SPECIAL_CHARACTERS = re.compile(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]]')
+
 class TextCleaner:
     def __init__(self):
         print("TextCleaner initialized")
     
     @staticmethod
     def clean_text(text):
-        """Clean and normalize extracted text"""
-        if not text:
-            return ""
+        """Clean and normalize extracted text.
         
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        Returns a ``NormalizedText``: the cleaned string, carrying the
+        lowercase, token and sentence views later stages share.
+        """
+        if not text:
+            return NormalizedText("")
         
-        # Remove special characters but keep punctuation
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]]', '', text)
+        # Collapse whitespace (split/join is the same as re.sub(r'\s+', ' ')
+        # but faster), then remove special characters but keep punctuation
+        text = SPECIAL_CHARACTERS.sub('', ' '.join(text.split()))
         
-        return text.strip()
+        return NormalizedText(text.strip())
@@ -0,0 +1,308 @@
+import contextvars
+import functools
+import importlib
+import json
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+
+# The span the current request (or job) is in; copied into pool threads
+# by in_context
+_current_span = contextvars.ContextVar('smartdoc_span', default=None)
+
+
+class Span:
+    """One timed operation of a trace, with its attributes"""
+
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'start', 'started', 'duration_ms',
+                 'attributes', 'status', 'error', 'token', 'streaming')
+
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.attributes = dict(attributes or {})
+        self.status = 'ok'
+        self.error = None
+        self.token = None
+        self.streaming = False
+        trace.spans.append(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def fail(self, error):
+        self.status = 'error'
+        self.error = str(error)
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self.started) * 1000, 3)
+
+    def to_dict(self):
+        span = {
+            'request_id': self.trace.request_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': round(self.start, 6),
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'attributes': self.attributes
+        }
+        if self.error is not None:
+            span['error'] = self.error
+        return span
+
+
+class _Trace:
+    __slots__ = ('request_id', 'sampled', 'spans')
+
+    def __init__(self, request_id, sampled):
+        self.request_id = request_id
+        self.sampled = sampled
+        self.spans = []
+
+
+class JsonLinesExporter:
+    """Appends finished traces to a file, one JSON object per span.
+
+    Each trace is written with a single append, so server workers and job
+    processes can share the file.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+
+    def export(self, spans):
+        data = ''.join(json.dumps(span, default=str) + '\n' for span in spans).encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def build_exporter(name=None):
+    """The exporter named by TRACE_EXPORTER: ``jsonl``, ``none`` or ``module:factory``"""
+    name = name or os.getenv('TRACE_EXPORTER', 'jsonl')
+    if name == 'none':
+        return None
+    if name == 'jsonl':
+        default_path = os.path.join(os.getenv('UPLOAD_FOLDER', 'uploads'), 'traces.jsonl')
+        return JsonLinesExporter(os.getenv('TRACE_PATH', default_path))
+    module, _, factory = name.partition(':')
+    if not factory:
+        raise ValueError(f"Unknown trace exporter: {name}")
+    return getattr(importlib.import_module(module), factory)()
+
+
+class Tracer:
+    """Per-request traces of the component calls, sent to a pluggable exporter.
+
+    A request (or job) opens a trace with ``start_trace``; component
+    methods decorated with ``traced`` add spans to the trace they run in,
+    found through a context variable, and to nothing when there is none.
+    Traces are sampled when they start (``sample_rate``), so unsampled
+    requests cost a context variable lookup per component call. With
+    ``slow_ms`` set, every trace is recorded and unsampled ones are still
+    exported when they took at least that long. Exporters receive a list
+    of span dicts per finished trace through ``export(spans)``.
+    """
+
+    def __init__(self, exporter=None, sample_rate=None, slow_ms=None):
+        if sample_rate is None:
+            sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', 0))
+        self.sample_rate = sample_rate
+        if slow_ms is None:
+            slow_ms = float(os.getenv('TRACE_SLOW_MS', 0))
+        self.slow_ms = slow_ms
+        self._exporter = exporter
+        self._exporter_built = exporter is not None
+
+    @property
+    def exporter(self):
+        if not self._exporter_built:
+            self._exporter = build_exporter()
+            self._exporter_built = True
+        return self._exporter
+
+    @exporter.setter
+    def exporter(self, exporter):
+        self._exporter = exporter
+        self._exporter_built = True
+
+    def start_trace(self, name, request_id=None, sampled=None, **attributes):
+        """Open a trace and make its root span current; None when not recorded.
+
+        ``sampled`` carries the decision of the request a job belongs to;
+        otherwise the trace is sampled at ``sample_rate``.
+        """
+        if sampled is None:
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and not self.slow_ms:
+            return None
+        if self.exporter is None:
+            return None
+        trace = _Trace(request_id or uuid.uuid4().hex, sampled)
+        span = Span(trace, name, attributes=attributes)
+        span.token = _current_span.set(span)
+        return span
+
+    def detach(self, span):
+        """Stop ``span`` being current in the context it started in; the trace stays open"""
+        if span is None or span.token is None:
+            return
+        try:
+            _current_span.reset(span.token)
+        except ValueError:
+            # Detached from another context than it started in
+            _current_span.set(None)
+        span.token = None
+
+    def end_trace(self, span):
+        """Close a trace opened by ``start_trace`` and export it"""
+        if span is None:
+            return
+        self.detach(span)
+        span.finish()
+        if span.trace.sampled or span.duration_ms >= self.slow_ms:
+            try:
+                self.exporter.export([recorded.to_dict() for recorded in span.trace.spans])
+            except Exception as e:
+                print(f"Trace export failed: {e}")
+
+    def stream(self, chunks, span=None):
+        """Produce ``chunks`` inside the trace of ``span`` (the current span),
+        ending the trace once they are exhausted or closed.
+
+        A streamed response body is produced after its handler returned,
+        possibly on other threads, so each chunk is made with the span
+        current. ``span.streaming`` tells the request teardown to only
+        ``detach`` it.
+        """
+        span = span if span is not None else _current_span.get()
+        if span is None:
+            return chunks
+        span.streaming = True
+        return self._stream(iter(chunks), span)
+
+    def _stream(self, chunks, span):
+        try:
+            while True:
+                token = _current_span.set(span)
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    _current_span.reset(token)
+                yield chunk
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+            self.end_trace(span)
+
+    @contextmanager
+    def trace(self, name, request_id=None, sampled=None, **attributes):
+        span = self.start_trace(name, request_id, sampled, **attributes)
+        try:
+            yield span
+        except Exception as e:
+            if span is not None:
+                span.fail(e)
+            raise
+        finally:
+            self.end_trace(span)
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    """The process-wide tracer"""
+    return _tracer
+
+
+def current_span():
+    return _current_span.get()
+
+
+def trace_context():
+    """Request id and sampling decision of the current trace, to hand to a job"""
+    span = _current_span.get()
+    if span is None:
+        return None
+    return {'request_id': span.trace.request_id, 'sampled': span.trace.sampled}
+
+
+def in_context(func):
+    """``func`` running in a copy of the caller's context, for pool threads"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+
+@contextmanager
+def child_span(name, **attributes):
+    """A span of the current trace around the block, or None outside a trace"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    span = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.finish()
+
+
+def traced(name, attributes=None, result_attributes=None):
+    """Record calls of the decorated function as spans of the current trace.
+
+    ``attributes`` is called with the function's arguments and
+    ``result_attributes`` with its return value; each returns a dict of
+    span attributes.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+
+            with child_span(name) as span:
+                if attributes is not None:
+                    _add_attributes(span, attributes, *args, **kwargs)
+                result = func(*args, **kwargs)
+                if result_attributes is not None:
+                    _add_attributes(span, result_attributes, result)
+                return result
+        return wrapper
+    return decorate
+
+
+def _add_attributes(span, attributes, *args, **kwargs):
+    # Tracing must never fail the call it observes
+    try:
+        span.attributes.update(attributes(*args, **kwargs))
+    except Exception as e:
+        span.attributes['attribute_error'] = str(e)
@@ -1,5 +1,26 @@
 import re
 
+from utils.tracing import traced
+
+
+class FieldSpec:
+    """A field the extractor looks for.
+
+    ``pattern`` may define a ``(?P<value>...)`` group to report only part
+    of the match; otherwise the whole match is the value. The value may lie
+    in a lookahead, past the end of the match; matches of the field that
+    start inside its previous value are then skipped.
+    """
+
+    def __init__(self, name, pattern, ignore_case=False, uppercase=False, unique=True):
+        self.name = name
+        self.pattern = pattern
+        self.ignore_case = ignore_case
+        self.uppercase = uppercase
+        self.unique = unique
+        self.compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+
 class FieldExtractor:
     def __init__(self):
         print("FieldExtractor initialized")
@@ -8,62 +29,184 @@ class FieldExtractor:
             'aadhar': r'\b\d{4}\s?\d{4}\s?\d{4}\b',
             'gstin': r'\b\d{2}[A-Z]{5}\d{4}[A-Z]{1}[A-Z\d]{1}[Z]{1}[A-Z\d]{1}\b',
             'email': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            'phone': r'(\+91|91)?[\s-]?[6-9]\d{9}',
-            'amount': r'[\$₹]?\s?\d{1,3}(?:,\d{3})*(?:\.\d{2})?',
+            'phone': r'(?:(?:\+91|91)[\s-]?)?[6-9]\d{9}',
+            'amount': r'(?:[\$₹]\s?)?\d{1,3}(?:,\d{3})*(?:\.\d{2})?',
             'date': r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
-            'invoice_number': r'(?:invoice|inv|bill)[\s#-]*([A-Z0-9-]+)',
+            # The number is captured in a lookahead: the match only consumes
+            # the keyword, so the value can still be read as a date or phone
+            # number by the same scan
+            'invoice_number': r'(?:invoice|inv|bill)[\s#-]*(?=(?P<value>[A-Z0-9-]+))',
         }
-    
+
+        # Fields in priority order: when two patterns match at the same
+        # position the earlier one wins, so specific shapes go first. No
+        # pattern may start with optional whitespace, or it would claim the
+        # space in front of a more specific token.
+        self.fields = {}
+        self.document_fields = {}
+        self.document_types = set()
+        self._matchers = {}
+
+        self.register_field('emails', self.patterns['email'], ignore_case=True)
+        self.register_field('gstin', self.patterns['gstin'], ['invoice', 'bill'],
+                            ignore_case=True, uppercase=True, unique=False)
+        self.register_field('pan_numbers', self.patterns['pan'], ['pan'],
+                            ignore_case=True, uppercase=True, unique=False)
+        self.register_field('invoice_numbers', self.patterns['invoice_number'], ['invoice', 'bill'],
+                            ignore_case=True)
+        self.register_field('aadhar_numbers', self.patterns['aadhar'], ['aadhar'], unique=False)
+        self.register_field('phone_numbers', self.patterns['phone'])
+        self.register_field('dates', self.patterns['date'])
+        self.register_field('amounts', self.patterns['amount'], ['invoice', 'bill'])
+
+    def register_field(self, name, pattern, document_types=None, ignore_case=False,
+                       uppercase=False, unique=True):
+        """Add a field to the single-pass scan.
+
+        ``document_types`` limits the field to those types; None means every
+        document. Fields registered later have lower priority.
+        """
+        self.fields[name] = FieldSpec(name, pattern, ignore_case, uppercase, unique)
+        self.document_fields[name] = set(document_types) if document_types else None
+        self.document_types.update(document_types or ())
+        # Combined patterns are rebuilt on next use
+        self._matchers = {}
+
+    def fields_for(self, document_type):
+        return [
+            spec for name, spec in self.fields.items()
+            if self.document_fields[name] is None or document_type in self.document_fields[name]
+        ]
+
+    def matcher(self, document_type):
+        """One compiled alternation of every field relevant to the document type"""
+        key = document_type if document_type in self.document_types else None
+
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            groups = {}
+            alternatives = []
+            for index, spec in enumerate(self.fields_for(key)):
+                group = f'f{index}'
+                body = spec.pattern
+                value_group = None
+                if '(?P<value>' in body:
+                    value_group = f'{group}_value'
+                    body = body.replace('(?P<value>', f'(?P<{value_group}>')
+                if spec.ignore_case:
+                    body = f'(?i:{body})'
+                alternatives.append(f'(?P<{group}>{body})')
+                groups[group] = (spec, value_group)
+            matcher = (re.compile('|'.join(alternatives)), groups)
+            self._matchers[key] = matcher
+        return matcher
+
+    def scan(self, text, document_type=None):
+        """Yield ``(field name, value, start offset)`` for every match, in one pass"""
+        pattern, groups = self.matcher(document_type)
+        # End of each field's last value, for values read ahead of the match
+        value_ends = {}
+        for match in pattern.finditer(text):
+            # The field's own group closes last, so it is lastgroup
+            group = match.lastgroup
+            spec, value_group = groups[group]
+            if value_group is None or match.group(value_group) is None:
+                value_group = group
+            if match.start() < value_ends.get(group, 0):
+                continue
+            value_ends[group] = match.end(value_group)
+            value = match.group(value_group)
+            start = match.start(value_group)
+
+            # Report the value without surrounding whitespace
+            if value[0].isspace() or value[-1].isspace():
+                stripped = value.lstrip()
+                start += len(value) - len(stripped)
+                value = stripped.rstrip()
+                if not value:
+                    continue
+
+            yield spec.name, value.upper() if spec.uppercase else value, start
+
+    def extract_matches(self, text, document_type=None):
+        """Every field match with its character offsets"""
+        if not text:
+            return []
+        return [
+            {'field': name, 'value': value, 'start': start, 'end': start + len(value)}
+            for name, value, start in self.scan(text, document_type)
+        ]
+
+    def extract_field(self, field, text):
+        """Values of a single field, scanning with its own compiled pattern"""
+        spec = self.fields[field]
+        values = []
+        value_end = 0
+        for match in spec.compiled.finditer(text):
+            if match.start() < value_end:
+                continue
+            value_group = 'value' if 'value' in spec.compiled.groupindex else 0
+            value_end = match.end(value_group)
+            value = match.group(value_group)
+            value = value.strip()
+            if value:
+                values.append(value.upper() if spec.uppercase else value)
+        return list(dict.fromkeys(values)) if spec.unique else values
+
     def extract_emails(self, text):
         """Extract email addresses"""
-        matches = re.findall(self.patterns['email'], text, re.IGNORECASE)
-        return list(set(matches))
-    
+        return self.extract_field('emails', text)
+
     def extract_phone_numbers(self, text):
         """Extract phone numbers"""
-        matches = re.findall(self.patterns['phone'], text)
-        return [match[1] if match[0] else match for match in matches]
-    
+        return self.extract_field('phone_numbers', text)
+
     def extract_amounts(self, text):
         """Extract monetary amounts"""
-        matches = re.findall(self.patterns['amount'], text)
-        return list(set(matches))
-    
+        return self.extract_field('amounts', text)
+
     def extract_dates(self, text):
         """Extract dates"""
-        matches = re.findall(self.patterns['date'], text)
-        return list(set(matches))
-    
+        return self.extract_field('dates', text)
+
     def extract_invoice_numbers(self, text):
         """Extract invoice numbers"""
-        matches = re.findall(self.patterns['invoice_number'], text, re.IGNORECASE)
-        return list(set(matches))
-    
-    def extract_all_fields(self, text, document_type=None):
-        """Extract all relevant fields based on document type"""
+        return self.extract_field('invoice_numbers', text)
+
+    @traced(
+        'extractor.extract_all_fields',
+        lambda self, text, document_type=None, include_offsets=False: {
+            'text_length': len(text) if text else 0,
+            'document_type': document_type
+        },
+        lambda fields: {'values': sum(len(values) for name, values in fields.items() if name != 'field_offsets')}
+    )
+    def extract_all_fields(self, text, document_type=None, include_offsets=False):
+        """Extract all relevant fields based on document type.
+
+        With ``include_offsets`` the result also has a ``field_offsets`` key
+        mapping each field to its matches' values and character offsets.
+        """
         if not text:
             return {}
-            
+
         fields = {}
-        
-        # Common fields for all documents
-        fields['emails'] = self.extract_emails(text)
-        fields['phone_numbers'] = self.extract_phone_numbers(text)
-        fields['dates'] = self.extract_dates(text)
-        
-        # Document-specific fields
-        if document_type in ['invoice', 'bill']:
-            fields['amounts'] = self.extract_amounts(text)
-            fields['invoice_numbers'] = self.extract_invoice_numbers(text)
-            fields['gstin'] = re.findall(self.patterns['gstin'], text.upper())
-        
-        elif document_type == 'pan':
-            fields['pan_numbers'] = re.findall(self.patterns['pan'], text.upper())
-        
-        elif document_type == 'aadhar':
-            fields['aadhar_numbers'] = re.findall(self.patterns['aadhar'], text)
-        
-        # Remove empty fields
-        fields = {k: v for k, v in fields.items() if v}
-        
+        offsets = {}
+        for name, value, start in self.scan(text, document_type):
+            values = fields.get(name)
+            if values is None:
+                values = fields[name] = []
+            values.append(value)
+            if include_offsets:
+                offsets.setdefault(name, []).append(
+                    {'value': value, 'start': start, 'end': start + len(value)}
+                )
+
+        for name, values in fields.items():
+            if self.fields[name].unique:
+                fields[name] = list(dict.fromkeys(values))
+
+        if include_offsets and offsets:
+            fields['field_offsets'] = offsets
+
         return fields
@@ -1,45 +1,151 @@
 import re
 
+from utils.tracing import traced
+
+# Compiled once at import; validation runs over very large batches
+PAN_PATTERN = re.compile(r'^[A-Z]{5}[0-9]{4}[A-Z]{1}$')
+# ASCII classes only: \d would also accept other scripts' digits, which the
+# check digit and checksum arithmetic cannot handle
+GSTIN_PATTERN = re.compile(r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[A-Z0-9]{1}Z[A-Z0-9]{1}$')
+EMAIL_PATTERN = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}$')
+WHITESPACE_PATTERN = re.compile(r'\s')
+PHONE_SEPARATORS = re.compile(r'[\s\-\+]')
+
+# Verhoeff checksum tables (dihedral group D5), used by Aadhaar
+VERHOEFF_MULTIPLY = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6),
+    (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8),
+    (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2),
+    (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4),
+    (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+VERHOEFF_PERMUTE = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2),
+    (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 6, 8, 7, 0),
+    (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5),
+    (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+
+GSTIN_CHARSET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+GSTIN_VALUES = {char: value for value, char in enumerate(GSTIN_CHARSET)}
+
+
+def verhoeff_valid(digits):
+    """True if the digit string ends in a correct Verhoeff check digit"""
+    check = 0
+    for position, digit in enumerate(reversed(digits)):
+        check = VERHOEFF_MULTIPLY[check][VERHOEFF_PERMUTE[position % 8][ord(digit) - 48]]
+    return check == 0
+
+
+def gstin_check_digit(gstin):
+    """Expected 15th character of a GSTIN from its first 14"""
+    total = 0
+    for position, char in enumerate(gstin[:14]):
+        product = GSTIN_VALUES[char] * (2 if position % 2 else 1)
+        total += product // 36 + product % 36
+    return GSTIN_CHARSET[(36 - total % 36) % 36]
+
+
 class FieldValidator:
     def __init__(self):
         print("FieldValidator initialized")
+        # Record keys accepted by validate_record, and their validators
+        self.validators = {
+            'pan': self.validate_pan,
+            'aadhar': self.validate_aadhar,
+            'aadhaar': self.validate_aadhar,
+            'gstin': self.validate_gstin,
+            'phone': self.validate_phone,
+            'email': self.validate_email
+        }
     
     def validate_pan(self, pan):
         """Validate PAN format"""
         if not pan or len(pan) != 10:
             return False, "Invalid PAN length"
-        pattern = r'^[A-Z]{5}[0-9]{4}[A-Z]{1}$'
-        if not re.match(pattern, pan.upper()):
+        if not PAN_PATTERN.match(pan.upper()):
             return False, "Invalid PAN format"
         return True, "Valid PAN format"
     
     def validate_aadhar(self, aadhar):
-        """Validate Aadhar format"""
+        """Validate Aadhar format and Verhoeff checksum"""
         if not aadhar:
             return False, "Empty Aadhar number"
-        clean_aadhar = re.sub(r'\s', '', aadhar)
+        clean_aadhar = WHITESPACE_PATTERN.sub('', aadhar)
         if len(clean_aadhar) != 12:
             return False, "Invalid Aadhar length"
-        if not clean_aadhar.isdigit():
+        if not (clean_aadhar.isascii() and clean_aadhar.isdigit()):
             return False, "Aadhar should contain only digits"
-        return True, "Valid Aadhar format"
+        if not verhoeff_valid(clean_aadhar):
+            return False, "Invalid Aadhar checksum"
+        return True, "Valid Aadhar number"
+    
+    def validate_gstin(self, gstin):
+        """Validate GSTIN format and check digit"""
+        if not gstin or len(gstin) != 15:
+            return False, "Invalid GSTIN length"
+        gstin = gstin.upper()
+        if not GSTIN_PATTERN.match(gstin):
+            return False, "Invalid GSTIN format"
+        if gstin_check_digit(gstin) != gstin[14]:
+            return False, "Invalid GSTIN check digit"
+        return True, "Valid GSTIN"
     
     def validate_email(self, email):
         """Validate email format"""
-        pattern = r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}$'
-        if re.match(pattern, email):
+        if email and EMAIL_PATTERN.match(email):
             return True, "Valid email format"
         return False, "Invalid email format"
     
     def validate_phone(self, phone):
         """Validate Indian phone number"""
-        clean_phone = re.sub(r'[\s\-\+]', '', phone)
+        clean_phone = PHONE_SEPARATORS.sub('', phone or '')
         if clean_phone.startswith('91') and len(clean_phone) == 12:
             clean_phone = clean_phone[2:]
-        if len(clean_phone) == 10 and clean_phone[0] in '6789':
+        if (len(clean_phone) == 10 and clean_phone[0] in '6789'
+                and clean_phone.isascii() and clean_phone.isdigit()):
             return True, "Valid phone number"
         return False, "Invalid phone number format"
     
+    def validate_record(self, record):
+        """Validate every known field of a record such as ``{"pan": ..., "gstin": ...}``"""
+        results = {}
+        for field, value in record.items():
+            validator = self.validators.get(field)
+            if validator is None:
+                continue
+            if not isinstance(value, str):
+                is_valid, message = False, "Value must be a string"
+            else:
+                is_valid, message = validator(value)
+            results[field] = {
+                'value': value,
+                'is_valid': is_valid,
+                'message': message
+            }
+        return results
+    
+    def validate_batch(self, records):
+        """Yield validate_record() results for an iterable of records, lazily"""
+        validate_record = self.validate_record
+        for record in records:
+            yield validate_record(record)
+    
+    @traced(
+        'validator.validate_extracted_fields',
+        lambda self, fields, document_type: {'document_type': document_type, 'fields': len(fields)},
+        lambda results: {'validated': sum(len(values) for values in results.values())}
+    )
     def validate_extracted_fields(self, fields, document_type):
         """Validate all extracted fields"""
         validation_results = {}
@@ -76,10 +76,10 @@ class SmartDocApp {
             return;
         }
         
-        // Validate file size (16MB max)
-        const maxSize = 16 * 1024 * 1024;
+        // Validate file size (256MB max)
+        const maxSize = 256 * 1024 * 1024;
         if (file.size > maxSize) {
-            alert('File size must be less than 16MB');
+            alert('File size must be less than 256MB');
             return;
         }
         
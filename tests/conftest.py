@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# Modules import each other relative to src/, as they do under app.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The Flask app, keeping uploads and its stores in a temporary folder"""
+    os.environ['UPLOAD_FOLDER'] = str(tmp_path_factory.mktemp('uploads'))
+    os.environ['MODEL_WARMUP'] = 'lazy'
+    from app import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
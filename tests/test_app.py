@@ -0,0 +1,199 @@
+import hashlib
+import io
+import json
+import os
+import zipfile
+
+from core.registry import get_registry
+from utils.tracing import current_span, get_tracer
+
+
+def test_job_status_is_read_without_starting_workers(client):
+    registry = get_registry()
+    registry.job_store.create('job-1', 'file-1', '/tmp/a.txt', 'a.txt', {})
+
+    response = client.get('/jobs/job-1')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'queued'
+    assert client.get('/jobs/unknown').status_code == 404
+
+    response = client.delete('/jobs/job-1')
+    assert response.get_json() == {'job_id': 'job-1', 'status': 'cancelled'}
+    assert registry.job_store.get('job-1') is None
+    assert not registry.jobs_started()
+
+
+def post_batch(client, *files):
+    return client.post('/upload/batch', content_type='multipart/form-data',
+                       data={'files': [(io.BytesIO(content), name) for name, content in files]})
+
+
+def zip_of(**members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def test_batch_upload_keeps_order_and_serves_duplicates_from_cache(client):
+    invoice = b'Invoice Number: INV-4471\nBill to: Acme Traders\nTotal amount: Rs. 12,500\n'
+    response = post_batch(client, ('a.txt', invoice), ('run.exe', b'MZ'), ('copy.txt', invoice),
+                          ('docs.zip', zip_of(**{'b.txt': invoice + b'Paid.\n', 'c.doc': b'x'})))
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [(r['index'], r['filename'], r['status']) for r in results] == [
+        (0, 'a.txt', 'completed'), (1, 'run.exe', 'failed'), (2, 'copy.txt', 'completed'),
+        (3, 'b.txt', 'completed'), (4, 'c.doc', 'failed')
+    ]
+    assert results[1]['error'] == 'File type not supported'
+    assert [results[i]['cache_hit'] for i in (0, 2, 3)] == [False, True, False]
+    assert results[0]['classification'] == results[2]['classification']
+
+    # Served from the result cache on the next batch
+    again = post_batch(client, ('again.txt', invoice)).get_json()['results'][0]
+    assert again['cache_hit'] is True and again['filename'] == 'again.txt'
+
+
+def test_batch_upload_rejects_oversized_and_malformed_archives(app, client):
+    limit = app.config['BATCH_MAX_UNCOMPRESSED_BYTES']
+    app.config['BATCH_MAX_UNCOMPRESSED_BYTES'] = 10
+    try:
+        response = post_batch(client, ('big.zip', zip_of(**{'a.txt': 'x' * 100})))
+    finally:
+        app.config['BATCH_MAX_UNCOMPRESSED_BYTES'] = limit
+    assert response.status_code == 413
+    assert '10 bytes' in response.get_json()['error']
+
+    response = post_batch(client, ('broken.zip', b'PK\x03\x04 not really a zip'))
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Invalid zip archive')
+
+
+def test_streamed_upload_is_traced_to_the_last_event(client):
+    tracer = get_tracer()
+    exported = []
+    sample_rate, exporter = tracer.sample_rate, tracer.exporter
+    tracer.sample_rate = 1
+    tracer.exporter = type('Exporter', (), {'export': lambda self, spans: exported.append(spans)})()
+    try:
+        response = client.post('/upload?stream=true', content_type='multipart/form-data', data={
+            'file': (io.BytesIO(b'Invoice Number: INV-9\nTotal amount 500 for design services.\n'), 's.txt')
+        })
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    finally:
+        tracer.sample_rate, tracer.exporter = sample_rate, exporter
+
+    assert [event['event'] for event in events] == ['page', 'document']
+    [spans] = exported
+    names = {span['name'] for span in spans}
+    assert {'upload.page', 'extractor.extract_all_fields', 'summarizer.summarize_many'} <= names
+    assert spans[0]['request_id'] == response.headers['X-Request-ID']
+    assert current_span() is None
+
+
+def test_extract_serves_indexed_text_and_indexes_legacy_uploads(app, client):
+    response = client.post('/upload', content_type='multipart/form-data', data={
+        'file': (io.BytesIO(b'Invoice Number: INV-77\nTotal amount 900\n'), 'e.txt')
+    })
+    file_id = response.get_json()['file_id']
+
+    extracted = client.get(f'/extract/{file_id}').get_json()
+    assert extracted['status'] == 'success'
+    assert 'INV-77' in extracted['text']
+    assert client.get('/extract/no-such-file').status_code == 404
+
+    # Saved under its id before the document store existed
+    legacy_path = os.path.join(app.config['UPLOAD_FOLDER'], 'legacy-1.txt')
+    with open(legacy_path, 'w') as f:
+        f.write('Bill to: Old Customer\nTotal amount 120\n')
+    assert get_registry().document_store.get('legacy-1') is None
+
+    response = client.get('/extract/legacy-1')
+    assert response.status_code == 200
+    assert 'Old Customer' in response.get_json()['text']
+
+    # Indexed on the first read, so the file is not needed again
+    os.remove(legacy_path)
+    assert client.get('/extract/legacy-1').get_json()['text'] == response.get_json()['text']
+
+
+def test_metrics_render_requests_and_component_gauges(client):
+    client.get('/health')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert '# TYPE smartdoc_http_requests_total counter' in body
+    assert 'smartdoc_http_requests_total{endpoint="/health",method="GET",status="200"}' in body
+    assert 'smartdoc_component_ready{component="ocr_engine"} 1' in body
+
+
+def test_ready_waits_for_the_model_unless_warmup_is_lazy(client, monkeypatch):
+    registry = get_registry()
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.get_json()['warmup_mode'] == 'lazy'
+
+    monkeypatch.setattr(registry, 'warmup_mode', 'eager')
+    monkeypatch.setattr(registry.summarizer, 'is_ready', lambda: False)
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.get_json()['ready'] is False
+
+
+def test_validate_batch_reports_a_failing_record_and_goes_on(client, monkeypatch):
+    validator = get_registry().field_validator
+    validate_pan = validator.validate_pan
+
+    def failing_pan(pan):
+        if pan == 'BOOM':
+            raise RuntimeError('validator failed')
+        return validate_pan(pan)
+
+    monkeypatch.setitem(validator.validators, 'pan', failing_pan)
+    response = client.post('/validate/batch', json=[
+        {'id': 'a', 'aadhar': '١٢٣٤٥٦٧٨٩٠١٢'}, {'id': 'b', 'pan': 'BOOM'}, {'id': 'c', 'pan': 'ABCDE1234F'}
+    ])
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert [(event['event'], event.get('id')) for event in events] == [
+        ('record', 'a'), ('error', 'b'), ('record', 'c'), ('summary', None)
+    ]
+    assert events[1]['error'] == 'validator failed'
+    assert events[3]['errors'] == 1 and events[3]['valid'] == 1
+
+
+def test_jpeg_uploads_are_stored_once_whatever_their_extension(client):
+    content = b'\xff\xd8\xff\xe0' + b'not really a photo' * 10
+    for name in ('a.jpg', 'b.jpeg', 'c.JPEG'):
+        client.post('/upload', content_type='multipart/form-data',
+                    data={'file': (io.BytesIO(content), name)})
+
+    record = get_registry().upload_store.get(hashlib.sha256(content).hexdigest())
+    assert record['uploads'] == 3
+    assert record['path'].endswith('.jpg')
+    assert os.listdir(os.path.dirname(record['path'])) == [os.path.basename(record['path'])]
+
+
+def test_batch_over_the_document_limit_stores_nothing_more(app, client):
+    store = get_registry().upload_store
+    members = {f'm{i}.txt': f'Invoice Number: INV-50{i}\n' for i in range(3)}
+    limit = app.config['BATCH_MAX_FILES']
+    app.config['BATCH_MAX_FILES'] = 2
+    try:
+        response = post_batch(client, ('many.zip', zip_of(**members)))
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Too many documents (maximum 2)'
+
+        loose = [(name, content.encode() + b'Loose.\n') for name, content in members.items()]
+        assert post_batch(client, *loose).status_code == 400
+    finally:
+        app.config['BATCH_MAX_FILES'] = limit
+
+    # Counted before extracting or storing anything over the limit
+    assert all(store.get(hashlib.sha256(content.encode()).hexdigest()) is None
+               for content in members.values())
+    assert store.get(hashlib.sha256(loose[2][1]).hexdigest()) is None
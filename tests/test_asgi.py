@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+
+
+@pytest.fixture
+def asgi_app(app):
+    from asgi import WSGIExecutorApp
+    adapter = WSGIExecutorApp(app, threads=2, max_body=1024)
+    yield adapter
+    adapter.executor.shutdown()
+
+
+def call(adapter, path, chunks, headers=(), method='POST'):
+    """Send ``chunks`` as the request body; returns the messages sent back"""
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'content-type', b'application/json'), *headers],
+    }
+    messages = [
+        {'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(adapter(scope, receive, send))
+    return sent
+
+
+def response_of(sent):
+    start, *bodies = sent
+    return start['status'], json.loads(b''.join(message.get('body', b'') for message in bodies))
+
+
+def test_chunked_body_reaches_the_app(asgi_app):
+    body = json.dumps({'pan': 'ABCDE1234F', 'email': 'a@example.com'}).encode()
+    chunked = call(asgi_app, '/validate', [body[:10], body[10:]],
+                   headers=[(b'transfer-encoding', b'chunked')])
+    sized = call(asgi_app, '/validate', [body],
+                 headers=[(b'content-length', str(len(body)).encode())])
+
+    status, result = response_of(chunked)
+    assert status == 200
+    assert set(result['validation_results']) == {'pan', 'email'}
+    assert response_of(sized) == (status, result)
+
+
+def test_bodies_over_the_limit_are_refused(asgi_app):
+    status, result = response_of(call(asgi_app, '/validate', [b'{}'],
+                                      headers=[(b'content-length', b'4096')]))
+    assert status == 413
+    assert result['error'] == 'File too large. Maximum size is 1KB.'
+
+    # Without a Content-Length, once the received size passes the limit
+    status, _ = response_of(call(asgi_app, '/validate', [b'x' * 600, b'x' * 600, b'x']))
+    assert status == 413
+
+
+def test_client_disconnect_skips_the_app(asgi_app, monkeypatch):
+    started = []
+    monkeypatch.setattr(asgi_app, 'start_app', lambda environ: started.append(environ))
+
+    messages = [{'type': 'http.request', 'body': b'{"pan"', 'more_body': True},
+                {'type': 'http.disconnect'}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/validate', 'headers': []}
+    asyncio.run(asgi_app(scope, receive, send))
+    assert sent == [] and started == []
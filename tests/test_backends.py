@@ -0,0 +1,56 @@
+import pytest
+
+from ml import backends
+from ml.backends import DISTILLED_MODEL_NAME, load_backend
+from ml.summarizer import TextSummarizer
+from utils.cache import ResultCache
+
+LONG_TEXT = ' '.join(f'Clause {i} sets out the obligations of both parties.' for i in range(40))
+
+
+@pytest.fixture
+def stub_backends(monkeypatch):
+    """Backends that record what they were asked to load, without transformers"""
+    loaded = []
+
+    def loader(name):
+        def load(model_name, threads=None):
+            loaded.append((name, model_name, threads))
+            return lambda texts, **kwargs: [{'summary_text': f'{name} summary'} for _ in texts]
+        return load
+
+    monkeypatch.setattr(backends, 'BACKENDS', {name: loader(name) for name in ('torch', 'quantized', 'onnx')})
+    return loaded
+
+
+def test_backend_is_chosen_by_name(stub_backends):
+    pipeline = load_backend('quantized', 'some/model', 2)
+
+    assert stub_backends == [('quantized', 'some/model', 2)]
+    assert pipeline(['text']) == [{'summary_text': 'quantized summary'}]
+
+    with pytest.raises(ValueError, match="Unknown summarizer backend 'tpu'. Choose one of: torch, quantized, onnx"):
+        load_backend('tpu', 'some/model')
+
+
+def test_summarizer_loads_its_configured_backend(stub_backends, monkeypatch):
+    monkeypatch.setenv('SUMMARIZER_BACKEND', 'onnx')
+    monkeypatch.setenv('SUMMARIZER_MODEL', 'distilled')
+    monkeypatch.setenv('SUMMARIZER_THREADS', '3')
+    summarizer = TextSummarizer(cache=ResultCache())
+
+    assert stub_backends == [('onnx', DISTILLED_MODEL_NAME, 3)]
+    assert summarizer.model_state == 'ready'
+    assert summarizer.model_id == f'{DISTILLED_MODEL_NAME}:onnx'
+    assert summarizer.summarize_text(LONG_TEXT, 'contract') == 'onnx summary'
+
+
+def test_unknown_backend_falls_back_to_rule_based(stub_backends):
+    summarizer = TextSummarizer(backend='tpu', cache=ResultCache())
+
+    assert stub_backends == []
+    assert summarizer.model_state == 'failed' and not summarizer.model_loaded
+    assert summarizer.is_ready()
+    summary = summarizer.summarize_text(LONG_TEXT, 'contract')
+    assert summary and summary != 'torch summary'
+    assert summarizer.router.stats()['paths']['rule_based']['reasons'] == {'model_unavailable': 1}
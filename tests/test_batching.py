@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from ml.batching import BatchScheduler
+
+
+class StubModel:
+    """Records every pipeline call and summarizes by upper-casing"""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def __call__(self, texts, max_length, min_length):
+        with self.lock:
+            self.calls.append((list(texts), max_length, min_length))
+        if self.fail_on is not None and self.fail_on in texts:
+            raise RuntimeError('model failed')
+        return [text.upper() for text in texts]
+
+
+def test_concurrent_requests_share_one_call_per_length_bucket_and_group():
+    model = StubModel()
+    scheduler = BatchScheduler(model, max_batch_size=8, max_wait_ms=200)
+
+    futures = [
+        scheduler.submit('a' * 10, 60, 20),
+        scheduler.submit('b' * 12, 80, 10),
+        scheduler.submit('c' * 100, 60, 20),
+        scheduler.submit('d' * 11, 60, 20, group='long'),
+    ]
+
+    assert [future.result(timeout=2) for future in futures] == ['A' * 10, 'B' * 12, 'C' * 100, 'D' * 11]
+    calls = sorted(model.calls, key=lambda call: (len(call[0]), len(call[0][0])))
+    # Similar lengths share a call with the loosest bounds; longer texts
+    # and other groups get calls of their own
+    assert calls == [(['d' * 11], 60, 20), (['c' * 100], 60, 20), (['a' * 10, 'b' * 12], 80, 10)]
+    assert scheduler.stats()['batch_size_histogram'] == {'4': 1}
+
+
+def test_full_batches_go_at_once_and_stragglers_after_max_wait():
+    model = StubModel()
+    scheduler = BatchScheduler(model, max_batch_size=2, max_wait_ms=50)
+
+    started = time.perf_counter()
+    pair = [scheduler.submit('first text', 60, 20), scheduler.submit('other text', 60, 20)]
+    straggler = scheduler.submit('last text', 60, 20)
+    assert [future.result(timeout=2) for future in pair] == ['FIRST TEXT', 'OTHER TEXT']
+    assert straggler.result(timeout=2) == 'LAST TEXT'
+
+    assert time.perf_counter() - started < 1
+    assert scheduler.stats()['batch_size_histogram'] == {'1': 1, '2': 1}
+    assert scheduler.load()['queue_depth'] == 0
+
+
+def test_model_errors_reach_every_submitter_of_the_failed_call():
+    model = StubModel(fail_on='bad input')
+    scheduler = BatchScheduler(model, max_batch_size=8, max_wait_ms=200)
+
+    failed = [scheduler.submit('bad input', 60, 20), scheduler.submit('bad inputs', 60, 20)]
+    fine = scheduler.submit('fine', 60, 20, group='other')
+
+    for future in failed:
+        with pytest.raises(RuntimeError, match='model failed'):
+            future.result(timeout=2)
+    assert fine.result(timeout=2) == 'FINE'
+
+    short = BatchScheduler(lambda texts, **kwargs: texts[:-1], max_batch_size=1, max_wait_ms=0)
+    with pytest.raises(ValueError, match='Expected 1 summaries, got 0'):
+        short.submit('dropped', 60, 20).result(timeout=2)
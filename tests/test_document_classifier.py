@@ -0,0 +1,88 @@
+import os
+import re
+
+import numpy as np
+import pytest
+
+from ml.document_classifier import DocumentClassifier
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_FILES = ['sample_invoice.txt', 'comprehensive_invoice.txt', 'test.txt', 'test_invoice.txt']
+TEXTS = [
+    'PERMANENT ACCOUNT NUMBER\nPAN: ABCDE1234F\nIncome Tax Department',
+    'Aadhaar / Aadhar - Unique Identification Authority of India, UID 2345 6789 0123',
+    'Work experience: 5 years. Education: B.Tech. Skills: Python; employment history below.',
+    'Total:500, GST-18%, tax_amount 90, sub-total 590; bill/invoice. pan-card? panel, billing',
+    'This document contains text, TEXT and more Text.',
+]
+
+
+def sample_texts():
+    texts = list(TEXTS)
+    for name in SAMPLE_FILES:
+        with open(os.path.join(REPO_ROOT, name), encoding='utf-8') as f:
+            texts.append(f.read())
+    return texts
+
+
+def regex_scores(classifier, text):
+    """Keyword scores the way the classifier computed them before the index"""
+    scores = {}
+    for doc_type, keywords in classifier.document_keywords.items():
+        score = 0
+        for keyword in keywords:
+            score += len(re.findall(r'\b' + keyword + r'\b', text.lower()))
+        scores[doc_type] = score
+    return scores
+
+
+class StubModel:
+    classes_ = np.array(['invoice', 'pan', 'resume'])
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def predict_proba(self, texts):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError('model failed')
+        return np.array([[0.1, 0.7, 0.2] if 'PAN' in text else [0.6, 0.1, 0.3] for text in texts])
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    monkeypatch.delenv('DOCUMENT_CLASSIFIER_MODEL', raising=False)
+    return DocumentClassifier()
+
+
+def test_keyword_index_scores_match_per_keyword_regex(classifier):
+    texts = sample_texts()
+
+    for text in texts:
+        assert classifier.score_text(text) == regex_scores(classifier, text)
+
+    expected = [classifier.classify_scores(regex_scores(classifier, text)) for text in texts]
+    assert classifier.classify_batch(texts) == expected
+
+
+def test_model_scores_the_batch_in_one_call(classifier):
+    classifier.model = StubModel()
+
+    results = classifier.classify_batch(['PAN: ABCDE1234F', '', 'Invoice total 500'])
+
+    assert classifier.model.calls == [['PAN: ABCDE1234F', 'Invoice total 500']]
+    assert results == [
+        {'document_type': 'pan', 'confidence': 70.0, 'method': 'ml'},
+        {'document_type': 'other', 'confidence': 0, 'method': 'rule_based'},
+        {'document_type': 'invoice', 'confidence': 60.0, 'method': 'ml'},
+    ]
+
+
+def test_failing_model_falls_back_to_keywords(classifier):
+    classifier.model = StubModel(fail=True)
+    texts = ['PAN: ABCDE1234F permanent account number', 'Invoice total 500']
+
+    assert classifier.classify_batch(texts) == [
+        classifier.classify_scores(regex_scores(classifier, text)) for text in texts
+    ]
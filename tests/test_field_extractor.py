@@ -0,0 +1,51 @@
+from validators.field_extractor import FieldExtractor
+
+TEXT = (
+    "Invoice #INV-77 dated 12/05/2024 from billing@vendor.com, phone +91 9876543210. "
+    "GSTIN 27abcde1234f1z5. Total: ₹ 1,234.50"
+)
+
+
+def test_invoice_fields_in_one_pass():
+    fields = FieldExtractor().extract_all_fields(TEXT, 'invoice')
+
+    assert fields['invoice_numbers'] == ['INV-77']
+    assert fields['dates'] == ['12/05/2024']
+    assert fields['emails'] == ['billing@vendor.com']
+    assert fields['phone_numbers'] == ['+91 9876543210']
+    assert fields['gstin'] == ['27ABCDE1234F1Z5']
+    assert '₹ 1,234.50' in fields['amounts']
+    # Digits inside other fields are not reported as amounts
+    assert '2024' not in fields['amounts'] and '987' not in fields['amounts']
+
+
+def test_phone_without_country_code():
+    assert FieldExtractor().extract_phone_numbers('Call 9876543210 now') == ['9876543210']
+
+
+def test_offsets_point_at_values():
+    fields = FieldExtractor().extract_all_fields(TEXT, 'invoice', include_offsets=True)
+    for matches in fields['field_offsets'].values():
+        for match in matches:
+            assert TEXT[match['start']:match['end']].upper() == match['value'].upper()
+
+
+def test_registered_document_type():
+    extractor = FieldExtractor()
+    extractor.register_field('ifsc_codes', r'\b[A-Z]{4}0[A-Z0-9]{6}\b', ['cheque'])
+
+    assert extractor.extract_all_fields('IFSC SBIN0001234', 'cheque') == {'ifsc_codes': ['SBIN0001234']}
+    assert 'ifsc_codes' not in extractor.extract_all_fields('IFSC SBIN0001234', 'other')
+
+
+def test_invoice_number_does_not_hide_fields_it_overlaps():
+    extractor = FieldExtractor()
+
+    fields = extractor.extract_all_fields('Invoice 12/05/2024 total 500', 'invoice')
+    assert fields['invoice_numbers'] == ['12']
+    assert fields['dates'] == ['12/05/2024']
+    assert fields['amounts'] == ['500']
+
+    fields = extractor.extract_all_fields('Bill 9876543210 due', 'bill')
+    assert fields['invoice_numbers'] == ['9876543210']
+    assert fields['phone_numbers'] == ['9876543210']
@@ -0,0 +1,38 @@
+from validators.field_validator import FieldValidator
+
+
+def test_aadhar_checksum():
+    validator = FieldValidator()
+
+    assert validator.validate_aadhar('2341 2341 2346') == (True, 'Valid Aadhar number')
+    assert validator.validate_aadhar('234123412341') == (False, 'Invalid Aadhar checksum')
+    assert validator.validate_aadhar('23412341234')[0] is False
+
+
+def test_gstin_check_digit():
+    validator = FieldValidator()
+
+    assert validator.validate_gstin('27AAPFU0939F1ZV') == (True, 'Valid GSTIN')
+    assert validator.validate_gstin('27aapfu0939f1zv')[0] is True
+    assert validator.validate_gstin('27AAPFU0939F1ZA') == (False, 'Invalid GSTIN check digit')
+    assert validator.validate_gstin('27AAPFU0939F1XV') == (False, 'Invalid GSTIN format')
+
+
+def test_validate_record_skips_unknown_fields():
+    results = FieldValidator().validate_record({'id': 7, 'pan': 'ABCDE1234F', 'phone': 12})
+
+    assert set(results) == {'pan', 'phone'}
+    assert results['pan']['is_valid'] is True
+    assert results['phone'] == {'value': 12, 'is_valid': False, 'message': 'Value must be a string'}
+
+
+def test_non_ascii_digits_are_rejected():
+    results = FieldValidator().validate_record({
+        'aadhar': '١٢٣٤٥٦٧٨٩٠١٢',
+        'gstin': '٢7AAPFU0939F1ZV',
+        'phone': '९८७६५४३२१०'
+    })
+
+    assert results['aadhar']['message'] == 'Aadhar should contain only digits'
+    assert results['gstin']['message'] == 'Invalid GSTIN format'
+    assert results['phone']['is_valid'] is False
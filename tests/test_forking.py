@@ -0,0 +1,48 @@
+import os
+
+from utils.forking import ForkSafeDatabase
+
+
+class Counter(ForkSafeDatabase):
+    def __init__(self, path):
+        self.open_db(path)
+        self._db.execute('CREATE TABLE IF NOT EXISTS counts (n INTEGER)')
+        self._db.commit()
+
+    def add(self):
+        with self._lock:
+            self._db.execute('INSERT INTO counts VALUES (1)')
+            self._db.commit()
+
+    def total(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM counts').fetchone()[0]
+
+
+def test_forked_child_gets_its_own_connection_and_lock(tmp_path):
+    counter = Counter(str(tmp_path / 'nested' / 'counts.db'))
+    db, lock = counter._db, counter._lock
+    # Held at fork time, as by another thread of the parent
+    lock.acquire()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                fresh = counter._db is not db and counter._lock is not lock
+                counter.add()
+                os._exit(0 if fresh else 1)
+            except BaseException:
+                os._exit(2)
+    finally:
+        lock.release()
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert counter._db is db
+    assert counter.total() == 1
+
+
+def test_without_a_path_there_is_no_database():
+    holder = ForkSafeDatabase()
+    holder.open_db(None)
+    assert holder._db is None
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core import jobs
+from core.jobs import JobManager, JobStore
+
+
+@pytest.fixture
+def worker_threads(monkeypatch):
+    """Run jobs on threads with a stub job body instead of the pipeline"""
+    release = threading.Event()
+    ran = []
+
+    def run_document_job(file_path, filename, stages=None, trace=None):
+        ran.append(filename)
+        if filename.startswith('slow'):
+            release.wait(5)
+        return {'filename': filename, 'status': 'completed'}
+
+    monkeypatch.setattr(jobs, 'ProcessPoolExecutor',
+                        lambda max_workers, mp_context, initializer: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr(jobs, 'run_document_job', run_document_job)
+    return release, ran
+
+
+def wait_for(store, job_id, status):
+    deadline = time.time() + 5
+    while store.get(job_id)['status'] != status:
+        assert time.time() < deadline, store.get(job_id)
+        time.sleep(0.01)
+    return store.get(job_id)
+
+
+def test_claim_hands_a_job_to_one_process(tmp_path):
+    first, second = JobStore(str(tmp_path / 'jobs.db')), JobStore(str(tmp_path / 'jobs.db'))
+    first.create('j1', 'f1', '/tmp/a.txt', 'a.txt', {})
+
+    assert first.claim('j1') is True
+    assert second.claim('j1') is False
+    assert second.get('j1')['status'] == 'running'
+
+    assert second.cancel('j1')['status'] == 'cancelled'
+    # Finished jobs stay as they are
+    first.update('j1', status='completed')
+    assert first.cancel('j1')['status'] == 'completed'
+
+
+def test_running_jobs_are_recovered_and_finished(tmp_path, worker_threads):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    store.create('left-running', 'f1', '/tmp/a.txt', 'a.txt', {})
+    store.claim('left-running')
+    completed = []
+
+    def on_complete(job, result):
+        completed.append(job['job_id'])
+        return dict(result, file_id=job['file_id'])
+
+    manager = JobManager(store, workers=1, on_complete=on_complete).start(recover=True)
+    try:
+        job = wait_for(store, 'left-running', 'completed')
+        assert job['result'] == {'filename': 'a.txt', 'status': 'completed', 'file_id': 'f1'}
+        assert completed == ['left-running']
+
+        submitted = manager.submit('f2', '/tmp/b.txt', 'b.txt')
+        assert wait_for(store, submitted['job_id'], 'completed')['finished'] is not None
+    finally:
+        manager.shutdown()
+
+
+def test_cancelled_jobs_are_not_run_or_recorded(tmp_path, worker_threads):
+    release, ran = worker_threads
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    manager = JobManager(store, workers=1).start()
+    try:
+        running = manager.submit('f1', '/tmp/slow.txt', 'slow.txt')
+        wait_for(store, running['job_id'], 'running')
+        queued = manager.submit('f2', '/tmp/b.txt', 'b.txt')
+
+        assert manager.cancel(queued['job_id'])['status'] == 'cancelled'
+        assert manager.cancel(running['job_id'])['status'] == 'cancelled'
+        release.set()
+
+        # The running job's result is discarded once it finishes
+        deadline = time.time() + 5
+        while manager.stats()['running']:
+            assert time.time() < deadline
+            time.sleep(0.01)
+        assert store.get(running['job_id'])['result'] is None
+        assert store.get(running['job_id'])['status'] == 'cancelled'
+        assert ran == ['slow.txt']
+    finally:
+        manager.shutdown()
+
+
+def crash_or_complete(file_path, filename, stages=None, trace=None):
+    if filename.startswith('crash'):
+        os._exit(1)
+    if filename.startswith('slow'):
+        time.sleep(0.5)
+    return {'filename': filename, 'status': 'completed'}
+
+
+def test_jobs_survive_a_worker_crash(tmp_path, monkeypatch):
+    monkeypatch.setenv('JOB_START_METHOD', 'fork')
+    monkeypatch.setattr(jobs, '_init_job_worker', lambda: None)
+    monkeypatch.setattr(jobs, 'run_document_job', crash_or_complete)
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    manager = JobManager(store, workers=2).start()
+    try:
+        slow = manager.submit('f1', '/tmp/slow.txt', 'slow.txt')
+        wait_for(store, slow['job_id'], 'running')
+        crash = manager.submit('f2', '/tmp/crash.txt', 'crash.txt')
+
+        # Lost with the pool, then run again in the new one
+        assert wait_for(store, slow['job_id'], 'completed')['result']['filename'] == 'slow.txt'
+        # Crashed its worker each time it ran
+        assert wait_for(store, crash['job_id'], 'failed')['error'] == 'Job worker process died'
+
+        later = manager.submit('f3', '/tmp/b.txt', 'b.txt')
+        assert wait_for(store, later['job_id'], 'completed')['finished'] is not None
+    finally:
+        manager.shutdown()
@@ -0,0 +1,19 @@
+from utils.metrics import MetricsRegistry
+
+
+def test_render_prometheus_text():
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.describe('stage_seconds', 'Stage time')
+    metrics.observe('stage_seconds', 0.05, {'stage': 'ocr'})
+    metrics.observe('stage_seconds', 0.5, {'stage': 'ocr'})
+    metrics.inc('requests_total', {'endpoint': '/upload'}, amount=2)
+
+    text = metrics.render(collectors=[lambda: [('queue_depth', 'gauge', 'Waiting', [({}, 3)])]])
+
+    assert '# TYPE stage_seconds histogram' in text
+    assert 'stage_seconds_bucket{stage="ocr",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="ocr",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="ocr",le="+Inf"} 2' in text
+    assert 'stage_seconds_count{stage="ocr"} 2' in text
+    assert 'requests_total{endpoint="/upload"} 2' in text
+    assert 'queue_depth 3' in text
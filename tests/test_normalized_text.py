@@ -0,0 +1,19 @@
+import pickle
+import re
+
+from utils.normalized_text import NormalizedText
+from utils.text_cleaner import TextCleaner
+
+
+def test_views_match_separate_derivation():
+    raw = "INVOICE  #42\n\nFrom: Acme & Co.   Total: ₹1,200.00!  Thanks?? Bye"
+    text = TextCleaner.clean_text(raw)
+
+    assert isinstance(text, NormalizedText)
+    assert text == re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]]', '', re.sub(r'\s+', ' ', raw)).strip()
+    assert text.tokens == re.findall(r'\w+', text.lower())
+    assert text.sentences == [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+    assert [text[start:end] for start, end in text.sentence_spans] == text.sentences
+
+    restored = pickle.loads(pickle.dumps(text))
+    assert restored == text and 'tokens' not in vars(restored)
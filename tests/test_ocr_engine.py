@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+pytest.importorskip('cv2')
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from ocr import ocr_engine
+from ocr.ocr_engine import OCREngine, preprocess_image
+
+
+def ink_height(image):
+    rows = np.where((np.array(image) < 128).any(axis=1))[0]
+    return rows.max() - rows.min()
+
+
+@pytest.mark.parametrize('angle', [-6, 4])
+def test_preprocess_straightens_skewed_lines(angle):
+    page = Image.new('L', (800, 600), 255)
+    draw = ImageDraw.Draw(page)
+    for line in range(6):
+        draw.rectangle([150, 180 + line * 40, 650, 200 + line * 40], fill=0)
+    level = ink_height(page)
+    skewed = page.rotate(angle, fillcolor=255).convert('RGB')
+
+    assert ink_height(skewed) > level + 20
+    # Rotated the right way, the lines are level again
+    assert ink_height(preprocess_image(skewed)) <= level + 3
+
+
+def crash_on_page_two(file_path, page_number, dpi=300, lang='eng'):
+    if file_path == 'crash.pdf' and page_number == 2:
+        os._exit(1)
+    return {'page': page_number, 'text': f'page {page_number}', 'confidence': 90.0, 'words': 2}
+
+
+def test_pool_is_replaced_after_a_worker_dies(monkeypatch):
+    monkeypatch.setenv('OCR_START_METHOD', 'fork')
+    monkeypatch.setattr(ocr_engine, 'ocr_page', crash_on_page_two)
+    engine = OCREngine(max_workers=2)
+    monkeypatch.setattr(engine, 'check_supported', lambda file_ext: None)
+    monkeypatch.setattr(engine, 'page_count', lambda file_path: 3)
+    try:
+        crashed = engine.extract_text('crash.pdf')
+        assert crashed['status'] == 'error'
+        assert engine._pool is None
+
+        result = engine.extract_text('ok.pdf')
+        assert result['status'] == 'success' and result['page_count'] == 3
+        assert [page['text'] for page in engine.iter_pages('ok.pdf')] == ['page 1', 'page 2', 'page 3']
+    finally:
+        engine.shutdown()
@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from core.pipeline import STAGES, DocumentPipeline, cacheable
+from core.registry import get_registry
+
+INVOICE = 'Invoice Number: INV-31\nBill to: Acme Traders\nTotal amount: Rs. 4,200\n'
+
+
+@pytest.fixture
+def registry(app):
+    return get_registry()
+
+
+def test_optional_stage_timeout_keeps_the_finished_stages(registry, monkeypatch):
+    monkeypatch.setattr(STAGES.stages['summarize'], 'timeout', 0.05)
+    monkeypatch.setattr(registry.summarizer, 'summarize_many',
+                        lambda texts, types, confidences=None: time.sleep(0.5) or ['late'] * len(texts))
+
+    def broken_validation(fields, document_type):
+        raise RuntimeError('validator failed')
+
+    monkeypatch.setattr(registry.field_validator, 'validate_extracted_fields', broken_validation)
+    result = DocumentPipeline(registry).analyze_text(INVOICE, 'inv.txt')
+
+    assert result['status'] == 'completed'
+    assert result['classification']['document_type'] == 'invoice'
+    assert 'extracted_fields' in result
+    assert 'summary' not in result and 'validation' not in result
+    assert result['timed_out'] == ['summarize']
+    assert result['errors'] == {
+        'validate': 'validator failed',
+        'summarize': 'Stage summarize timed out after 0.05s'
+    }
+    assert not cacheable(result)
+
+
+def test_failed_stage_others_depend_on_fails_the_document(registry, monkeypatch):
+    def broken_extraction(text, document_type):
+        raise RuntimeError('extractor failed')
+
+    monkeypatch.setattr(registry.field_extractor, 'extract_all_fields', broken_extraction)
+    pipeline = DocumentPipeline(registry)
+
+    result = pipeline.analyze_text(INVOICE, 'inv.txt')
+    assert result['status'] == 'failed'
+    assert result['error'] == 'extractor failed'
+
+    # Without validation selected, nothing needs the extracted fields
+    result = pipeline.analyze_text(INVOICE, 'inv.txt', stages=['extract', 'summarize'])
+    assert result['status'] == 'completed'
+    assert result['errors'] == {'extract': 'extractor failed'}
+    assert 'summary' in result
@@ -0,0 +1,168 @@
+import functools
+import threading
+import time
+
+import pytest
+from flask import Flask
+from flask_restful import Api
+
+from api.resources import ValidateFieldsResource
+from core.registry import ComponentRegistry
+from ml import summarizer as summarizer_module
+from ml.summarizer import TextSummarizer
+from utils.cache import ResultCache
+
+
+class StubValidator:
+    def validate_pan(self, pan):
+        return True, f'checked {pan}'
+
+
+def test_components_are_built_once_on_first_use():
+    built = []
+    gate = threading.Event()
+
+    def build_validator():
+        built.append('validator')
+        gate.wait(5)
+        return StubValidator()
+
+    registry = ComponentRegistry({'field_validator': build_validator, 'text_cleaner': object})
+    assert built == []
+    assert registry.status()['field_validator'] == {'state': 'not_loaded', 'load_time': None, 'error': None}
+
+    instances = []
+    threads = [threading.Thread(target=lambda: instances.append(registry.field_validator)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert built == ['validator']
+    assert len(instances) == 4 and all(instance is instances[0] for instance in instances)
+    assert registry.status()['field_validator']['state'] == 'ready'
+    assert registry.status()['field_validator']['load_time'] >= 0
+    # Only what was asked for is built
+    assert registry.status()['text_cleaner']['state'] == 'not_loaded'
+    assert not registry.is_loaded()
+    with pytest.raises(KeyError):
+        registry.get('missing')
+
+
+def test_failed_component_is_reported_and_retried():
+    attempts = []
+
+    def build_cleaner():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError('model file missing')
+        return object()
+
+    registry = ComponentRegistry({'text_cleaner': build_cleaner, 'field_validator': StubValidator})
+    registry.load_all(warmup='lazy')
+
+    status = registry.status()
+    assert status['text_cleaner']['state'] == 'failed'
+    assert status['text_cleaner']['error'] == 'model file missing'
+    assert status['field_validator']['state'] == 'ready'
+    assert not registry.is_loaded() and not registry.is_ready()
+
+    # Asked for again, it is built again
+    assert registry.text_cleaner is not None
+    retried = registry.status()['text_cleaner']
+    assert (retried['state'], retried['error']) == ('ready', None)
+    assert registry.is_loaded()
+    with pytest.raises(ValueError):
+        registry.load_all(warmup='sometime')
+
+
+def test_resources_use_the_registry_they_are_given():
+    registry = ComponentRegistry({'field_validator': StubValidator})
+    app = Flask(__name__)
+    Api(app).add_resource(ValidateFieldsResource, '/validate', resource_class_kwargs={'registry': registry})
+
+    response = app.test_client().post('/validate', json={'pan': 'ABCDE1234F'})
+
+    assert response.get_json()['validation_results']['pan'] == {
+        'value': 'ABCDE1234F', 'is_valid': True, 'message': 'checked ABCDE1234F'
+    }
+    assert registry.status()['field_validator']['state'] == 'ready'
+
+
+class SlowLoader:
+    """Stands in for load_backend: loads nothing until released"""
+
+    def __init__(self, fail=False):
+        self.release = threading.Event()
+        self.fail = fail
+
+    def __call__(self, backend, model_name, threads=None):
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError('no model')
+        return lambda texts, **kwargs: [{'summary_text': 'model summary'} for _ in texts]
+
+
+def summarizer_registry(monkeypatch, loader, wait_timeout=0):
+    monkeypatch.setattr(summarizer_module, 'load_backend', loader)
+    return ComponentRegistry({
+        'summarizer': functools.partial(TextSummarizer, load_model=False, wait_timeout=wait_timeout,
+                                        cache=ResultCache())
+    })
+
+
+LONG_TEXT = ' '.join(f'Clause {i} sets out the obligations of both parties.' for i in range(40))
+
+
+def test_background_warmup_is_not_ready_until_the_model_loads(monkeypatch):
+    loader = SlowLoader()
+    registry = summarizer_registry(monkeypatch, loader)
+
+    started = time.perf_counter()
+    registry.load_all(warmup='background')
+    assert time.perf_counter() - started < 1
+    assert not registry.is_ready()
+    assert registry.status()['summarizer']['model_state'] == 'loading'
+
+    # Requests made meanwhile get the rule-based summary without waiting
+    summarizer = registry.summarizer
+    assert summarizer.summarize_text(LONG_TEXT, 'contract') != 'model summary'
+    assert summarizer.router.stats()['paths']['rule_based']['reasons'] == {'model_unavailable': 1}
+
+    loader.release.set()
+    assert summarizer.wait_until_ready(5)
+    assert registry.is_ready()
+    assert registry.status()['summarizer']['model_state'] == 'ready'
+    assert summarizer.summarize_text(LONG_TEXT, 'contract') == 'model summary'
+
+
+def test_lazy_warmup_waits_up_to_the_timeout_then_falls_back(monkeypatch):
+    loader = SlowLoader()
+    registry = summarizer_registry(monkeypatch, loader, wait_timeout=0.1).load_all(warmup='lazy')
+    # Lazy mode does not hold readiness back for the model
+    assert registry.is_ready()
+    summarizer = registry.summarizer
+    assert summarizer.model_state == 'not_loaded'
+
+    started = time.perf_counter()
+    summary = summarizer.summarize_text(LONG_TEXT, 'contract')
+    waited = time.perf_counter() - started
+    assert summary != 'model summary'
+    assert 0.1 <= waited < 1
+    # The first request started the load
+    assert summarizer.model_state == 'loading'
+
+    loader.release.set()
+    assert summarizer.wait_until_ready(5)
+    assert summarizer.summarize_text(LONG_TEXT, 'contract') == 'model summary'
+
+
+def test_failed_model_load_ends_warmup_with_rule_based_summaries(monkeypatch):
+    loader = SlowLoader(fail=True)
+    loader.release.set()
+    registry = summarizer_registry(monkeypatch, loader).load_all(warmup='eager')
+
+    assert registry.is_ready()
+    assert registry.status()['summarizer']['model_state'] == 'failed'
+    assert registry.summarizer.summarize_text(LONG_TEXT, 'contract') != 'model summary'
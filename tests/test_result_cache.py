@@ -0,0 +1,32 @@
+from utils.cache import ResultCache
+
+
+def test_lru_evicts_by_size():
+    cache = ResultCache(max_bytes=60)
+    cache.set('a', {'v': 'x' * 20})
+    cache.set('b', {'v': 'y' * 20})
+    cache.get('a')
+    cache.set('c', {'v': 'z' * 20})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'v': 'x' * 20}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_get_returns_a_copy():
+    cache = ResultCache()
+    cache.set('k', {'status': 'completed'})
+    cache.get('k')['status'] = 'changed'
+    assert cache.get('k') == {'status': 'completed'}
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / 'results.db')
+    ResultCache(db_path=db_path).set('k', {'summary': 'cached'}, tag='v1')
+
+    cache = ResultCache(db_path=db_path)
+    assert cache.get('k') == {'summary': 'cached'}
+    assert cache.stats()['disk_hits'] == 1
+
+    cache.invalidate('v1')
+    assert ResultCache(db_path=db_path).get('k') is None
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from core.stages import Stage, StageGraph, parse_timeouts
+
+
+def test_independent_stages_run_concurrently_and_failures_skip_dependents():
+    both_running = threading.Barrier(2, timeout=5)
+
+    def branch(value):
+        def run(context):
+            both_running.wait()
+            return context['source'] + value
+        return run
+
+    def fail(context):
+        raise RuntimeError('boom')
+
+    graph = StageGraph([
+        Stage('source', lambda context: 1),
+        Stage('left', branch(1), requires=('source',)),
+        Stage('right', branch(2), requires=('source',)),
+        Stage('broken', fail, requires=('left',)),
+        Stage('after', lambda context: None, requires=('broken',)),
+    ])
+    context = {}
+    outcomes = graph.run(context)
+
+    assert (context['left'], context['right']) == (2, 3)
+    assert outcomes['broken'] == {'status': 'error', 'error': 'boom'}
+    assert outcomes['after']['status'] == 'skipped'
+    assert graph.resolve(['left']) == ['source', 'left']
+    with pytest.raises(ValueError):
+        graph.resolve(['missing'])
+
+
+def test_stage_timeout_discards_late_output():
+    graph = StageGraph([
+        Stage('slow', lambda context: time.sleep(0.5) or 'late', timeout=0.05),
+        Stage('fast', lambda context: 'done'),
+    ])
+    context = {}
+    started = time.perf_counter()
+    outcomes = graph.run(context)
+
+    assert time.perf_counter() - started < 0.4
+    assert outcomes['slow']['status'] == 'timeout'
+    assert 'slow' not in context and context['fast'] == 'done'
+    assert parse_timeouts('summarize=30, ocr=1.5') == {'summarize': 30.0, 'ocr': 1.5}
+
+
+def test_late_stage_output_is_never_committed():
+    finished = threading.Event()
+    committed = []
+
+    def slow(context):
+        time.sleep(0.2)
+        finished.set()
+        return 'late'
+
+    graph = StageGraph([
+        Stage('slow', slow, timeout=0.05, commit=lambda context, output: committed.append(output)),
+        Stage('fast', lambda context: 'done', commit=lambda context, output: committed.append(output)),
+    ])
+    outcomes = graph.run({})
+
+    assert outcomes['slow']['status'] == 'timeout'
+    assert finished.wait(2)
+    time.sleep(0.05)
+    assert committed == ['done']
@@ -0,0 +1,111 @@
+import re
+
+from ml.summarizer import TextSummarizer
+
+
+def make_summarizer(**settings):
+    summarizer = TextSummarizer(load_model=False)
+    for name, value in settings.items():
+        setattr(summarizer, name, value)
+    return summarizer
+
+
+def test_split_chunks_respects_chunk_size():
+    summarizer = make_summarizer(chunk_tokens=40)
+    text = ' '.join(f'Clause {i} sets out the obligations of both parties.' for i in range(30))
+
+    chunks = summarizer.split_chunks(text)
+
+    assert len(chunks) > 1
+    assert all(summarizer.count_tokens(chunk) <= 40 for chunk in chunks)
+    assert chunks[0].startswith('Clause 0 ')
+
+
+def test_split_chunks_caps_chunk_count_and_budget():
+    summarizer = make_summarizer(chunk_tokens=40, max_chunks=3)
+    text = ' '.join(f'Clause {i} sets out the obligations of both parties.' for i in range(100))
+
+    assert len(summarizer.split_chunks(text)) == 3
+
+    summarizer.max_input_tokens = 50
+    chunks = summarizer.split_chunks(text)
+    assert sum(summarizer.count_tokens(chunk) for chunk in chunks) <= 50
+
+
+def test_summaries_are_memoized_per_parameters():
+    summarizer = make_summarizer()
+    summarizer.model_available = lambda: False
+    text = 'Experienced software engineer with eight years building data platforms.'
+
+    first = summarizer.summarize_text(text, 'resume')
+    assert summarizer.summarize_text(text, 'resume') == first
+    summarizer.summarize_text(text, 'resume', max_length=60)
+
+    stats = summarizer.cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+
+    summarizer.invalidate_cache()
+    summarizer.summarize_text(text, 'resume')
+    assert summarizer.cache.stats()['misses'] == 3
+
+
+def test_router_sends_short_and_structured_documents_to_rules():
+    summarizer = make_summarizer()
+    summarizer.model_loaded = True
+    summarizer.summarizer = lambda texts, **kwargs: [{'summary_text': 'model summary'} for _ in texts]
+    long_text = ' '.join(f'Clause {i} sets out the obligations of both parties.' for i in range(40))
+    pan = 'Income Tax Department PAN card of Ravi Kumar, permanent account number ABCDE1234F.'
+
+    summaries = summarizer.summarize_many(
+        [pan, long_text, long_text], ['pan', 'contract', 'invoice'], confidences=[90, None, 20]
+    )
+
+    assert summaries[0].startswith('PAN Card belonging to')
+    assert summaries[1] == summaries[2] == 'model summary'
+    paths = summarizer.router.stats()['paths']
+    assert paths['rule_based']['reasons'] == {'document_type': 1}
+    assert paths['model']['count'] == 2
+
+    # Under the SLO, a backed-up model queue degrades to rule-based summaries
+    summarizer.router.slo_ms = 100
+    load = {'queue_depth': 40, 'max_batch_size': 8, 'avg_inference_ms': 50.0}
+    assert summarizer.router.route(1000, 'contract', None, load) == ('rule_based', 'slo')
+    assert summarizer.router.route(1000, 'contract', None, dict(load, queue_depth=0)) == ('model', 'model')
+
+
+def test_last_amount_scans_back_from_the_end():
+    summarizer = make_summarizer(TAIL_CHARS=16)
+    text = 'Fee $ 1,200.50 due. ' + 'Filler words without money. ' * 20 + 'Total ₹3,400 and $5 tip'
+
+    assert summarizer.last_amount(text) == re.findall(r'[\$₹]\s*[\d,]+\.?\d*', text)[-1] == '$5'
+    assert summarizer.last_amount(text[:40]) == '$ 1,200.50'
+    assert summarizer.last_amount('No amounts here at all') is None
+
+
+def test_model_summaries_are_cached_per_chunking_settings():
+    summarizer = make_summarizer(model_loaded=True)
+    calls = []
+
+    def model(texts, **kwargs):
+        calls.append(len(texts))
+        return [{'summary_text': 'model summary'} for _ in texts]
+
+    summarizer.summarizer = model
+    text = ' '.join(f'Clause {i} sets out the obligations of both parties.' for i in range(40))
+
+    summarizer.summarize_text(text, 'contract')
+    summarizer.summarize_text(text, 'contract')
+    old_tag = summarizer.cache_tag
+    assert summarizer.cache.stats()['hits'] == 1
+
+    # New settings: not served the summary made under the old ones
+    summarizer.chunk_tokens = 120
+    assert summarizer.cache_tag != old_tag
+    calls_before = len(calls)
+    summarizer.summarize_text(text, 'contract')
+    assert len(calls) > calls_before
+    assert summarizer.cache.stats()['hits'] == 1
+
+    summarizer.invalidate_stale_summaries()
+    assert summarizer.cache.tags() == {summarizer.cache_tag}
@@ -0,0 +1,47 @@
+from core.stages import Stage, StageGraph
+from utils.tracing import Tracer, current_span, traced
+
+
+class MemoryExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(spans)
+
+
+@traced('component.call', attributes=lambda text: {'text_length': len(text)},
+        result_attributes=lambda result: {'words': len(result)})
+def component(text):
+    return text.split()
+
+
+def test_component_spans_follow_the_request_into_stage_threads():
+    exporter = MemoryExporter()
+    tracer = Tracer(exporter, sample_rate=1)
+    graph = StageGraph([
+        Stage('first', lambda context: component(context['text'])),
+        Stage('second', lambda context: component(context['text'] * 2)),
+    ], max_workers=2)
+
+    with tracer.trace('http.request', 'req-1') as root:
+        graph.run({'text': 'one two three'})
+    assert current_span() is None
+
+    [spans] = exporter.traces
+    calls = [span for span in spans if span['name'] == 'component.call']
+    assert len(calls) == 2
+    assert all(span['request_id'] == 'req-1' and span['parent_id'] == root.span_id for span in calls)
+    assert sorted(span['attributes']['text_length'] for span in calls) == [13, 26]
+    assert spans[0]['name'] == 'http.request' and spans[0]['duration_ms'] is not None
+
+
+def test_unsampled_requests_record_nothing():
+    exporter = MemoryExporter()
+    tracer = Tracer(exporter, sample_rate=0)
+
+    with tracer.trace('http.request') as root:
+        assert component('a b') == ['a', 'b']
+
+    assert root is None
+    assert exporter.traces == []
@@ -0,0 +1,83 @@
+import os
+
+from core.upload_store import UploadStore, sniff_file_type
+
+
+def test_sniff_file_type():
+    assert sniff_file_type(b'%PDF-1.7\n') == 'pdf'
+    assert sniff_file_type(b'\x89PNG\r\n\x1a\n\x00\x00') == 'png'
+    assert sniff_file_type(b'BM\x36\x00\x0c\x00\x00\x00\x00\x00') == 'bmp'
+    assert sniff_file_type('BMW invoice ₹'.encode()) == 'txt'
+    assert sniff_file_type(b'\x00\x01\x02') is None
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    store = UploadStore(str(tmp_path))
+    paths = []
+    for _ in range(2):
+        with store.temporary_file() as upload:
+            upload.write(b'Invoice Number: INV-1\n')
+            paths.append(store.commit(upload, upload.file_type))
+
+    sha256 = upload.sha256
+    assert paths[0][0] == paths[1][0] == str(tmp_path / sha256[:2] / sha256[2:4] / f'{sha256}.txt')
+    assert [created for _, created in paths] == [True, False]
+    assert store.get(sha256)['uploads'] == 2
+    assert store.stats()['deduplicated_bytes'] == len(b'Invoice Number: INV-1\n')
+
+
+def test_expire_compresses_old_originals(tmp_path):
+    store = UploadStore(str(tmp_path))
+    with store.temporary_file() as upload:
+        upload.write(b'Aadhaar number: 2345 6789 0123\n' * 50)
+        path, _ = store.commit(upload, 'txt')
+
+    assert store.expire(ttl=3600, action='compress') == 0
+    assert store.expire(ttl=-1, action='compress') == 1
+
+    record = store.get(upload.sha256)
+    assert record['state'] == 'compressed'
+    assert record['stored_size'] < record['size']
+    assert not os.path.exists(path) and os.path.exists(path + '.gz')
+
+
+def test_upload_racing_expiry_keeps_the_original(tmp_path):
+    store = UploadStore(str(tmp_path))
+    content = b'Invoice Number: INV-9\n' * 20
+
+    def upload():
+        with store.temporary_file() as received:
+            received.write(content)
+            return store.commit(received, 'txt')[0]
+
+    def age():
+        store._db.execute('UPDATE uploads SET last_seen = 0')
+        store._db.commit()
+
+    # Uploaded again after expire selected the file, before it is removed
+    path = upload()
+    age()
+    compress = store._compress
+    store._compress = lambda source: (upload(), compress(source))[1]
+    assert store.expire(ttl=60, action='compress') == 0
+    del store._compress
+    sha256 = os.path.basename(path).split('.')[0]
+    assert store.get(sha256)['state'] == 'stored'
+    assert os.path.exists(path) and not os.path.exists(path + '.gz')
+
+    # Expired between an upload's link and its index update
+    age()
+    link = store._link
+    expired = []
+
+    def link_then_expire(source, target):
+        created = link(source, target)
+        if not expired:
+            expired.append(store.expire(ttl=60))
+        return created
+
+    store._link = link_then_expire
+    upload()
+    assert expired == [1]
+    assert store.get(sha256)['state'] == 'stored'
+    assert os.path.exists(path)